@@ -1,9 +1,11 @@
 import logging
 import re
-import json
-from pathlib import Path
+import threading
 from typing import Dict, Any, Optional, Tuple, List
+from sat_sight.core.config import GEO_METADATA_PATH, GEO_NEAR_RADIUS_KM, GEO_MAX_RESULTS, GAZETTEER_PATH
 from sat_sight.core.state import AgentState
+from sat_sight.retrieval.location_index import get_location_index
+from sat_sight.utils.keyword_matcher import KeywordMatcher, load_gazetteer
 
 logger = logging.getLogger(__name__)
 
@@ -26,108 +28,119 @@ def extract_coordinates(query: str) -> Optional[Tuple[float, float]]:
     return None
 
 
-def extract_location_names(query: str) -> List[str]:
-    """Extract location names from query."""
+def extract_radius_km(query: str) -> Optional[float]:
+    """Extract a search radius such as "within 10 km" or "5km around" from query text."""
     
-    query_lower = query.lower()
-    
-    locations = {
-        "paris": ["paris", "31udq"],
-        "france": ["france", "31udq", "32tlt"],
-        "switzerland": ["switzerland", "31ufs"],
-        "austria": ["austria", "31ufs"],
-        "germany": ["germany", "stuttgart", "32umu"],
-        "stuttgart": ["stuttgart", "32umu"],
-        "poland": ["poland", "34uda"],
-        "czech": ["czech", "33uuu"],
-        "alps": ["alps", "32tlt"],
-        "amazon": ["amazon", "brazil", "20llq", "20llr", "20lmq", "20lmr"],
-        "brazil": ["brazil", "20llq", "20llr", "20lmq", "20lmr"],
-        "california": ["california", "10tfk", "10tgk", "11ska", "11skb"],
-        "sahel": ["sahel", "31pet", "32pnt", "33pvn", "34pea"],
-        "africa": ["africa", "sahel"]
-    }
+    match = re.search(r'(\d+(?:\.\d+)?)\s*(km|kilometers?|kilometres?|m|meters?|metres?|mi|miles?)\b', query.lower())
     
-    found_locations = []
-    for loc_key, loc_aliases in locations.items():
-        if any(alias in query_lower for alias in loc_aliases):
-            found_locations.append(loc_key)
+    if not match:
+        return None
     
-    return found_locations
+    value, unit = float(match.group(1)), match.group(2)
+    if unit.startswith("mi"):
+        return value * 1.609344
+    if unit.startswith("k"):
+        return value
+    return value / 1000.0
+
+
+LOCATION_ALIASES = {
+    "paris": ["paris", "31udq"],
+    "france": ["france", "31udq", "32tlt"],
+    "switzerland": ["switzerland", "31ufs"],
+    "austria": ["austria", "31ufs"],
+    "germany": ["germany", "stuttgart", "32umu"],
+    "stuttgart": ["stuttgart", "32umu"],
+    "poland": ["poland", "34uda"],
+    "czech": ["czech", "33uuu"],
+    "alps": ["alps", "32tlt"],
+    "amazon": ["amazon", "brazil", "20llq", "20llr", "20lmq", "20lmr"],
+    "brazil": ["brazil", "20llq", "20llr", "20lmq", "20lmr"],
+    "california": ["california", "10tfk", "10tgk", "11ska", "11skb"],
+    "sahel": ["sahel", "31pet", "32pnt", "33pvn", "34pea"],
+    "africa": ["africa", "sahel"]
+}
+
+LAND_CLASS_KEYWORDS = {
+    "forest": ["forest", "tree", "woodland"],
+    "agricultural": ["agricultural", "farm", "crop"],
+    "river": ["river", "stream", "water"],
+    "lake": ["lake", "sea"],
+    "residential": ["residential", "urban", "city", "town"],
+    "industrial": ["industrial", "factory"],
+    "highway": ["highway", "road"],
+    "pasture": ["pasture", "grassland"]
+}
+
+_land_class_matcher = KeywordMatcher(LAND_CLASS_KEYWORDS)
+_location_matcher: Optional[KeywordMatcher] = None
+_location_matcher_lock = threading.Lock()
+
+
+def get_location_matcher() -> KeywordMatcher:
+    """Returns the location matcher: built-in aliases plus the optional gazetteer (whole-word), built once."""
+    
+    global _location_matcher
+    with _location_matcher_lock:
+        if _location_matcher is None:
+            matcher = KeywordMatcher(LOCATION_ALIASES)
+            for name, aliases in load_gazetteer(GAZETTEER_PATH).items():
+                matcher.add(name, aliases, whole_word=True)
+            _location_matcher = matcher
+        return _location_matcher
+
+
+def extract_location_names(query: str) -> List[str]:
+    """Extract location names from query."""
+    
+    return get_location_matcher().find_labels(query)
 
 
 def extract_land_class(query: str) -> Optional[str]:
     """Extract land use class from query."""
     
-    query_lower = query.lower()
-    
-    class_keywords = {
-        "forest": ["forest", "tree", "woodland"],
-        "agricultural": ["agricultural", "farm", "crop"],
-        "river": ["river", "stream", "water"],
-        "lake": ["lake", "sea"],
-        "residential": ["residential", "urban", "city", "town"],
-        "industrial": ["industrial", "factory"],
-        "highway": ["highway", "road"],
-        "pasture": ["pasture", "grassland"]
-    }
-    
-    for land_class, keywords in class_keywords.items():
-        if any(kw in query_lower for kw in keywords):
-            return land_class
-    
-    return None
+    return _land_class_matcher.first_label(query)
 
 
 def search_by_location(location_names: List[str], land_class: Optional[str] = None) -> List[Dict]:
     """Search enriched metadata for images matching location and land class."""
     
-    metadata_file = Path("data/metadata/eurosat_metadata_real_coords.jsonl")
+    location_index = get_location_index()
     
-    if not metadata_file.exists():
-        logger.warning(f"Enriched metadata not found: {metadata_file}")
+    if location_index is None:
+        logger.warning(f"Enriched metadata not found: {GEO_METADATA_PATH}")
         return []
     
-    matching_images = []
-    
-    with open(metadata_file, 'r') as f:
-        for line in f:
-            entry = json.loads(line)
-            
-            location = entry.get("location", {})
-            region = location.get("region", "").lower()
-            country = location.get("country", "").lower()
-            tile = entry.get("coordinates", {}).get("source_tile", "").lower()
-            
-            location_match = False
-            for loc_name in location_names:
-                loc_lower = loc_name.lower()
-                if (loc_lower in region or 
-                    loc_lower in country or 
-                    loc_lower in tile or
-                    region.startswith(loc_lower) or
-                    country.startswith(loc_lower)):
-                    location_match = True
-                    break
-            
-            if not location_match:
-                continue
-            
-            if land_class:
-                entry_class = entry.get("class", "").lower()
-                if land_class not in entry_class and entry_class not in land_class:
-                    continue
-            
-            matching_images.append({
-                "filename": entry.get("image_path"),
-                "class": entry.get("class"),
-                "location": location.get("region"),
-                "country": location.get("country"),
-                "coordinates": entry.get("coordinates"),
-                "metadata": entry
-            })
-    
-    return matching_images
+    positions = location_index.search(location_names, land_class)
+    return [location_index.records[i] for i in positions]
+
+
+def search_near_coordinates(lat: float, lon: float, land_class: Optional[str] = None,
+                            radius_km: float = GEO_NEAR_RADIUS_KM, k: int = GEO_MAX_RESULTS) -> Tuple[List[Dict], int, bool]:
+    """
+    Find images near a point using the spatial index over the enriched metadata.
+    
+    Returns the nearest images within radius_km (or the k nearest overall if none fall inside),
+    the number of images inside the radius, and whether the radius was satisfied.
+    """
+    
+    location_index = get_location_index()
+    
+    if location_index is None:
+        logger.warning(f"Enriched metadata not found: {GEO_METADATA_PATH}")
+        return [], 0, False
+    
+    positions, distances = location_index.within_radius(lat, lon, radius_km, land_class)
+    within_radius = len(positions) > 0
+    total = len(positions)
+    if not within_radius:
+        positions, distances = location_index.nearest(lat, lon, k, land_class)
+    
+    results = [
+        {**location_index.records[i], "distance_km": round(float(distance), 3)}
+        for i, distance in zip(positions[:k], distances[:k])
+    ]
+    return results, total, within_radius
 
 
 def geo_node(state: AgentState) -> Dict[str, Any]:
@@ -148,11 +161,22 @@ def geo_node(state: AgentState) -> Dict[str, Any]:
     
     if coordinates:
         lat, lon = coordinates
-        logger.info(f"Extracted coordinates: {lat}, {lon}")
+        radius_km = extract_radius_km(query) or GEO_NEAR_RADIUS_KM
+        logger.info(f"Extracted coordinates: {lat}, {lon} (radius {radius_km} km, land class filter: {land_class})")
+        
+        retrieved_images, results_count, within_radius = search_near_coordinates(lat, lon, land_class, radius_km)
+        
+        logger.info(f"Found {results_count} images within {radius_km} km"
+                    f"{'' if within_radius else f', returning the {len(retrieved_images)} nearest instead'}")
+        
         geo_data = {
             "latitude": lat,
             "longitude": lon,
-            "type": "point"
+            "type": "point",
+            "radius_km": radius_km,
+            "land_class": land_class,
+            "results_count": results_count,
+            "within_radius": within_radius
         }
     elif location_names:
         logger.info(f"Extracted location names: {location_names}")
@@ -163,7 +187,7 @@ def geo_node(state: AgentState) -> Dict[str, Any]:
         logger.info(f"Found {len(matching_images)} images matching location query")
         
         if matching_images:
-            retrieved_images = matching_images[:10]
+            retrieved_images = matching_images[:GEO_MAX_RESULTS]
             
             geo_data = {
                 "location_names": location_names,
@@ -1,41 +1,65 @@
 import logging
 import json
-from typing import Dict, Any
+from typing import Dict, Any, List
 from sat_sight.core.state import AgentState
 from sat_sight.models.llm_router import get_llm_response
 from sat_sight.core.config import DEBUG
+from sat_sight.agents.geo_agent import get_location_matcher
+from sat_sight.utils.keyword_matcher import KeywordMatcher
 import uuid
 
 logger = logging.getLogger(__name__)
 
+KNOWLEDGE_TOPIC_KEYWORDS = {
+    "weather": ["weather", "climate", "rainfall", "drought", "temperature", "storm", "monsoon"],
+    "geographic": ["terrain", "landform", "mountain", "elevation", "valley", "plateau", "topography"],
+    "agriculture": ["crop", "farm", "agricultur", "harvest", "irrigation", "pasture", "vineyard", "orchard"],
+    "urban": ["urban", "city", "cities", "residential", "industrial", "infrastructure", "building", "highway"],
+    "environmental": ["deforestation", "forest", "ecolog", "biodiversity", "conservation", "pollution", "wetland"],
+    "disaster": ["flood", "wildfire", "earthquake", "landslide", "hurricane", "disaster", "tsunami"],
+    "ocean": ["ocean", " sea", "coast", "marine", "shoreline", "lake", "river"],
+}
+
+
+QUERY_CUE_KEYWORDS = {
+    "image_request": ["show me", "display", "view", "find images", "show images", "find pictures", "examples of"],
+    "image": ["image", "picture", "photo", "this", "shown", "see", "visible", "satellite", "aerial"],
+    "web": ["latest", "recent", "news", "current", "today", "update", "new", "2024", "2025"],
+    "location": ["coordinates", "latitude", "longitude", " gps ", " degree", " near ", " in ", " around ", " within ", " km from", " distance from"],
+    "risk": ["risk", "threat", "danger", "vulnerable", "impact", "effect", "consequence"],
+}
+
+_topic_matcher = KeywordMatcher(KNOWLEDGE_TOPIC_KEYWORDS)
+_cue_matcher = KeywordMatcher(QUERY_CUE_KEYWORDS)
+
+
+def detect_knowledge_topics(query_lower: str) -> List[str]:
+    """Returns the knowledge-base categories whose keywords appear in the (lowercased) query."""
+    return _topic_matcher.find_labels(query_lower)
+
 
 def classify_query(query: str, has_image: bool) -> Dict[str, Any]:
     """Classifies the user query to determine routing strategy using heuristics."""
     
     query_lower = query.lower()
-    
-    image_request_keywords = ["show me", "display", "view", "find images", "show images", "find pictures", "examples of"]
-    image_keywords = ["image", "picture", "photo", "this", "shown", "see", "visible", "satellite", "aerial"]
-    web_keywords = ["latest", "recent", "news", "current", "today", "update", "new", "2024", "2025"]
-    location_keywords = ["coordinates", "latitude", "longitude", " gps ", " degree", " near ", " in ", " around ", " within ", " km from", " distance from", "paris", "poland", "switzerland", "germany", "france", "stuttgart", "czech", "brazil", "amazon", "california"]
-    risk_keywords = ["risk", "threat", "danger", "vulnerable", "impact", "effect", "consequence"]
+    cues = set(_cue_matcher.find_labels(query_lower)) # One pass over the query for all cue lists
     
     category = "general_knowledge"
     confidence = 0.8
     
-    has_image_request = any(kw in query_lower for kw in image_request_keywords)
+    has_image_request = "image_request" in cues
     if has_image_request:
         category = "image_search"
         confidence = 0.95
-    elif any(kw in query_lower for kw in web_keywords):
+    elif "web" in cues:
         category = "web_search"
         confidence = 0.95
-    elif any(kw in query_lower for kw in location_keywords):
+    elif "location" in cues or get_location_matcher().matches(query_lower):
         category = "location_query"
         confidence = 0.95
     elif has_image:
-        has_image_ref = any(kw in query_lower for kw in image_keywords)
-        has_risk_ref = any(kw in query_lower for kw in risk_keywords)
+        has_image_ref = "image" in cues
+        has_risk_ref = "risk" in cues
         
         if has_image_ref and not has_risk_ref:
             category = "image_analysis"
@@ -52,6 +76,8 @@ def classify_query(query: str, has_image: bool) -> Dict[str, Any]:
     needs_web_search = category == "web_search"
     needs_wikipedia = category == "general_knowledge" and not needs_web_search and not has_image
     
+    knowledge_topics = detect_knowledge_topics(query_lower)
+
     logger.info(f"Query classified as: {category} (confidence: {confidence:.2f})")
     logger.info(f"Needs - Image: {needs_image}, Text KB: {needs_text_kb}, Web: {needs_web_search}, Wiki: {needs_wikipedia}")
     
@@ -61,6 +87,7 @@ def classify_query(query: str, has_image: bool) -> Dict[str, Any]:
         "needs_text_kb": needs_text_kb,
         "needs_web_search": needs_web_search,
         "needs_wikipedia": needs_wikipedia,
+        "knowledge_topics": knowledge_topics,
         "confidence": confidence
     }
 
@@ -144,6 +171,7 @@ def plan_node(state: AgentState) -> Dict[str, Any]:
         "current_agent": "planner",
         "next_agent": next_agent,
         "planner_decision_category": category,
+        "knowledge_topics": classification["knowledge_topics"],
         "multi_source_needed": multi_source_needed,
         "required_sources": required_sources,
         "completed_sources": [],
@@ -2,11 +2,57 @@ import logging
 from typing import Dict, Any
 from sat_sight.core.state import AgentState
 from sat_sight.models.llm_router import get_llm_response
-from sat_sight.core.config import DEBUG
+from sat_sight.retrieval.web_evidence import select_web_evidence, score_passages
+from sat_sight.utils.context_packer import ContextSection, pack_sections, prompt_budget
+from sat_sight.utils.token_counter import get_token_counter
+from sat_sight.core.config import (
+    DEBUG, LLM_TOKENIZER_NAME, REASONING_CONTEXT_WINDOW, REASONING_MAX_NEW_TOKENS, REASONING_CONTEXT_TOKEN_LIMIT,
+    CONTEXT_SECTION_PRIORS, CONTEXT_EXAMPLES_SCORE
+)
 import uuid
 
 logger = logging.getLogger(__name__)
 
+RESPONSE_EXAMPLES = ( # Worked examples; packed with the lowest score, so they are the first context dropped
+    """Query: "Show me forests"
+BAD: "The query to 'Show me forests' is met with an interesting combination of sources, though none directly provide..."
+GOOD: "I found several forest images in the satellite database. These show dense forest areas with extensive tree coverage, typical of temperate forest ecosystems. Forests play a crucial role in regulating climate, storing carbon, and maintaining biodiversity. They cover about 31% of Earth's land surface and absorb roughly 2.6 billion tons of CO2 annually."
+""",
+    """Query: "What environmental problems does deforestation cause?"
+GOOD: "Deforestation leads to several serious environmental problems. The most immediate impact is habitat loss, which threatens thousands of plant and animal species with extinction. When trees are removed, the area loses its ability to absorb CO2, contributing to climate change - forests normally absorb about 30% of global carbon emissions.
+
+Beyond climate impacts, deforestation causes soil erosion, disrupts water cycles, and can trigger landslides in mountainous regions. It also affects local weather patterns and can lead to reduced rainfall in surrounding areas. Globally, agricultural expansion accounts for about 80% of deforestation, particularly in tropical regions."
+""",
+    """Query: "Analyze this agricultural image"
+GOOD: "This satellite image shows permanent crop agriculture, specifically olive orchards in a Mediterranean region. The terraced landscape helps prevent soil erosion on slopes while supporting long-term tree cultivation. Olive trees are a sustainable crop choice as they're drought-resistant and can produce for decades without replanting.
+
+This type of agriculture differs from annual crops because the trees remain in place year-round, providing better soil stability and some wildlife habitat compared to seasonal croplands. The terracing visible here is a traditional farming technique that helps manage water runoff and maintain soil quality."
+""",
+)
+
+PROMPT_TEMPLATE = """You are a helpful AI assistant specializing in satellite imagery and environmental analysis. Provide clear, conversational answers that are easy to understand.
+
+USER QUERY: {query}
+{context}
+
+INSTRUCTIONS:
+- Write in a natural, friendly tone like ChatGPT or Gemini
+- NO meta-commentary about sources, confidence levels, or system limitations
+- NO phrases like "Based on the image analysis which has a confidence level of 0.0%"
+- NO phrases like "The query is met with..." or "Given the lack of specific data..."
+- Start directly with the answer - don't explain what you're doing
+- Be concise but informative (aim for 200-400 words total)
+- Include specific numbers and facts when available
+- Use simple language - avoid overly technical jargon unless necessary
+
+RESPONSE STRUCTURE:
+1. First paragraph: Direct answer to the question (2-3 sentences)
+2. Second paragraph: Add context and details (3-4 sentences)  
+3. Third paragraph: Additional insights or implications (2-3 sentences, optional)
+
+{examples}Now answer the user's query naturally and conversationally:"""
+
+
 def reasoning_node(state: AgentState) -> Dict[str, Any]:
     """Reasoning Agent: Synthesizes all retrieved information and generates the final response."""
     
@@ -30,84 +76,72 @@ def reasoning_node(state: AgentState) -> Dict[str, Any]:
         logger.error("Reasoning Agent: No query found in state.")
         return {"error_flag": True, "error_message": "Input query is missing.", "next_agent": "end"}
 
-    context_parts = []
-    context_parts.append(f"USER QUERY: {query}")
+    sections = []
 
+    history_items = []
     if memory_context:
-        context_parts.append("\n=== CONVERSATION HISTORY ===")
-        context_parts.append(memory_context)
-        context_parts.append("=== END HISTORY ===\n")
+        history_items = [line for line in memory_context.split("\n") if line.strip()]
         logger.info(f"Reasoning Agent: Using memory context from memory agent ({len(memory_context)} chars)")
     elif short_term_memory:
-        context_parts.append("\n=== CONVERSATION HISTORY ===")
-        for i, turn in enumerate(short_term_memory[-6:]):
-            role = turn.get("role", "unknown")
-            content = turn.get("content", "")
-            context_parts.append(f"{role.upper()}: {content}")
-        context_parts.append("=== END HISTORY ===\n")
-    
-  
-    if episodic_memory:
-        context_parts.append("\n=== RELATED PAST CONVERSATIONS ===")
-        for i, episode in enumerate(episodic_memory[:2]):
-            past_query = episode.get("query", "")
-            past_response = episode.get("response", "")
-            if past_query and len(past_query) < 200:
-                context_parts.append(f"Similar Query: {past_query}")
-                if past_response and len(past_response) < 300:
-                    context_parts.append(f"Previous Answer: {past_response[:300]}...")
-        context_parts.append("=== END RELATED CONVERSATIONS ===\n")
-        logger.info(f"Reasoning Agent: Including {len(episodic_memory)} similar past episodes")
-
-    if wiki_content:
-        context_parts.append(f"\n=== WIKIPEDIA KNOWLEDGE ===\nSource: {wiki_source or 'Wikipedia'}\n{wiki_content}\n=== END WIKIPEDIA ===\n")
-
-    if retrieved_image_metadata:
-        context_parts.append("\n=== IMAGE ANALYSIS ===")
-        for i, meta in enumerate(retrieved_image_metadata[:3]):
-            class_name = meta.get('class', 'N/A')
-            description = meta.get('description', '')
-            region = meta.get('region_hint', meta.get('region', ''))
-            tags = meta.get('tags', [])
-            distance = meta.get('distance', 1.0)
-            similarity = f"{(1 - float(distance)) * 100:.1f}%"
-            
-            meta_str = f"Match {i+1} (Confidence: {similarity}):"
-            meta_str += f"\n  Land Cover Type: {class_name}"
-            if region:
-                meta_str += f"\n  Location: {region}"
-            if description:
-                meta_str += f"\n  Description: {description}"
-            if tags and isinstance(tags, list):
-                meta_str += f"\n  Features: {', '.join(str(t) for t in tags[:5])}"
-            context_parts.append(meta_str)
-        context_parts.append("=== END IMAGE ANALYSIS ===\n")
-
-    if retrieved_text_chunks:
-        context_parts.append("\n=== KNOWLEDGE BASE (Domain Expert Knowledge) ===")
-        for i, chunk in enumerate(retrieved_text_chunks[:3]):
-            content = chunk.get('content', '').strip()
-            source = chunk.get('source', chunk.get('metadata', {}).get('source', 'Internal KB'))
-            if len(content) > 600:
-                content = content[:600] + "..."
-            chunk_str = f"[Source: {source}]\n{content}"
-            context_parts.append(chunk_str)
-        context_parts.append("=== END KNOWLEDGE BASE ===\n")
-
-    if web_snippets:
-        context_parts.append("\n=== WEB SEARCH RESULTS (Recent Information) ===")
-        for i, snippet in enumerate(web_snippets[:3]):
-            title = snippet.get('title', 'No Title')
-            url = snippet.get('url', snippet.get('href', ''))
-            content = snippet.get('content', snippet.get('body', ''))
-            if len(content) > 500:
-                content = content[:500] + "..."
-            snippet_str = f"[{i+1}] {title}\n{content}\nSource: {url}"
-            context_parts.append(snippet_str)
-        context_parts.append("=== END WEB RESULTS ===\n")
-
-    full_context = "\n".join(context_parts)
-    
+        history_items = [f"{turn.get('role', 'unknown').upper()}: {turn.get('content', '')}" for turn in short_term_memory[-6:]]
+    sections.append(ContextSection("history", "\n=== CONVERSATION HISTORY ===", history_items, 0.0,
+                                   footer="=== END HISTORY ===\n", keep_latest=True))
+
+    episode_items = []
+    for episode in episodic_memory[:2]:
+        past_query = episode.get("query", "")
+        past_response = episode.get("response", "")
+        if past_query and len(past_query) < 200:
+            episode_items.append(f"Similar Query: {past_query}" + (f"\nPrevious Answer: {past_response}" if past_response else ""))
+    if episode_items:
+        logger.info(f"Reasoning Agent: Including {len(episode_items)} similar past episodes")
+    sections.append(ContextSection("episodic", "\n=== RELATED PAST CONVERSATIONS ===", episode_items, 0.0,
+                                   footer="=== END RELATED CONVERSATIONS ===\n"))
+
+    wiki_items = [f"Source: {wiki_source or 'Wikipedia'}\n{wiki_content}"] if wiki_content else []
+    sections.append(ContextSection("wikipedia", "\n=== WIKIPEDIA KNOWLEDGE ===", wiki_items, 0.0, footer="=== END WIKIPEDIA ===\n"))
+
+    image_items = []
+    for i, meta in enumerate(retrieved_image_metadata[:3]):
+        class_name = meta.get('class', 'N/A')
+        description = meta.get('description', '')
+        region = meta.get('region_hint', meta.get('region', ''))
+        tags = meta.get('tags', [])
+        distance = meta.get('distance', 1.0)
+        similarity = f"{(1 - float(distance)) * 100:.1f}%"
+
+        meta_str = f"Match {i+1} (Confidence: {similarity}):"
+        meta_str += f"\n  Land Cover Type: {class_name}"
+        if region:
+            meta_str += f"\n  Location: {region}"
+        if description:
+            meta_str += f"\n  Description: {description}"
+        if tags and isinstance(tags, list):
+            meta_str += f"\n  Features: {', '.join(str(t) for t in tags[:5])}"
+        image_items.append(meta_str)
+    sections.append(ContextSection("image", "\n=== IMAGE ANALYSIS ===", image_items, 0.0, footer="=== END IMAGE ANALYSIS ===\n"))
+
+    kb_items = []
+    for chunk in retrieved_text_chunks[:3]:
+        content = chunk.get('content', '').strip()
+        source = chunk.get('source', chunk.get('metadata', {}).get('source', 'Internal KB'))
+        kb_items.append(f"[Source: {source}]\n{content}")
+    sections.append(ContextSection("knowledge_base", "\n=== KNOWLEDGE BASE (Domain Expert Knowledge) ===", kb_items, 0.0,
+                                   footer="=== END KNOWLEDGE BASE ===\n"))
+
+    web_evidence = select_web_evidence(query, web_snippets) if web_snippets else []
+    web_items = [f"[{i+1}] {evidence['title']}\n{evidence['content']}\nSource: {evidence['url']}" for i, evidence in enumerate(web_evidence)]
+    sections.append(ContextSection("web", "\n=== WEB SEARCH RESULTS (Recent Information) ===", web_items, 0.0,
+                                   footer="=== END WEB RESULTS ===\n"))
+
+    filled = [section for section in sections if section.items]
+    if filled:
+        relevance = score_passages(query, ["\n".join(section.items)[:2000] for section in filled]) # Shared embedder; remote in service mode
+        for section, score in zip(filled, relevance):
+            section.score = CONTEXT_SECTION_PRIORS.get(section.name, 0.5) * (0.5 + 0.5 * min(max(float(score), 0.0), 1.0))
+    sections.append(ContextSection("examples", "EXAMPLES OF GOOD RESPONSES:\n", list(RESPONSE_EXAMPLES), CONTEXT_EXAMPLES_SCORE,
+                                   allow_partial=False))
+
     query_lower = query.lower()
     is_what_question = query_lower.startswith(("what", "which"))
     is_why_question = query_lower.startswith("why")
@@ -125,47 +159,21 @@ def reasoning_node(state: AgentState) -> Dict[str, Any]:
     else:
         specific_instruction = "Provide a comprehensive, factual response."
 
-    prompt = f"""You are a helpful AI assistant specializing in satellite imagery and environmental analysis. Provide clear, conversational answers that are easy to understand.
-
-{full_context}
-
-INSTRUCTIONS:
-- Write in a natural, friendly tone like ChatGPT or Gemini
-- NO meta-commentary about sources, confidence levels, or system limitations
-- NO phrases like "Based on the image analysis which has a confidence level of 0.0%"
-- NO phrases like "The query is met with..." or "Given the lack of specific data..."
-- Start directly with the answer - don't explain what you're doing
-- Be concise but informative (aim for 200-400 words total)
-- Include specific numbers and facts when available
-- Use simple language - avoid overly technical jargon unless necessary
-
-RESPONSE STRUCTURE:
-1. First paragraph: Direct answer to the question (2-3 sentences)
-2. Second paragraph: Add context and details (3-4 sentences)  
-3. Third paragraph: Additional insights or implications (2-3 sentences, optional)
-
-EXAMPLES OF GOOD RESPONSES:
-
-Query: "Show me forests"
-BAD: "The query to 'Show me forests' is met with an interesting combination of sources, though none directly provide..."
-GOOD: "I found several forest images in the satellite database. These show dense forest areas with extensive tree coverage, typical of temperate forest ecosystems. Forests play a crucial role in regulating climate, storing carbon, and maintaining biodiversity. They cover about 31% of Earth's land surface and absorb roughly 2.6 billion tons of CO2 annually."
-
-Query: "What environmental problems does deforestation cause?"
-GOOD: "Deforestation leads to several serious environmental problems. The most immediate impact is habitat loss, which threatens thousands of plant and animal species with extinction. When trees are removed, the area loses its ability to absorb CO2, contributing to climate change - forests normally absorb about 30% of global carbon emissions.
-
-Beyond climate impacts, deforestation causes soil erosion, disrupts water cycles, and can trigger landslides in mountainous regions. It also affects local weather patterns and can lead to reduced rainfall in surrounding areas. Globally, agricultural expansion accounts for about 80% of deforestation, particularly in tropical regions."
-
-Query: "Analyze this agricultural image"
-GOOD: "This satellite image shows permanent crop agriculture, specifically olive orchards in a Mediterranean region. The terraced landscape helps prevent soil erosion on slopes while supporting long-term tree cultivation. Olive trees are a sustainable crop choice as they're drought-resistant and can produce for decades without replanting.
-
-This type of agriculture differs from annual crops because the trees remain in place year-round, providing better soil stability and some wildlife habitat compared to seasonal croplands. The terracing visible here is a traditional farming technique that helps manage water runoff and maintain soil quality."
+    counter = get_token_counter(LLM_TOKENIZER_NAME)
+    fixed_prompt = PROMPT_TEMPLATE.format(query=query, context="", examples="")
+    budget = prompt_budget(REASONING_CONTEXT_WINDOW, REASONING_MAX_NEW_TOKENS, counter.count(fixed_prompt),
+                           limit=REASONING_CONTEXT_TOKEN_LIMIT, exact=counter.exact)
+    packed, used_tokens = pack_sections(sections, budget, counter)
+    logger.info(f"Reasoning Agent: Packed context into {sum(used_tokens.values())}/{budget} tokens: {used_tokens}")
 
-Now answer the user's query naturally and conversationally:"""
+    full_context = "\n".join(packed[section.name] for section in sections if section.name != "examples" and packed[section.name])
+    examples = f"{packed['examples']}\n" if packed["examples"] else ""
+    prompt = PROMPT_TEMPLATE.format(query=query, context=full_context, examples=examples)
 
     try:
         llm_result = get_llm_response(
             prompt=prompt,
-            max_tokens=500,
+            max_tokens=REASONING_MAX_NEW_TOKENS,
             temperature=0.2
         )
 
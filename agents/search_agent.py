@@ -1,12 +1,12 @@
 import logging
 from typing import Dict, Any
 from sat_sight.core.state import AgentState
-from sat_sight.tools.search_wrapper import DuckDuckGoSearchTool
+from sat_sight.tools.web_search import get_web_search_router
 from sat_sight.core.config import DEBUG
 
 logger = logging.getLogger(__name__)
 
-search_tool = DuckDuckGoSearchTool(max_results=3) 
+search_tool = get_web_search_router() # Shared with tavily_search_agent; races the available providers
 
 def search_node(state: AgentState) -> Dict[str, Any]:
     """
@@ -1,23 +1,20 @@
 import logging
 from typing import Dict, Any
 from sat_sight.core.state import AgentState
-from sat_sight.tools.tavily_search_wrapper import TavilySearchTool
+from sat_sight.tools.web_search import get_web_search_router
 from sat_sight.core.config import DEBUG
 
 logger = logging.getLogger(__name__)
 
-try:
-    tavily_search_tool = TavilySearchTool(max_results=3) 
-except ValueError as e:
-    logger.error(f"Failed to initialize TavilySearchTool: {e}")
-    tavily_search_tool = None 
+web_search_router = get_web_search_router() # Tavily and DuckDuckGo, raced/hedged
 
 def tavily_search_node(state: AgentState) -> Dict[str, Any]:
     """
     The Tavily Search Agent node function for LangGraph.
 
     This agent takes the user's query (and potentially context from other agents)
-    and performs a web search using Tavily to retrieve relevant, structured information.
+    and performs a web search through the shared web search router (Tavily first while it is
+    the faster provider, hedged to DuckDuckGo when it is slow or failing).
     In a multi-source flow, this is typically the last retrieval step before reasoning.
 
     Args:
@@ -37,19 +34,19 @@ def tavily_search_node(state: AgentState) -> Dict[str, Any]:
             "next_agent": state.get("next_agent", "reasoning_agent")
         }
 
-    if not tavily_search_tool:
-         logger.error("Tavily Search Agent: Tavily client is not available (missing API key?). Returning empty results.")
+    if not web_search_router.providers:
+         logger.error("Tavily Search Agent: No web search provider is available (missing API key?). Returning empty results.")
          return {
             "web_snippets": [], # Use the correct key name from AgentState
             "current_agent": "tavily_search_agent",
             "next_agent": "memory_agent",  # Still route to memory even on error
             "error_flag": True,
-            "error_message": "Tavily API client not initialized (check TAVILY_API_KEY)."
+            "error_message": "No web search provider initialized (check TAVILY_API_KEY / duckduckgo_search)."
         }
 
-    retrieved_snippets = tavily_search_tool.search(query)
+    retrieved_snippets, provider = web_search_router.search_with_provider(query)
 
-    logger.info(f"Tavily Search Agent: Retrieved {len(retrieved_snippets)} web snippets.")
+    logger.info(f"Tavily Search Agent: Retrieved {len(retrieved_snippets)} web snippets from {provider}.")
 
     logger.debug(f"DEBUG: Tavily Search Agent retrieved snippets: {retrieved_snippets}")
 
@@ -1,22 +1,42 @@
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List
 from sat_sight.core.state import AgentState
-from sat_sight.retrieval.chroma_manager import ChromaManager
-from sat_sight.core.config import CHROMA_RETRIEVAL_K, DEBUG
+from sat_sight.retrieval.service_client import create_chroma_manager, create_reranker
+from sat_sight.core.config import CHROMA_RETRIEVAL_K, METADATA_FILTER_MIN_MATCHES, DEBUG
 
 logger = logging.getLogger(__name__)
 
 try:
-    from sat_sight.retrieval.reranker import Reranker
+    from sat_sight.retrieval.reranker import record_rerank_depth
     RERANK_TOP_K = 5  
-    text_reranker = Reranker(model_name="cross-encoder/ms-marco-MiniLM-L-6-v2")
+    text_reranker = create_reranker(model_name="cross-encoder/ms-marco-MiniLM-L-6-v2")
     RERANKER_AVAILABLE = True
 except ImportError:
     logger.warning("Reranker not available, skipping reranking")
     RERANKER_AVAILABLE = False
     RERANK_TOP_K = None
 
-chroma_manager = ChromaManager()
+chroma_manager = create_chroma_manager() # In-process store, or the shared retrieval service if RETRIEVAL_SERVICE_URL is set
+
+
+def build_metadata_filters(state: AgentState) -> Dict[str, List[str]]:
+    """
+    Derives knowledge-base metadata filters from earlier agents' output:
+    the planner's knowledge topics and, when the vision agent ran, the top image class.
+
+    Args:
+        state (AgentState): The current state.
+
+    Returns:
+        Dict[str, List[str]]: Metadata field -> acceptable values (fields without values are omitted).
+    """
+    filters = {}
+    if state.get("knowledge_topics"):
+        filters["category"] = list(state["knowledge_topics"])
+    image_metadata = state.get("retrieved_image_metadata") or []
+    if image_metadata and image_metadata[0].get("class"):
+        filters["class"] = [image_metadata[0]["class"]]
+    return filters
 
 def text_retrieval_node(state: AgentState) -> Dict[str, Any]:
     """
@@ -45,19 +65,31 @@ def text_retrieval_node(state: AgentState) -> Dict[str, Any]:
             "next_agent": state.get("next_agent", "reasoning_agent") 
         }
 
+    rerank_depth = None
+
     try:
-        retrieved_results = chroma_manager.query(query, k=CHROMA_RETRIEVAL_K)
+        query_embedding = state.get("query_embedding")
+        if query_embedding is None:
+            query_embedding = chroma_manager.embed_queries([query])[0]
+        where = chroma_manager.build_where(
+            build_metadata_filters(state), min_matches=max(METADATA_FILTER_MIN_MATCHES, CHROMA_RETRIEVAL_K)
+        )
+        if where:
+            logger.info(f"Text Retrieval Agent: Filtering knowledge base with {where}")
+        retrieved_results = chroma_manager.query(query, k=CHROMA_RETRIEVAL_K, query_embedding=query_embedding, where=where)
 
         logger.info(f"Text Retrieval Agent: Retrieved {len(retrieved_results)} text chunks from ChromaDB.")
 
         if query and retrieved_results and RERANKER_AVAILABLE:
             logger.info(f"Text Retrieval Agent: Reranking {len(retrieved_results)} results")
             try:
-                reranked_results = text_reranker.rerank_text_chunks(
+                reranked_results, rerank_depth = text_reranker.rerank_adaptive(
                     query=query,
-                    chunks=retrieved_results,
+                    items=retrieved_results,
+                    text_key="content",
                     top_k=min(RERANK_TOP_K, len(retrieved_results))
                 )
+                record_rerank_depth("text_retrieval_agent", query, rerank_depth, len(retrieved_results))
                 logger.info(f"Text Retrieval Agent: Reranked to top {len(reranked_results)} results")
             except Exception as e:
                 logger.warning(f"Reranking failed: {e}. Using original results.")
@@ -65,6 +97,10 @@ def text_retrieval_node(state: AgentState) -> Dict[str, Any]:
         else:
             reranked_results = retrieved_results
 
+        rerank_depths = dict(state.get("rerank_depths") or {})
+        if rerank_depth is not None:
+            rerank_depths["text_retrieval_agent"] = rerank_depth
+
         required_sources = state.get("required_sources", [])
         next_agent_decided = "reasoning_agent"
         
@@ -95,6 +131,8 @@ def text_retrieval_node(state: AgentState) -> Dict[str, Any]:
             updates = {
                 "current_agent": "text_retrieval_agent",
                 "retrieved_text_chunks": reranked_results,
+                "query_embedding": query_embedding,
+                "rerank_depths": rerank_depths,
                 "completed_sources": completed_sources,
                 "next_agent": next_agent_decided
             }
@@ -103,6 +141,8 @@ def text_retrieval_node(state: AgentState) -> Dict[str, Any]:
             updates = {
                 "current_agent": "text_retrieval_agent",
                 "retrieved_text_chunks": reranked_results,
+                "query_embedding": query_embedding,
+                "rerank_depths": rerank_depths,
                 "next_agent": "memory_agent"
             }
 
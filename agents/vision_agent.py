@@ -4,14 +4,20 @@ import os
 from sat_sight.core.state import AgentState
 from sat_sight.retrieval.clip_encoder import CLIPEncoder
 from sat_sight.retrieval.faiss_manager import FAISSManager
-from sat_sight.core.config import FAISS_RETRIEVAL_K, DEBUG
+from sat_sight.retrieval.service_client import create_faiss_manager, create_reranker, create_text_embedder
+from sat_sight.retrieval.image_preprocess import read_image_size
+from sat_sight.retrieval.tiling import aggregate_tile_matches
+from sat_sight.core.config import (
+    FAISS_RETRIEVAL_K, DEBUG, TILED_ENCODING_ENABLED, TILE_MIN_IMAGE_SIDE, TILE_NEIGHBOURS_K,
+    IMAGE_RERANK_USE_EMBEDDINGS, IMAGE_RERANK_CROSS_ENCODER_TOP_N, TEXT_EMBEDDING_MODEL_NAME
+)
 
 logger = logging.getLogger(__name__)
 
 try:
-    from sat_sight.retrieval.reranker import Reranker
+    from sat_sight.retrieval.reranker import record_rerank_depth
     RERANK_TOP_K = 5  # Increased from 3
-    vision_reranker = Reranker(model_name="cross-encoder/ms-marco-MiniLM-L-6-v2")
+    vision_reranker = create_reranker(model_name="cross-encoder/ms-marco-MiniLM-L-6-v2")
     RERANKER_AVAILABLE = True
 except ImportError:
     logger.warning("Reranker not available, skipping reranking")
@@ -21,7 +27,19 @@ except ImportError:
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 clip_encoder = CLIPEncoder()
-faiss_manager = FAISSManager()
+faiss_manager = create_faiss_manager() # In-process index, or the shared retrieval service if RETRIEVAL_SERVICE_URL is set
+
+text_embedder = None
+if IMAGE_RERANK_USE_EMBEDDINGS:
+    try:
+        text_embedder = create_text_embedder(TEXT_EMBEDDING_MODEL_NAME)
+        is_local_index = isinstance(faiss_manager, FAISSManager) # The service builds its own description embeddings
+        if is_local_index and faiss_manager.index.ntotal and faiss_manager.description_model_name != TEXT_EMBEDDING_MODEL_NAME:
+            logger.info("Description embeddings missing or stale, building them once for this index.")
+            faiss_manager.build_description_embeddings(text_embedder.encode, model_name=TEXT_EMBEDDING_MODEL_NAME)
+    except Exception as e:
+        logger.warning(f"Description embeddings unavailable ({e}), image reranking will use the cross-encoder.")
+        text_embedder = None
 
 
 def vision_node(state: AgentState) -> dict:
@@ -56,6 +74,8 @@ def vision_node(state: AgentState) -> dict:
             "next_agent": state.get("next_agent", "reasoning_agent")
         }
     
+    tile_class_summary = None
+
     try:
         if is_text_search:
             logger.info(f"Vision Agent: Performing text-based image search for: '{query}'")
@@ -78,21 +98,60 @@ def vision_node(state: AgentState) -> dict:
                     "next_agent": "text_retrieval_agent"
                 }
             
-            image_embedding = clip_encoder.encode_image(image_path)
-            image_embedding_np = image_embedding.numpy()
+            if TILED_ENCODING_ENABLED and min(read_image_size(image_path)) >= TILE_MIN_IMAGE_SIDE:
+                logger.info(f"Vision Agent: Large scene, using tiled encoding")
+                tile_embeddings, tile_boxes = clip_encoder.encode_image_tiles(image_path)
+                tile_distances, tile_metadata = faiss_manager.search_batch(tile_embeddings, k=TILE_NEIGHBOURS_K)
+                retrieved_metadata_list, distances, tile_class_summary = aggregate_tile_matches(
+                    tile_distances, tile_metadata, tile_boxes, k=FAISS_RETRIEVAL_K
+                )
+                scene_embedding = tile_embeddings.mean(axis=0)
+                image_embedding_np = scene_embedding / np.linalg.norm(scene_embedding)
+                logger.info(f"Vision Agent: {len(tile_boxes)} tiles matched {len(tile_class_summary)} classes")
+            else:
+                image_embedding = clip_encoder.encode_image(image_path)
+                image_embedding_np = image_embedding.numpy()
 
-        distances, retrieved_metadata_list = faiss_manager.search(image_embedding_np, k=FAISS_RETRIEVAL_K)
+        if tile_class_summary is None:
+            distances, retrieved_metadata_list = faiss_manager.search(image_embedding_np, k=FAISS_RETRIEVAL_K)
 
         logger.info(f"Vision Agent: Retrieved {len(retrieved_metadata_list)} similar images from FAISS.")
 
+        retrieved_metadata_list = [
+            {**meta, "retrieval_score": float(score)} for meta, score in zip(retrieved_metadata_list, distances)
+        ]
+
+        query_embedding_np = None
+        description_embeddings = None
+        rerank_depth = None
+        if query and retrieved_metadata_list and text_embedder is not None:
+            description_embeddings = faiss_manager.get_description_embeddings(retrieved_metadata_list)
+            if description_embeddings is not None:
+                query_embedding_np = text_embedder.encode_query(query)
+
         if query and retrieved_metadata_list and RERANKER_AVAILABLE:
             logger.info(f"Vision Agent: Reranking {len(retrieved_metadata_list)} results")
             try:
-                reranked_metadata_list = vision_reranker.rerank_image_metadata(
-                    query=query,
-                    metadata_list=retrieved_metadata_list,
-                    top_k=min(RERANK_TOP_K, len(retrieved_metadata_list))
-                )
+                if query_embedding_np is not None:
+                    reranked_metadata_list = vision_reranker.rerank_by_embeddings(
+                        query=query,
+                        items=retrieved_metadata_list,
+                        query_embedding=query_embedding_np,
+                        item_embeddings=description_embeddings,
+                        top_k=min(RERANK_TOP_K, len(retrieved_metadata_list)),
+                        final_top_n=IMAGE_RERANK_CROSS_ENCODER_TOP_N
+                    )
+                    if IMAGE_RERANK_CROSS_ENCODER_TOP_N > 0: # Depth is only meaningful when the cross-encoder ran
+                        rerank_depth = min(IMAGE_RERANK_CROSS_ENCODER_TOP_N, len(retrieved_metadata_list))
+                else:
+                    reranked_metadata_list, rerank_depth = vision_reranker.rerank_adaptive(
+                        query=query,
+                        items=retrieved_metadata_list,
+                        text_key="description",
+                        top_k=min(RERANK_TOP_K, len(retrieved_metadata_list))
+                    )
+                if rerank_depth is not None:
+                    record_rerank_depth("vision_agent", query, rerank_depth, len(retrieved_metadata_list))
                 logger.info(f"Vision Agent: Reranked to top {len(reranked_metadata_list)} results")
             except Exception as e:
                 logger.warning(f"Reranking failed: {e}. Using original results.")
@@ -105,9 +164,13 @@ def vision_node(state: AgentState) -> dict:
         updates = {
             "current_agent": "vision_agent",
             "image_embedding": image_embedding_np, 
-            "retrieved_image_metadata": retrieved_metadata_list, 
-            "retrieved_image_distances": distances, 
+            "query_embedding": query_embedding_np,
+            "retrieved_image_metadata": reranked_metadata_list, 
+            "retrieved_image_distances": [meta.get("retrieval_score", 0.0) for meta in reranked_metadata_list], 
+            "tile_class_summary": tile_class_summary,
         }
+        if rerank_depth is not None:
+            updates["rerank_depths"] = {**(state.get("rerank_depths") or {}), "vision_agent": rerank_depth}
 
         query = state.get("query", "").lower() 
         multi_source_needed = state.get("multi_source_needed", False)
@@ -138,7 +201,7 @@ def vision_node(state: AgentState) -> dict:
             
             updates["completed_sources"] = completed_sources
         else:
-            primary_image_meta = retrieved_metadata_list[0] if retrieved_metadata_list else {}
+            primary_image_meta = reranked_metadata_list[0] if reranked_metadata_list else {}
             image_class = primary_image_meta.get("class", "")
             
             web_search_indicators = ["recent", "latest", "news", "report", "current", "today"]
@@ -8,6 +8,16 @@ logger = logging.getLogger(__name__)
 
 wiki_fetcher = WikiFetcher(max_sentences=8) # Configure summary length (reduced for conciseness)
 
+STOP_WORDS = frozenset({
+    "what", "is", "are", "the", "a", "an", "how", "why", "when", "where", "about",
+    "this", "that", "these", "those", "can", "could", "would", "should", "do", "does",
+    "in", "on", "at", "to", "for", "of", "with", "from", "by", "and", "or", "but"
+})
+PRIORITY_KEYWORDS = frozenset({
+    "deforestation", "climate", "agriculture", "forest", "land", "crop",
+    "environmental", "conservation", "biodiversity", "erosion"
+})
+
 def wikipedia_node(state: AgentState) -> Dict[str, Any]:
     """
     The Wikipedia Agent node function for LangGraph.
@@ -32,16 +42,8 @@ def wikipedia_node(state: AgentState) -> Dict[str, Any]:
             logger.info(f"Wikipedia Agent: Using class label '{class_label}' for search.")
     
     if not search_term and query:
-        stop_words = {
-            "what", "is", "are", "the", "a", "an", "how", "why", "when", "where", "about",
-            "this", "that", "these", "those", "can", "could", "would", "should", "do", "does",
-            "in", "on", "at", "to", "for", "of", "with", "from", "by", "and", "or", "but"
-        }
-        words = [w.strip("?.,!") for w in query.lower().split() if w not in stop_words and len(w) > 3]
-        
-        priority_keywords = ["deforestation", "climate", "agriculture", "forest", "land", "crop", 
-                            "environmental", "conservation", "biodiversity", "erosion"]
-        priority_words = [w for w in words if w in priority_keywords]
+        words = [w.strip("?.,!") for w in query.lower().split() if w not in STOP_WORDS and len(w) > 3]
+        priority_words = [w for w in words if w in PRIORITY_KEYWORDS]
         
         if priority_words:
             search_term = " ".join(priority_words[:2])
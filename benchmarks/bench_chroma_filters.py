@@ -0,0 +1,91 @@
+"""
+Benchmark: filtered vs. unfiltered ChromaDB knowledge-base queries.
+
+Usage:
+    python -m sat_sight.benchmarks.bench_chroma_filters --docs 50000 --queries 200
+
+Builds a throwaway collection of synthetic chunks with skewed 'category' and 'class'
+metadata, then times dense queries without a filter and with the where clauses
+ChromaManager.build_where() produces (single field, $in and $and). Precomputed random
+embeddings are used, so no embedding model is downloaded.
+"""
+import argparse
+import tempfile
+import time
+import chromadb
+import numpy as np
+from sat_sight.retrieval.metadata_index import MetadataIndex
+
+CATEGORIES = ["agriculture", "urban", "environmental", "weather", "ocean", "geographic", "disaster"]
+CLASSES = ["AnnualCrop", "Forest", "HerbaceousVegetation", "Highway", "Industrial",
+           "Pasture", "PermanentCrop", "Residential", "River", "SeaLake"]
+
+
+def build_collection(path: str, num_docs: int, dim: int, batch_size: int = 5000):
+    """Creates a persistent collection with num_docs synthetic chunks; returns it and its metadata index."""
+    rng = np.random.default_rng(0)
+    client = chromadb.PersistentClient(path=path)
+    collection = client.create_collection("bench_filters", embedding_function=None)
+    index = MetadataIndex(("category", "class"))
+    category_p = np.array([0.3, 0.25, 0.15, 0.12, 0.08, 0.06, 0.04])
+
+    batch_size = min(batch_size, client.get_max_batch_size())
+    for start in range(0, num_docs, batch_size):
+        count = min(batch_size, num_docs - start)
+        ids = [f"doc-{i}" for i in range(start, start + count)]
+        embeddings = rng.normal(size=(count, dim)).astype(np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        metadatas = [
+            {"category": CATEGORIES[c], "class": CLASSES[k]}
+            for c, k in zip(rng.choice(len(CATEGORIES), size=count, p=category_p), rng.integers(0, len(CLASSES), size=count))
+        ]
+        collection.add(ids=ids, embeddings=embeddings, documents=[f"chunk {i}" for i in ids], metadatas=metadatas)
+        index.add(ids, metadatas)
+    return collection, index
+
+
+def time_queries(collection, queries: np.ndarray, k: int, where) -> np.ndarray:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        collection.query(query_embeddings=query[None, :], n_results=k, where=where, include=["distances"])
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=50000, help="Synthetic chunks in the collection.")
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension (bge-small: 384).")
+    parser.add_argument("--queries", type=int, default=200, help="Timed queries per case.")
+    parser.add_argument("--k", type=int, default=10, help="Results per query.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    queries = rng.normal(size=(args.queries, args.dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    cases = {
+        "unfiltered": None,
+        "category=agriculture": {"category": "agriculture"},
+        "category=disaster": {"category": "disaster"},
+        "category in (weather, ocean)": {"category": {"$in": ["weather", "ocean"]}},
+        "class=Forest": {"class": "Forest"},
+        "category=environmental AND class=Forest": {"$and": [{"category": "environmental"}, {"class": "Forest"}]},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        collection, index = build_collection(tmp, args.docs, args.dim)
+        print(f"Built {args.docs} chunks in {time.perf_counter() - start:.1f}s")
+
+        time_queries(collection, queries[:10], args.k, None) # Warm up
+        print(f"{'filter':<44}{'selected':>10}{'p50 ms':>10}{'p95 ms':>10}")
+        for label, where in cases.items():
+            selected = args.docs if where is None else len(index.match(where))
+            latencies = time_queries(collection, queries, args.k, where)
+            print(f"{label:<44}{selected:>10}{np.percentile(latencies, 50):>10.2f}{np.percentile(latencies, 95):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark: full-size PIL preprocessing vs. the reduced-resolution fast path
+on large synthetic satellite scenes (JPEG, plain TIFF, pyramidal TIFF).
+
+Usage:
+    python -m sat_sight.benchmarks.bench_image_preprocess --sizes 4000 10980 --repeats 3
+
+Each (variant, file) pair runs in a fresh process so peak RSS is measured in isolation (Linux only).
+"""
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+import time
+import numpy as np
+from PIL import Image
+from sat_sight.retrieval.image_preprocess import preprocess_image, normalize, CLIP_MEAN, CLIP_STD
+
+Image.MAX_IMAGE_PIXELS = None # Synthetic scenes are intentionally large
+
+
+def baseline_preprocess(image_path: str, size: int = 224) -> np.ndarray:
+    """Mirrors the open_clip eval transform: full decode, RGB convert, bicubic resize, center crop."""
+    image = Image.open(image_path).convert("RGB")
+    width, height = image.size
+    scale = size / min(width, height)
+    image = image.resize((max(size, round(width * scale)), max(size, round(height * scale))), Image.BICUBIC)
+    left, top = (image.width - size) // 2, (image.height - size) // 2
+    image = image.crop((left, top, left + size, top + size))
+    return normalize(np.asarray(image, dtype=np.float32), CLIP_MEAN, CLIP_STD)
+
+
+def make_scene(directory: str, side: int) -> dict:
+    """Writes a synthetic textured scene in the formats we receive from users."""
+    y, x = np.mgrid[0:side, 0:side].astype(np.float32) / side
+    rng = np.random.default_rng(0)
+    noise = rng.integers(0, 40, size=(side, side), dtype=np.uint8)
+    scene = np.stack([
+        (np.sin(x * 40) * 60 + 120).astype(np.uint8) + noise,
+        (np.cos(y * 30) * 60 + 120).astype(np.uint8),
+        ((x + y) * 100).astype(np.uint8) + noise // 2,
+    ], axis=-1)
+    image = Image.fromarray(scene)
+    del scene, noise, x, y
+
+    paths = {
+        "jpeg": os.path.join(directory, f"scene_{side}.jpg"),
+        "tiff": os.path.join(directory, f"scene_{side}.tif"),
+        "tiff_pyramid": os.path.join(directory, f"scene_{side}_pyramid.tif"),
+    }
+    image.save(paths["jpeg"], quality=90)
+    image.save(paths["tiff"])
+    overviews = [image.reduce(2 ** level) for level in range(1, 6)]
+    image.save(paths["tiff_pyramid"], save_all=True, append_images=overviews)
+    return paths
+
+
+def _rss_mib(field: str) -> float:
+    """Reads VmRSS / VmHWM (peak) from /proc/self/status, in MiB."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024.0
+    return 0.0
+
+
+def _run_case(args):
+    variant, image_path, repeats = args
+    fn = preprocess_image if variant == "fast" else baseline_preprocess
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5") # Reset the peak RSS watermark (Linux >= 4.0)
+    rss_before = _rss_mib("VmRSS")
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(image_path)
+        timings.append(time.perf_counter() - start)
+    return min(timings), _rss_mib("VmHWM") - rss_before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4000, 10980], help="Scene side lengths in pixels.")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per case (best is reported).")
+    args = parser.parse_args()
+
+    ctx = mp.get_context("spawn")
+    print(f"{'scene':<28}{'variant':<10}{'best ms':>10}{'peak MiB':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for side in args.sizes:
+            for label, path in make_scene(tmp, side).items():
+                for variant in ("baseline", "fast"):
+                    with ctx.Pool(1) as pool:
+                        best, peak = pool.apply(_run_case, ((variant, path, args.repeats),))
+                    print(f"{label + '_' + str(side):<28}{variant:<10}{best * 1000:>10.1f}{peak:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Score parity and latency check: torch CrossEncoder vs. the int8 ONNX Runtime backend.
+
+Usage:
+    python -m sat_sight.benchmarks.check_reranker_parity --repeats 20
+
+Exits with status 1 if the ONNX scores drift beyond the tolerances, so it can gate
+switching RERANK_BACKEND to "onnx" on a new model or onnxruntime version.
+"""
+import argparse
+import sys
+import time
+from sentence_transformers import CrossEncoder
+from sat_sight.core.config import RERANK_MODEL_NAME, RERANK_BATCH_SIZE
+from sat_sight.retrieval.onnx_cross_encoder import ONNXCrossEncoder, check_score_parity
+
+QUERIES = [
+    "What are the environmental impacts of deforestation in the Amazon?",
+    "How is NDVI computed from Sentinel-2 bands?",
+    "Show me industrial areas near rivers",
+    "Which crops are grown in permanent crop regions of southern Europe?",
+]
+
+DOCUMENTS = [
+    "Dense forest with continuous tree canopy, typical of temperate or tropical woodland.",
+    "Annual crop fields with regular geometric parcels, seasonal cultivation patterns.",
+    "Permanent crops such as olive groves, vineyards and orchards, often terraced on slopes.",
+    "Industrial buildings, warehouses and large flat roofs with adjacent parking and roads.",
+    "A river channel with riparian vegetation along its banks.",
+    "Highway or major road crossing agricultural land.",
+    "NDVI is computed as (NIR - Red) / (NIR + Red); for Sentinel-2 this uses bands B8 and B4.",
+    "Deforestation in the Amazon reduces carbon storage, disrupts rainfall and threatens biodiversity.",
+    "Residential area with dense housing blocks and small gardens.",
+    "Sea or lake water body with uniform dark spectral response.",
+]
+
+
+def _time(fn, pairs, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(pairs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=RERANK_MODEL_NAME, help="Cross-encoder to compare.")
+    parser.add_argument("--repeats", type=int, default=10, help="Timed runs per backend (best is reported).")
+    parser.add_argument("--max-abs-diff", type=float, default=0.1, help="Largest acceptable score difference.")
+    parser.add_argument("--min-rank-correlation", type=float, default=0.98, help="Smallest acceptable Spearman rho.")
+    args = parser.parse_args()
+
+    reference = CrossEncoder(args.model)
+    candidate = ONNXCrossEncoder(args.model)
+    ref_predict = lambda pairs: reference.predict(pairs, batch_size=RERANK_BATCH_SIZE)
+    onnx_predict = lambda pairs: candidate.predict(pairs, batch_size=RERANK_BATCH_SIZE)
+
+    all_passed = True
+    for query in QUERIES:
+        pairs = [[query, doc] for doc in DOCUMENTS]
+        result = check_score_parity(ref_predict, onnx_predict, pairs, args.max_abs_diff, args.min_rank_correlation)
+        all_passed &= result["passed"]
+        print(f"{query[:60]:<62} max|d|={result['max_abs_diff']:.4f} rho={result['rank_correlation']:.4f} "
+              f"{'OK' if result['passed'] else 'FAIL'}")
+
+    pairs = [[query, doc] for query in QUERIES for doc in DOCUMENTS]
+    torch_ms = _time(ref_predict, pairs, args.repeats) * 1000
+    onnx_ms = _time(onnx_predict, pairs, args.repeats) * 1000
+    print(f"{len(pairs)} pairs: torch {torch_ms:.1f} ms, onnx int8 {onnx_ms:.1f} ms ({torch_ms / max(onnx_ms, 1e-6):.2f}x)")
+
+    sys.exit(0 if all_passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -18,11 +18,35 @@ LOCAL_LLM_PARAMS = {
 
 RERANK_MODEL_NAME = "cross-encoder/ms-marco-MiniLM-L-6-v2" # Model for cross-encoder reranking
 RERANK_TOP_K = 5 # Number of results to keep after reranking (increased from 3)
+RERANK_BATCH_SIZE = 32 # (query, document) pairs per cross-encoder forward pass
+RERANK_CACHE_SIZE = 20000 # (query, document-hash) scores kept in the reranker LRU cache
+RERANK_MICRO_BATCHING = True # Merge concurrent rerank requests into shared forward passes
+RERANK_MAX_WAIT_MS = 5.0 # Max time a rerank request waits for others to join its batch
+RERANK_BACKEND = os.getenv("RERANK_BACKEND", "torch") # "torch" (fp32 CrossEncoder) or "onnx" (int8 ONNX Runtime)
+RERANK_MAX_SEQ_LENGTH = 256 # Fixed max (query + document) tokens for the ONNX backend
+RERANK_ONNX_DIR = os.path.join(BASE_DIR, "data/models/onnx") # Exported/quantised cross-encoder files
+RERANK_MIN_DEPTH = 5 # Candidates always scored by the cross-encoder
+RERANK_DEPTH_STEP = 2 # Candidates scored per extension when the ranking is not yet decisive
+RERANK_DECISIVE_K = 3 # Rank position that must lead deeper candidates (reasoning uses the top 3)
+RERANK_DECISIVE_MARGIN = 2.0 # Cross-encoder score lead (ms-marco logits) treated as decisive
+RERANK_DEPTH_LOG_PATH = os.path.join(BASE_DIR, "data/metrics/rerank_depth.jsonl") # Per-query depth log ("" disables)
+
+TEXT_EMBEDDING_MODEL_NAME = "BAAI/bge-small-en-v1.5" # Bi-encoder shared by ChromaDB and description reranking
+TEXT_EMBEDDING_BATCH_SIZE = 64 # Texts per bi-encoder forward pass
+IMAGE_RERANK_USE_EMBEDDINGS = True # Rerank image metadata by dot product against precomputed description embeddings
+IMAGE_RERANK_CROSS_ENCODER_TOP_N = 0 # Optional cross-encoder final stage over the best N images (0 disables)
 
 
 
 USE_LOCAL_FALLBACK = True # If API fails or is unavailable, use local model
 PREFER_API_IF_AVAILABLE = True # If both are available, use API
+API_MODEL_CONTEXT_TOKENS = 131072 # Context window of API_MODEL_NAME
+REASONING_CONTEXT_WINDOW = LOCAL_LLM_PARAMS["n_ctx"] if USE_LOCAL_FALLBACK or not PREFER_API_IF_AVAILABLE else API_MODEL_CONTEXT_TOKENS # Prompts must fit whichever model may answer
+LLM_TOKENIZER_NAME = os.getenv("LLM_TOKENIZER_NAME", "microsoft/Phi-3-mini-4k-instruct") # Tokenizer for prompt budgeting (estimates if not available locally)
+REASONING_MAX_NEW_TOKENS = 500 # Answer length reserved out of the context window
+REASONING_CONTEXT_TOKEN_LIMIT = 2500 # Cap on packed context tokens per answer (API cost / local latency)
+CONTEXT_SECTION_PRIORS = {"image": 1.0, "knowledge_base": 1.0, "web": 0.9, "wikipedia": 0.8, "history": 0.6, "episodic": 0.4} # Weights on query relevance when packing the reasoning context
+CONTEXT_EXAMPLES_SCORE = 0.05 # Worked examples in the reasoning prompt are packed last (dropped first)
 
 STM_SIZE = 5 # Number of turns to keep in Short-Term Memory
 LTM_COLLECTION_NAME = "sat_sight_ltm"
@@ -31,13 +55,96 @@ EPISODIC_DB_PATH = os.path.join(BASE_DIR, "data/episodic_memory.db") # If using
 IMAGE_DATA_DIR = os.path.join(BASE_DIR, "data/images")
 METADATA_DIR = os.path.join(BASE_DIR, "data/metadata")
 VECTOR_STORE_DIR = os.path.join(BASE_DIR, "data/vector_stores")
+GEO_METADATA_PATH = os.path.join(METADATA_DIR, "eurosat_metadata_real_coords.jsonl") # Geo-enriched EuroSAT metadata
+LOCATION_INDEX_PATH = os.path.join(METADATA_DIR, "eurosat_location_index.pkl") # Country/region/tile/class postings over GEO_METADATA_PATH
+GEO_NEAR_RADIUS_KM = 25.0 # Default radius for "near <lat>, <lon>" queries (nearest images are returned if none fall inside)
+GEO_MAX_RESULTS = 10 # Images the geo agent returns per query
+GAZETTEER_PATH = os.path.join(METADATA_DIR, "gazetteer.tsv") # Optional place names ("name<TAB>alias,...", or .json) added to location extraction
+GEO_OFFLINE_EXTRACT_PATH = os.getenv("GEO_OFFLINE_EXTRACT_PATH", "") # Regional OSM extract (.gpkg/.parquet/.pbf); set to answer GeoManager queries offline
+GEO_OFFLINE_GAZETTEER_PATH = os.path.join(METADATA_DIR, "geocoder_gazetteer.tsv") # "name<TAB>lat<TAB>lon" places for offline geocoding
+GEO_INCLUDE_RAW_RECORDS = False # Return per-feature OSM records alongside the summary (can be thousands of rows)
+GEO_SUMMARY_TOP_N = 10 # Most frequent types / land uses reported per category in OSM summaries
+
+CACHE_DB_PATH = os.path.join(BASE_DIR, "data/cache/persistent_cache.db") # SQLite file shared by the persistent caches (one namespace each)
+GEOCODE_CACHE_TTL_S = 30 * 24 * 3600 # Resolved geocodes are reused for 30 days
+GEOCODE_NEGATIVE_TTL_S = 24 * 3600 # Hints that could not be geocoded are not retried for a day
+WIKI_CACHE_TTL_S = 7 * 24 * 3600 # Wikipedia summaries are fresh for a week
+WIKI_CACHE_STALE_S = 30 * 24 * 3600 # ...then served stale (refreshed in the background) for up to 30 more days
+WIKI_NEGATIVE_TTL_S = 24 * 3600 # Terms without a Wikipedia page are not searched again for a day
+WIKI_PACK_PATH = os.path.join(BASE_DIR, "data/wiki_pack/wiki_pack.json.gz") # Offline Wikipedia summaries (built by sat_sight.retrieval.wiki_pack)
+WIKI_PACK_MIN_SIMILARITY = 0.75 # Cosine similarity for serving a pack article to a term with no alias match
+WIKI_NETWORK_ENABLED = os.getenv("WIKI_NETWORK_ENABLED", "1") != "0" # Set to 0 to answer only from the pack and cache
+WIKI_PACK_TOPICS = ("Deforestation", "Climate change", "Agriculture", "Biodiversity", "Soil erosion", "Land cover",
+                    "Land use", "Urbanization", "Wetland", "Desertification", "Flood", "Drought", "Wildfire",
+                    "Remote sensing", "Sentinel-2", "Irrigation", "Reforestation", "Conservation biology",
+                    "Urban heat island", "Coastal erosion") # Environmental topics packed besides classes and regions
+
+EUROSAT_CLASSES = ("AnnualCrop", "Forest", "HerbaceousVegetation", "Highway", "Industrial",
+                   "Pasture", "PermanentCrop", "Residential", "River", "SeaLake") # Land-use class labels of the image index
 FAISS_INDEX_PATH = os.path.join(VECTOR_STORE_DIR, "faiss_index.bin")
 CHROMA_DB_PATH = os.path.join(VECTOR_STORE_DIR, "chroma_db")
 
+HYBRID_RETRIEVAL_ENABLED = True # Fuse BM25 keyword hits with dense ChromaDB hits (reciprocal rank fusion)
+HYBRID_CANDIDATES_PER_LIST = 20 # Dense and BM25 candidates each fed into the fusion
+RRF_K = 60 # Reciprocal-rank-fusion damping constant
+BM25_INDEX_PATH = os.path.join(VECTOR_STORE_DIR, "chroma_bm25.pkl") # Inverted index kept next to the ChromaDB directory
+BM25_K1 = 1.5 # BM25 term-frequency saturation
+BM25_B = 0.75 # BM25 document-length normalisation
+METADATA_FILTERING_ENABLED = True # Restrict knowledge-base queries by planner topics / image class
+METADATA_INDEX_FIELDS = ("category", "class") # Chunk metadata fields with precomputed value indexes
+METADATA_INDEX_PATH = os.path.join(VECTOR_STORE_DIR, "chroma_metadata_index.pkl") # Persisted metadata value index
+METADATA_FILTER_MIN_MATCHES = 10 # A filter is only applied if it still selects at least this many chunks
+
+INGEST_CHUNK_SIZE = 1000 # Characters per knowledge-base chunk
+INGEST_CHUNK_OVERLAP = 200 # Characters shared by consecutive chunks of a document
+INGEST_EMBED_BATCH_SIZE = 512 # Chunks per embedding task handed to the ingestion worker pool
+INGEST_UPSERT_BATCH_SIZE = 2000 # Records per ChromaDB upsert (capped by the client's max batch size)
+INGEST_NUM_WORKERS = 2 # Concurrent embedding tasks during ingestion
+INGEST_MANIFEST_PATH = os.path.join(VECTOR_STORE_DIR, "chroma_ingest_manifest.json") # Per-file checkpoint for incremental ingestion
+
+FAST_IMAGE_PREPROCESS = True # Reduced-resolution decode + numpy resize/normalise for CLIP inputs
+
+TILED_ENCODING_ENABLED = True # Encode large uploads as overlapping tiles instead of one squashed embedding
+TILE_MIN_IMAGE_SIDE = 1024 # Images whose shortest side is at least this many pixels are tiled
+TILE_OVERLAP = 0.25 # Fractional overlap between neighbouring tiles
+TILE_TIME_BUDGET_S = 3.0 # Target CLIP time per scene; the tile count follows it
+TILE_MAX_TILES = 64 # Hard cap on tiles per scene
+TILE_BATCH_SIZE = 16 # Tiles per CLIP forward pass
+TILE_CACHE_SIZE = 4096 # Tile embeddings kept in the in-process LRU cache
+TILE_SECONDS_ESTIMATE = 0.25 # Initial per-tile CLIP cost estimate (CPU, ViT-L-14), refined at runtime
+TILE_NEIGHBOURS_K = 5 # FAISS neighbours retrieved per tile
+
+INFERENCE_SCHEDULER_ENABLED = True # Queue CLIP / bi-encoder / cross-encoder calls from concurrent runs into shared batches
+INFERENCE_MAX_WAIT_MS = 5.0 # Default time a queued inference call waits for others to join its batch
+CLIP_IMAGE_MAX_BATCH = 16 # Single-image CLIP requests merged into one forward pass
+CLIP_TEXT_MAX_BATCH = 64 # CLIP text prompts merged into one forward pass
+TEXT_EMBEDDING_MAX_BATCH = 128 # Bi-encoder texts from concurrent callers merged before a flush
+
+RETRIEVAL_SERVICE_URL = os.getenv("RETRIEVAL_SERVICE_URL", "") # e.g. "http://127.0.0.1:8765"; empty keeps stores in-process
+RETRIEVAL_SERVICE_HOST = "127.0.0.1" # Bind address of the local retrieval service
+RETRIEVAL_SERVICE_PORT = 8765 # Port of the local retrieval service
+RETRIEVAL_SERVICE_TIMEOUT_S = 30.0 # Client timeout per service request
+RETRIEVAL_SERVICE_MAX_BATCH = 64 # Requests merged into one FAISS/Chroma/embedding call by the service
+RETRIEVAL_SERVICE_MAX_WAIT_MS = 5.0 # Max time a service request waits for others to join its batch
+
 FAISS_RETRIEVAL_K = 10 # Number of similar images to retrieve (increased from 5)
 CHROMA_RETRIEVAL_K = 10 # Number of relevant text chunks to retrieve (increased from 5)
 WEB_SEARCH_ENABLED = True # Toggle for search agent
 WEB_SEARCH_K = 3 # Number of web snippets to retrieve
+WEB_SEARCH_CACHE_TTL_S = 6 * 3600 # Web search results are reused across users for six hours
+WEB_SEARCH_NEWS_TTL_S = 15 * 60 # ...but only 15 minutes for time-sensitive queries ("latest", "news", "today", ...)
+WEB_SEARCH_EMPTY_TTL_S = 10 * 60 # Queries that returned nothing are not re-sent for 10 minutes
+WEB_SEARCH_HEDGING_ENABLED = True # Race a second search provider when the first is slow or fails
+WEB_SEARCH_HEDGE_AFTER_MS = 1500.0 # Longest wait for the first provider before hedging (its p90 latency if lower)
+WEB_SEARCH_HEDGE_MIN_MS = 300.0 # Shortest hedge delay, so fast providers are not hedged on every query
+WEB_SEARCH_TIMEOUT_S = 12.0 # Overall budget for a web search across providers
+TAVILY_SEARCH_DEPTH = os.getenv("TAVILY_SEARCH_DEPTH", "basic") # "advanced" is slower and costs twice the credits
+TAVILY_INCLUDE_RAW_CONTENT = os.getenv("TAVILY_INCLUDE_RAW_CONTENT", "False").lower() == "true" # Fetch full page text for passage selection
+WEB_EVIDENCE_TOKEN_BUDGET = 400 # Estimated tokens of web passages passed to the reasoning prompt
+WEB_EVIDENCE_MAX_PASSAGES = 6 # Best-scoring web passages kept across all results
+WEB_EVIDENCE_MIN_RELATIVE_SCORE = 0.6 # Passages below this fraction of the way from the worst to the best score are dropped
+WEB_PASSAGE_MAX_CHARS = 500 # Web result text is split into sentence-aligned passages of at most this length
+WEB_PASSAGES_PER_RESULT = 40 # Passages scored per result (bounds bi-encoder work on long raw pages)
 
 UI_TITLE = "Sat-Sight: Agentic Satellite QA"
 UI_DESCRIPTION = "Ask questions about satellite images with AI."
@@ -12,7 +12,9 @@ class AgentState(TypedDict):
     
     retrieved_image_metadata: List[Dict[str, Any]]
     retrieved_image_distances: List[float]
+    tile_class_summary: Optional[List[Dict[str, Any]]]  # Per-class aggregation when a large scene was tiled
     retrieved_text_chunks: List[Dict[str, Any]]
+    rerank_depths: Dict[str, int]  # Candidates actually scored by the cross-encoder, per agent
     web_snippets: List[Dict[str, Any]]
     wiki_content: Optional[str]
     wiki_source: Optional[str]
@@ -41,6 +43,7 @@ class AgentState(TypedDict):
     required_sources: List[str]
     completed_sources: List[str]
     planner_decision_category: Optional[str]
+    knowledge_topics: List[str]  # Knowledge-base categories the query is about (used as metadata filters)
     
     critic_score: Optional[float]
     critic_feedback: Optional[str]
@@ -164,7 +164,9 @@ def run_workflow(query: str, image_path: str = "", user_id: str = "anonymous") -
             "query_embedding": None,
             "retrieved_image_metadata": [],
             "retrieved_image_distances": [],
+            "tile_class_summary": None,
             "retrieved_text_chunks": [],
+            "rerank_depths": {},
             "web_snippets": [],
             "wiki_content": None,
             "wiki_source": None,
@@ -186,6 +188,7 @@ def run_workflow(query: str, image_path: str = "", user_id: str = "anonymous") -
             "required_sources": [],
             "completed_sources": [],
             "planner_decision_category": None,
+            "knowledge_topics": [],
             "critic_score": None,
             "critic_feedback": None,
             "needs_revision": False,
@@ -0,0 +1,239 @@
+"""
+Local BM25 inverted index over the ChromaDB knowledge-base chunks.
+Complements dense retrieval for exact domain terms (sensor names, tile IDs such as 31UDQ,
+index names such as NDVI) that bi-encoders blur. Only chunk ids are stored; document text
+stays in ChromaDB.
+"""
+import logging
+import math
+import os
+import pickle
+import re
+import threading
+import numpy as np
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+from sat_sight.core.config import BM25_K1, BM25_B
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were which with".split()
+)
+INDEX_VERSION = 1
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercases text and splits it into alphanumeric tokens, dropping common English stopwords."""
+    return [token for token in _TOKEN_PATTERN.findall(text.lower()) if token not in _STOPWORDS]
+
+
+class BM25Index:
+    """
+    An incrementally updatable Okapi BM25 index keyed by document id.
+    Removed documents leave empty slots that are compacted away when the index is saved.
+    """
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        """
+        Initializes an empty index.
+
+        Args:
+            k1 (float): Term-frequency saturation.
+            b (float): Document-length normalisation.
+        """
+        self.k1 = k1
+        self.b = b
+        self.doc_ids: List[Optional[str]] = [] # Slot -> id (None for removed documents)
+        self.slots: Dict[str, int] = {}
+        self.doc_lengths: List[int] = []
+        self.doc_terms: List[Optional[Dict[str, int]]] = []
+        self.postings: Dict[str, Dict[int, int]] = {} # Term -> {slot: term frequency}
+        self.total_length = 0
+        self.source_count: Optional[int] = None # Collection size the index was last synchronised with
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def add(self, ids: Sequence[str], documents: Sequence[str]):
+        """
+        Adds or replaces documents.
+
+        Args:
+            ids (Sequence[str]): Document ids.
+            documents (Sequence[str]): Document texts.
+        """
+        with self._lock:
+            self.remove([doc_id for doc_id in ids if doc_id in self.slots])
+            for doc_id, document in zip(ids, documents):
+                terms = Counter(tokenize(document or ""))
+                slot = len(self.doc_ids)
+                self.doc_ids.append(doc_id)
+                self.slots[doc_id] = slot
+                self.doc_lengths.append(sum(terms.values()))
+                self.doc_terms.append(dict(terms))
+                self.total_length += self.doc_lengths[slot]
+                for term, tf in terms.items():
+                    self.postings.setdefault(term, {})[slot] = tf
+                    self._arrays.pop(term, None)
+
+    def remove(self, ids: Sequence[str]):
+        """Removes documents by id; unknown ids are ignored."""
+        with self._lock:
+            for doc_id in ids:
+                slot = self.slots.pop(doc_id, None)
+                if slot is None:
+                    continue
+                for term in self.doc_terms[slot]:
+                    postings = self.postings.get(term)
+                    if postings is not None:
+                        postings.pop(slot, None)
+                        if not postings:
+                            del self.postings[term]
+                    self._arrays.pop(term, None)
+                self.total_length -= self.doc_lengths[slot]
+                self.doc_ids[slot] = None
+                self.doc_terms[slot] = None
+                self.doc_lengths[slot] = 0
+
+    def _term_arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self.postings.get(term, {})
+            arrays = (np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                      np.fromiter(postings.values(), dtype=np.float32, count=len(postings)))
+            self._arrays[term] = arrays
+        return arrays
+
+    def search(self, query: str, k: int = 10, allowed_ids: Optional[set] = None) -> List[Tuple[str, float]]:
+        """
+        Scores all documents containing at least one query term.
+
+        Args:
+            query (str): Query text.
+            k (int): Number of results.
+            allowed_ids (set, optional): Restrict results to these ids (e.g., a metadata filter's matches).
+
+        Returns:
+            List[Tuple[str, float]]: (document id, BM25 score), best first.
+        """
+        with self._lock:
+            num_docs = len(self.slots)
+            if not num_docs:
+                return []
+            avg_length = self.total_length / num_docs or 1.0
+            lengths = np.asarray(self.doc_lengths, dtype=np.float32)
+            scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+
+            for term, query_tf in Counter(tokenize(query)).items():
+                slots, tfs = self._term_arrays(term)
+                if not len(slots):
+                    continue
+                idf = math.log(1.0 + (num_docs - len(slots) + 0.5) / (len(slots) + 0.5))
+                norm = self.k1 * (1.0 - self.b + self.b * lengths[slots] / avg_length)
+                scores[slots] += query_tf * idf * tfs * (self.k1 + 1.0) / (tfs + norm)
+
+            if allowed_ids is not None:
+                allowed = np.zeros(len(self.doc_ids), dtype=bool)
+                allowed[[self.slots[doc_id] for doc_id in allowed_ids if doc_id in self.slots]] = True
+                scores[~allowed] = 0.0
+
+            matched = np.flatnonzero(scores)
+            if not len(matched):
+                return []
+            if len(matched) > k:
+                matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+            matched = matched[np.argsort(-scores[matched], kind="stable")]
+            return [(self.doc_ids[slot], float(scores[slot])) for slot in matched]
+
+    def compact(self):
+        """Drops the slots of removed documents."""
+        with self._lock:
+            if len(self.slots) == len(self.doc_ids):
+                return
+            live = [(doc_id, self.doc_lengths[slot], self.doc_terms[slot]) for slot, doc_id in enumerate(self.doc_ids) if doc_id is not None]
+            self.doc_ids = [doc_id for doc_id, _, _ in live]
+            self.doc_lengths = [length for _, length, _ in live]
+            self.doc_terms = [terms for _, _, terms in live]
+            self.slots = {doc_id: slot for slot, doc_id in enumerate(self.doc_ids)}
+            self.postings = {}
+            for slot, terms in enumerate(self.doc_terms):
+                for term, tf in terms.items():
+                    self.postings.setdefault(term, {})[slot] = tf
+            self._arrays = {}
+
+    def save(self, path: str):
+        """
+        Saves the index (compacted) to disk.
+
+        Args:
+            path (str): Destination pickle file.
+        """
+        with self._lock:
+            self.compact()
+            state = {
+                "version": INDEX_VERSION, "k1": self.k1, "b": self.b, "source_count": self.source_count,
+                "doc_ids": self.doc_ids, "doc_lengths": self.doc_lengths, "doc_terms": self.doc_terms,
+            }
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        logger.info(f"BM25 index with {len(self)} documents saved to {path}")
+
+    @classmethod
+    def load(cls, path: str) -> Optional["BM25Index"]:
+        """
+        Loads an index saved with save().
+
+        Args:
+            path (str): Pickle file.
+
+        Returns:
+            Optional[BM25Index]: The index, or None if the file is missing or unreadable.
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+            if state.get("version") != INDEX_VERSION:
+                logger.warning(f"Ignoring BM25 index {path} with unknown version {state.get('version')}")
+                return None
+        except Exception as e:
+            logger.error(f"Failed to load BM25 index from {path}: {e}")
+            return None
+
+        index = cls(k1=state["k1"], b=state["b"])
+        index.source_count = state["source_count"]
+        index.doc_ids = state["doc_ids"]
+        index.doc_lengths = state["doc_lengths"]
+        index.doc_terms = state["doc_terms"]
+        index.total_length = sum(index.doc_lengths)
+        index.slots = {doc_id: slot for slot, doc_id in enumerate(index.doc_ids)}
+        for slot, terms in enumerate(index.doc_terms):
+            for term, tf in terms.items():
+                index.postings.setdefault(term, {})[slot] = tf
+        logger.info(f"BM25 index with {len(index)} documents loaded from {path}")
+        return index
+
+
+def reciprocal_rank_fusion(ranked_lists: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Fuses ranked id lists with reciprocal rank fusion: score(d) = sum over lists of 1 / (k + rank(d)).
+
+    Args:
+        ranked_lists (Sequence[Sequence[str]]): Id lists, best first.
+        k (int): RRF damping constant.
+
+    Returns:
+        List[Tuple[str, float]]: (id, fused score), best first. Ties keep first-seen order.
+    """
+    fused: Dict[str, float] = {}
+    for ranked in ranked_lists:
+        for rank, doc_id in enumerate(ranked, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: -item[1])
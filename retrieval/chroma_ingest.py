@@ -0,0 +1,449 @@
+"""
+Bulk ingestion of text documents into the ChromaDB knowledge base.
+
+Usage:
+    python -m sat_sight.retrieval.chroma_ingest data/corpus --chunk-size 1000 --chunk-overlap 200
+
+Documents (.txt, .md, .json, .jsonl) are split into overlapping chunks and deduplicated by
+content hash, which doubles as the Chroma id. New chunks are embedded in large batches on a
+worker pool and upserted in sized batches. A manifest records each source file's signature,
+chunk ids and the metadata hashes of the chunks it stored, and is checkpointed as files complete, so an interrupted run
+resumes where it stopped and later runs only re-ingest files that changed. Stored chunks whose
+text is unchanged are skipped unless their metadata (source, topic, tags, ...) changed.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sat_sight.core.config import (
+    INGEST_CHUNK_SIZE, INGEST_CHUNK_OVERLAP, INGEST_EMBED_BATCH_SIZE, INGEST_UPSERT_BATCH_SIZE,
+    INGEST_NUM_WORKERS, INGEST_MANIFEST_PATH
+)
+from sat_sight.retrieval.chroma_manager import ChromaManager
+from sat_sight.retrieval.text_embedder import get_text_embedder
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = (".txt", ".md", ".json", ".jsonl")
+DEFAULT_TEXT_FIELDS = ("content", "text", "description")
+MANIFEST_VERSION = 1
+CHECKPOINT_INTERVAL_S = 5.0 # Minimum time between manifest writes while a run is in progress
+
+
+def chunk_text(text: str, chunk_size: int = INGEST_CHUNK_SIZE, chunk_overlap: int = INGEST_CHUNK_OVERLAP) -> List[str]:
+    """
+    Splits text into chunks of at most chunk_size characters, consecutive chunks sharing about
+    chunk_overlap characters. Cuts are moved back to the nearest whitespace where possible.
+
+    Args:
+        text (str): Document text.
+        chunk_size (int): Maximum characters per chunk.
+        chunk_overlap (int): Characters repeated at the start of the next chunk (< chunk_size).
+
+    Returns:
+        List[str]: The chunks, whitespace-normalised.
+    """
+    if chunk_overlap >= chunk_size:
+        raise ValueError(f"chunk_overlap ({chunk_overlap}) must be smaller than chunk_size ({chunk_size})")
+    text = " ".join(text.split())
+    if len(text) <= chunk_size:
+        return [text] if text else []
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            cut = text.rfind(" ", start + chunk_size // 2, end)
+            if cut > start:
+                end = cut
+        chunks.append(text[start:end].strip())
+        if end >= len(text):
+            break
+
+        next_start = max(end - chunk_overlap, start + 1)
+        if text[next_start - 1] != " ":
+            space = text.find(" ", next_start, end)
+            if space != -1:
+                next_start = space + 1 # Start the overlap on a word boundary
+        start = next_start
+    return [chunk for chunk in chunks if chunk]
+
+
+def content_hash(text: str) -> str:
+    """Returns the id of a chunk: the SHA-1 of its text."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def metadata_hash(metadata: Dict[str, Any]) -> str:
+    """Returns the SHA-1 of a chunk's metadata, used to detect metadata-only changes of stored chunks."""
+    return hashlib.sha1(json.dumps(metadata, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _file_sha1(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _record_to_document(record: Any, text_fields: Sequence[str]) -> Optional[Tuple[str, Dict[str, Any]]]:
+    if isinstance(record, str):
+        return record, {}
+    if not isinstance(record, dict):
+        return None
+    for field in text_fields:
+        if isinstance(record.get(field), str) and record[field].strip():
+            metadata = {
+                key: value for key, value in record.items()
+                if key != field and isinstance(value, (str, int, float, bool))
+            }
+            return record[field], metadata
+    return None
+
+
+def load_documents(path: str, text_fields: Sequence[str] = DEFAULT_TEXT_FIELDS) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Reads the documents of one source file.
+    Plain text and Markdown files are one document each; JSON/JSONL records contribute the first
+    non-empty field of text_fields as text and their scalar fields as metadata.
+
+    Args:
+        path (str): Source file.
+        text_fields (Sequence[str]): Candidate text fields for JSON records, in priority order.
+
+    Returns:
+        List[Tuple[str, Dict[str, Any]]]: (text, metadata) per document.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        if extension == ".jsonl":
+            records = [json.loads(line) for line in f if line.strip()]
+        elif extension == ".json":
+            data = json.load(f)
+            records = data if isinstance(data, list) else [data]
+        else:
+            return [(f.read(), {})]
+    documents = [_record_to_document(record, text_fields) for record in records]
+    return [document for document in documents if document]
+
+
+def discover_files(paths: Sequence[str]) -> List[Tuple[str, str]]:
+    """
+    Lists supported source files under the given files/directories.
+
+    Returns:
+        List[Tuple[str, str]]: (absolute path, path relative to its input root), sorted.
+    """
+    files = []
+    for root in paths:
+        root = os.path.abspath(root)
+        if os.path.isfile(root):
+            files.append((root, os.path.basename(root)))
+            continue
+        for directory, _, names in os.walk(root):
+            for name in names:
+                if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                    path = os.path.join(directory, name)
+                    files.append((path, os.path.relpath(path, root)))
+    return sorted(set(files))
+
+
+def load_manifest(manifest_path: str) -> Dict[str, Any]:
+    """Loads the ingestion manifest, returning an empty one if it does not exist or is unreadable."""
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+        logger.warning(f"Ignoring ingestion manifest {manifest_path} with unknown version {manifest.get('version')}")
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Could not read ingestion manifest {manifest_path}: {e}")
+    return {"version": MANIFEST_VERSION, "files": {}}
+
+
+def save_manifest(manifest_path: str, manifest: Dict[str, Any]):
+    """Writes the manifest atomically (temp file + rename), so a crash never leaves it half-written."""
+    os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+
+class _IngestRun:
+    """
+    State of one ingestion run: the embedding/upsert pipeline and per-file checkpoint tracking.
+    """
+    def __init__(self, manager: ChromaManager, manifest: Dict[str, Any], manifest_path: str,
+                 embed_batch_size: int, upsert_batch_size: int, num_workers: int, skip_existing: bool):
+        self.manager = manager
+        self.manifest = manifest
+        self.manifest_path = manifest_path
+        self.embed_batch_size = embed_batch_size
+        self.upsert_batch_size = min(upsert_batch_size, manager.max_batch_size())
+        self.num_workers = max(1, num_workers)
+        self.skip_existing = skip_existing
+        self.embedder = get_text_embedder(manager.embedding_model_name)
+
+        self.seen_ids: set = set()
+        self.stored_metadata: Dict[str, Tuple[str, str]] = {} # chunk id -> (owning file, hash of the stored metadata)
+        for file_path, file_entry in manifest["files"].items():
+            for chunk_id, digest in file_entry.get("metadata_hashes", {}).items():
+                self.stored_metadata.setdefault(chunk_id, (file_path, digest))
+        self.owned_hashes: Dict[str, Dict[str, str]] = {} # file -> metadata hashes of the chunks it stored in this run
+        self.waiting_files: Dict[str, List[str]] = {} # chunk id -> files whose checkpoint waits for it
+        self.pending_ids: Dict[str, set] = {} # file -> chunk ids not yet stored
+        self.closed_files: Dict[str, Dict[str, Any]] = {} # fully enumerated files -> new manifest entry
+
+        self.to_embed: List[Tuple[str, str, Dict[str, Any]]] = []
+        self.to_upsert: List[Tuple[str, str, Dict[str, Any], Any]] = []
+        self.in_flight: deque = deque()
+        self.last_checkpoint = time.monotonic()
+        self.stats = {"chunks": 0, "duplicates": 0, "existing": 0, "upserted": 0, "deleted": 0, "files_ingested": 0}
+
+    def add_file(self, path: str, entry: Dict[str, Any], chunks: List[Tuple[str, str, Dict[str, Any]]], executor: ThreadPoolExecutor):
+        """Queues the chunks of one changed file; the file is checkpointed once all of them are stored."""
+        self.pending_ids[path] = set()
+        for chunk_id, text, metadata in chunks:
+            self.stats["chunks"] += 1
+            if chunk_id in self.seen_ids:
+                self.stats["duplicates"] += 1
+                if chunk_id in self.waiting_files:
+                    self.waiting_files[chunk_id].append(path)
+                    self.pending_ids[path].add(chunk_id)
+                continue
+            self.seen_ids.add(chunk_id)
+            self.waiting_files[chunk_id] = [path]
+            self.pending_ids[path].add(chunk_id)
+            self.to_embed.append((chunk_id, text, metadata))
+            if len(self.to_embed) >= self.embed_batch_size:
+                self._submit(executor)
+
+        self.closed_files[path] = entry
+        self._checkpoint_ready_files()
+
+    def _submit(self, executor: ThreadPoolExecutor):
+        batch, self.to_embed = self.to_embed, []
+        if self.skip_existing:
+            existing = self.manager.existing_ids([chunk_id for chunk_id, _, _ in batch])
+            existing = {chunk_id for chunk_id, _, metadata in batch if chunk_id in existing and self._is_current(chunk_id, metadata)}
+            if existing:
+                self.stats["existing"] += len(existing)
+                self._mark_stored(existing)
+                batch = [item for item in batch if item[0] not in existing]
+        if not batch:
+            return
+
+        future = executor.submit(self.embedder.encode, [text for _, text, _ in batch], scheduled=False)
+        self.in_flight.append((batch, future))
+        while len(self.in_flight) >= 2 * self.num_workers: # Bound memory held by finished embeddings
+            self._collect_oldest()
+
+    def _is_current(self, chunk_id: str, metadata: Dict[str, Any]) -> bool:
+        """
+        Whether a stored chunk can be skipped: another file still in the manifest owns its metadata, or
+        the queuing file owns it and its metadata is unchanged. Otherwise (metadata edited, or no hash
+        recorded) the chunk is upserted again.
+        """
+        path = self.waiting_files[chunk_id][0]
+        owner, digest = self.stored_metadata.get(chunk_id, (None, None))
+        if owner is not None and owner != path and owner in self.manifest["files"]:
+            return True
+        digest_now = metadata_hash(metadata)
+        if digest != digest_now:
+            return False
+        self.owned_hashes.setdefault(path, {})[chunk_id] = digest_now
+        return True
+
+    def _collect_oldest(self):
+        batch, future = self.in_flight.popleft()
+        embeddings = future.result()
+        self.to_upsert.extend((chunk_id, text, metadata, embedding) for (chunk_id, text, metadata), embedding in zip(batch, embeddings))
+        while len(self.to_upsert) >= self.upsert_batch_size:
+            self._upsert(self.to_upsert[:self.upsert_batch_size])
+            self.to_upsert = self.to_upsert[self.upsert_batch_size:]
+
+    def _upsert(self, records: List[Tuple[str, str, Dict[str, Any], Any]]):
+        ids = [record[0] for record in records]
+        if not self.manager.upsert(ids, [r[1] for r in records], [r[2] for r in records], [r[3] for r in records]):
+            raise RuntimeError(f"Upsert of {len(ids)} chunks failed; rerun to resume from the last checkpoint")
+        for chunk_id, _, metadata, _ in records: # The first file that queued a chunk owns its stored metadata
+            self.owned_hashes.setdefault(self.waiting_files[chunk_id][0], {})[chunk_id] = metadata_hash(metadata)
+        self.stats["upserted"] += len(ids)
+        logger.info(f"Ingestion progress: {self.stats['upserted']} chunks upserted, {self.stats['files_ingested']} files checkpointed")
+        self._mark_stored(ids)
+
+    def _mark_stored(self, ids):
+        for chunk_id in ids:
+            for path in self.waiting_files.pop(chunk_id, []):
+                self.pending_ids[path].discard(chunk_id)
+        self._checkpoint_ready_files()
+
+    def _checkpoint_ready_files(self):
+        ready = [path for path in self.closed_files if not self.pending_ids[path]]
+        if not ready:
+            return
+        for path in ready:
+            entry = self.closed_files.pop(path)
+            entry["metadata_hashes"] = self.owned_hashes.pop(path, {})
+            del self.pending_ids[path]
+            previous = self.manifest["files"].get(path)
+            self.manifest["files"][path] = entry
+            if previous:
+                self.delete_unreferenced(set(previous["chunk_ids"]) - set(entry["chunk_ids"]))
+            self.stats["files_ingested"] += 1
+        if time.monotonic() - self.last_checkpoint >= CHECKPOINT_INTERVAL_S:
+            save_manifest(self.manifest_path, self.manifest)
+            self.last_checkpoint = time.monotonic()
+
+    def delete_unreferenced(self, candidate_ids: set):
+        """Deletes chunk ids that no file in the manifest (or in this run) still references."""
+        if not candidate_ids:
+            return
+        referenced = set(self.seen_ids)
+        for entry in self.manifest["files"].values():
+            referenced.update(entry["chunk_ids"])
+        stale = sorted(candidate_ids - referenced)
+        for start in range(0, len(stale), self.upsert_batch_size):
+            if self.manager.delete(stale[start:start + self.upsert_batch_size]):
+                self.stats["deleted"] += len(stale[start:start + self.upsert_batch_size])
+
+    def finish(self, executor: ThreadPoolExecutor):
+        """Embeds and stores everything still queued, then writes the final checkpoint."""
+        if self.to_embed:
+            self._submit(executor)
+        while self.in_flight:
+            self._collect_oldest()
+        if self.to_upsert:
+            self._upsert(self.to_upsert)
+            self.to_upsert = []
+        save_manifest(self.manifest_path, self.manifest)
+
+
+def ingest(paths: Sequence[str], manager: Optional[ChromaManager] = None,
+           chunk_size: int = INGEST_CHUNK_SIZE, chunk_overlap: int = INGEST_CHUNK_OVERLAP,
+           embed_batch_size: int = INGEST_EMBED_BATCH_SIZE, upsert_batch_size: int = INGEST_UPSERT_BATCH_SIZE,
+           num_workers: int = INGEST_NUM_WORKERS, manifest_path: str = INGEST_MANIFEST_PATH,
+           text_fields: Sequence[str] = DEFAULT_TEXT_FIELDS, full: bool = False, prune: bool = False) -> Dict[str, int]:
+    """
+    Ingests (or incrementally re-ingests) source files into the knowledge-base collection.
+
+    Args:
+        paths (Sequence[str]): Files or directories to ingest.
+        manager (ChromaManager, optional): Target collection. Defaults to the configured one.
+        chunk_size (int): Maximum characters per chunk.
+        chunk_overlap (int): Characters shared by consecutive chunks.
+        embed_batch_size (int): Chunks per embedding task.
+        upsert_batch_size (int): Records per ChromaDB upsert.
+        num_workers (int): Concurrent embedding tasks.
+        manifest_path (str): Checkpoint manifest location.
+        text_fields (Sequence[str]): Candidate text fields for JSON/JSONL records.
+        full (bool): Re-chunk and re-embed every file, ignoring the manifest and stored ids. Not needed
+                     after metadata-only edits: chunks whose metadata changed are upserted again.
+        prune (bool): Remove chunks of manifest files that no longer exist under paths.
+
+    Returns:
+        Dict[str, int]: Counters ('files', 'files_skipped', 'files_ingested', 'chunks', 'duplicates',
+                        'existing', 'upserted', 'deleted').
+    """
+    manager = manager or ChromaManager()
+    if not manager.collection:
+        raise RuntimeError("ChromaDB collection is not available; nothing can be ingested")
+
+    manifest = load_manifest(manifest_path)
+    settings = {"chunk_size": chunk_size, "chunk_overlap": chunk_overlap, "embedding_model": manager.embedding_model_name}
+    if manifest.get("settings") not in (None, settings):
+        logger.warning(f"Chunking/embedding settings changed since the last run ({manifest['settings']} -> {settings}); re-ingesting all files")
+        full = True
+
+    files = [(path, source) for path, source in discover_files(paths) if path != os.path.abspath(manifest_path)]
+    run = _IngestRun(manager, manifest, manifest_path, embed_batch_size, upsert_batch_size, num_workers, skip_existing=not full)
+    skipped = 0
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, num_workers), thread_name_prefix="ingest-embed") as executor:
+            for path, source in files:
+                stat = os.stat(path)
+                previous = manifest["files"].get(path)
+                if not full and previous and (previous["mtime_ns"], previous["size"]) == (stat.st_mtime_ns, stat.st_size):
+                    skipped += 1
+                    continue
+                sha1 = _file_sha1(path)
+                entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha1": sha1}
+                if not full and previous and previous.get("sha1") == sha1:
+                    manifest["files"][path] = {**previous, **entry} # Touched but unchanged
+                    skipped += 1
+                    continue
+
+                chunks = []
+                for doc_index, (text, metadata) in enumerate(load_documents(path, text_fields)):
+                    for chunk_index, chunk in enumerate(chunk_text(text, chunk_size, chunk_overlap)):
+                        chunk_metadata = {**metadata, "source": source, "document_index": doc_index, "chunk_index": chunk_index}
+                        chunks.append((content_hash(chunk), chunk, chunk_metadata))
+                entry["chunk_ids"] = list(dict.fromkeys(chunk_id for chunk_id, _, _ in chunks))
+                run.add_file(path, entry, chunks, executor)
+
+            run.finish(executor)
+        manifest["settings"] = settings # Only a completed run switches the manifest to new settings
+    finally:
+        save_manifest(manifest_path, manifest) # Keep the checkpoints of completed files even if the run failed
+        manager.save_local_indexes()
+
+    if prune:
+        roots = [os.path.abspath(p) for p in paths]
+        present = {path for path, _ in files}
+        removed = [
+            path for path in manifest["files"]
+            if path not in present and any(path == root or path.startswith(root + os.sep) for root in roots)
+        ]
+        removed_ids = set()
+        for path in removed:
+            removed_ids.update(manifest["files"].pop(path)["chunk_ids"])
+        run.delete_unreferenced(removed_ids)
+        save_manifest(manifest_path, manifest)
+        manager.save_local_indexes()
+        logger.info(f"Pruned {len(removed)} removed files from the knowledge base.")
+
+    stats = {"files": len(files), "files_skipped": skipped, **run.stats}
+    logger.info(f"Ingestion finished: {stats}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="Files or directories to ingest.")
+    parser.add_argument("--chunk-size", type=int, default=INGEST_CHUNK_SIZE, help="Maximum characters per chunk.")
+    parser.add_argument("--chunk-overlap", type=int, default=INGEST_CHUNK_OVERLAP, help="Characters shared by consecutive chunks.")
+    parser.add_argument("--embed-batch-size", type=int, default=INGEST_EMBED_BATCH_SIZE, help="Chunks per embedding task.")
+    parser.add_argument("--upsert-batch-size", type=int, default=INGEST_UPSERT_BATCH_SIZE, help="Records per ChromaDB upsert.")
+    parser.add_argument("--workers", type=int, default=INGEST_NUM_WORKERS, help="Concurrent embedding tasks.")
+    parser.add_argument("--manifest", default=INGEST_MANIFEST_PATH, help="Checkpoint manifest path.")
+    parser.add_argument("--text-field", action="append", help="Text field of JSON/JSONL records (repeatable).")
+    parser.add_argument("--db-path", default=None, help="ChromaDB directory (defaults to config).")
+    parser.add_argument("--full", action="store_true", help="Re-ingest every file, ignoring the manifest.")
+    parser.add_argument("--prune", action="store_true", help="Delete chunks of files that no longer exist.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    stats = ingest(
+        args.paths, manager=ChromaManager(db_path=args.db_path),
+        chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap,
+        embed_batch_size=args.embed_batch_size, upsert_batch_size=args.upsert_batch_size,
+        num_workers=args.workers, manifest_path=args.manifest,
+        text_fields=tuple(args.text_field) if args.text_field else DEFAULT_TEXT_FIELDS,
+        full=args.full, prune=args.prune
+    )
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,77 @@
 import logging
+import os
+import threading
+import numpy as np
 import chromadb
+from typing import Dict, List, Optional
 from chromadb.utils.embedding_functions import EmbeddingFunction, SentenceTransformerEmbeddingFunction # Import the correct class
-from sat_sight.core.config import CHROMA_DB_PATH, CHROMA_RETRIEVAL_K
+from sat_sight.core.config import (
+    CHROMA_DB_PATH, CHROMA_RETRIEVAL_K, TEXT_EMBEDDING_MODEL_NAME,
+    HYBRID_RETRIEVAL_ENABLED, HYBRID_CANDIDATES_PER_LIST, RRF_K, BM25_INDEX_PATH,
+    METADATA_FILTERING_ENABLED, METADATA_INDEX_PATH, METADATA_FILTER_MIN_MATCHES
+)
+from sat_sight.retrieval.bm25_index import BM25Index, reciprocal_rank_fusion
+from sat_sight.retrieval.metadata_index import MetadataIndex
+from sat_sight.retrieval.text_embedder import get_text_embedder
 
 logger = logging.getLogger(__name__)
 
+_embedding_functions: Dict[str, SentenceTransformerEmbeddingFunction] = {}
+_embedding_lock = threading.Lock()
+
+
+def get_embedding_function(model_name: str = TEXT_EMBEDDING_MODEL_NAME) -> SentenceTransformerEmbeddingFunction:
+    """
+    Returns the process-wide ChromaDB embedding function for a model.
+    The underlying SentenceTransformer is the one held by the shared TextEmbedder, so ChromaDB,
+    description reranking and any other stage load the bi-encoder only once per process.
+    """
+    with _embedding_lock:
+        if model_name not in _embedding_functions:
+            shared_models = getattr(SentenceTransformerEmbeddingFunction, "models", None)
+            if isinstance(shared_models, dict) and model_name not in shared_models:
+                shared_models[model_name] = get_text_embedder(model_name).model # Reused by the constructor below
+            _embedding_functions[model_name] = SentenceTransformerEmbeddingFunction(model_name=model_name)
+        return _embedding_functions[model_name]
+
 class ChromaManager:
     """
     A class to manage the ChromaDB vector store for text metadata.
     Uses ChromaDB's SentenceTransformerEmbeddingFunction for local compatibility.
+    Optionally fuses dense results with a local BM25 index (hybrid retrieval) and keeps a
+    metadata value index for filtered queries.
     """
-    def __init__(self, db_path: str = None, embedding_model_name: str = "BAAI/bge-small-en-v1.5"):
+    def __init__(self, db_path: str = None, embedding_model_name: str = TEXT_EMBEDDING_MODEL_NAME,
+                 hybrid: bool = HYBRID_RETRIEVAL_ENABLED, bm25_path: str = None,
+                 metadata_filtering: bool = METADATA_FILTERING_ENABLED, metadata_index_path: str = None):
         """
         Initializes the ChromaDB manager.
 
         Args:
             db_path (str, optional): Path to the ChromaDB directory. If None, uses config.
             embedding_model_name (str): Name of the SentenceTransformers model for embeddings.
+            hybrid (bool): Fuse dense results with BM25 keyword results.
+            bm25_path (str, optional): Path of the persisted BM25 index. If None, uses config
+                                       (or a file next to db_path when db_path is given).
+            metadata_filtering (bool): Maintain the metadata value index used by build_where().
+            metadata_index_path (str, optional): Path of the persisted metadata index. If None, uses config
+                                                 (or a file next to db_path when db_path is given).
         """
         self.db_path = db_path or CHROMA_DB_PATH
         self.embedding_model_name = embedding_model_name
+        self.hybrid = hybrid
+        self.metadata_filtering = metadata_filtering
+        db_stem = self.db_path.rstrip(os.sep)
+        self.bm25_path = bm25_path or (BM25_INDEX_PATH if db_path is None else f"{db_stem}_bm25.pkl")
+        self.metadata_index_path = metadata_index_path or (METADATA_INDEX_PATH if db_path is None else f"{db_stem}_metadata_index.pkl")
         self.client = None
         self.collection = None
         self.embedding_function = None
+        self.bm25 = None
+        self.metadata_index = None
         self._initialize_db()
+        if self.collection and (self.hybrid or self.metadata_filtering):
+            self._load_local_indexes()
 
     def _initialize_db(self):
         """
@@ -32,7 +80,7 @@ class ChromaManager:
         try:
             self.client = chromadb.PersistentClient(path=self.db_path)
 
-            self.embedding_function = SentenceTransformerEmbeddingFunction(model_name=self.embedding_model_name)
+            self.embedding_function = get_embedding_function(self.embedding_model_name)
 
             collection_name = "satellite_metadata_text"
             self.collection = self.client.get_or_create_collection(
@@ -47,43 +95,295 @@ class ChromaManager:
             logger.warning("ChromaDB will be unavailable. Text retrieval will return empty results.")
             self.collection = None
 
-    def query(self, query_text: str, k: int = None) -> list:
+    def _load_local_indexes(self):
+        """
+        Loads the BM25 and metadata indexes, rebuilding them when missing or out of sync with the collection.
+        """
+        count = self.collection.count()
+        if self.hybrid:
+            self.bm25 = BM25Index.load(self.bm25_path)
+        if self.metadata_filtering:
+            self.metadata_index = MetadataIndex.load(self.metadata_index_path)
+
+        stale = [
+            index for enabled, index in ((self.hybrid, self.bm25), (self.metadata_filtering, self.metadata_index))
+            if enabled and (index is None or index.source_count != count)
+        ]
+        if stale:
+            logger.info(f"Local indexes missing or stale for {count} documents, rebuilding from ChromaDB.")
+            self.rebuild_local_indexes()
+
+    def rebuild_local_indexes(self, page_size: int = 5000):
+        """
+        Rebuilds the enabled local indexes (BM25, metadata) in one pass over the collection and saves them.
+
+        Args:
+            page_size (int): Documents fetched per ChromaDB get call.
+        """
+        try:
+            bm25 = BM25Index() if self.hybrid else None
+            metadata_index = MetadataIndex() if self.metadata_filtering else None
+            offset = 0
+            while True:
+                page = self.collection.get(limit=page_size, offset=offset, include=["documents", "metadatas"])
+                if not page['ids']:
+                    break
+                if bm25 is not None:
+                    bm25.add(page['ids'], page['documents'])
+                if metadata_index is not None:
+                    metadata_index.add(page['ids'], page['metadatas'])
+                offset += len(page['ids'])
+            self.bm25 = bm25
+            self.metadata_index = metadata_index
+            self.save_local_indexes()
+        except Exception as e:
+            logger.error(f"Failed to build local indexes: {e}. Falling back to unfiltered dense-only retrieval.")
+            self.bm25 = None
+            self.metadata_index = None
+
+    def save_local_indexes(self):
+        """Persists the BM25 and metadata indexes, recording the collection size they match."""
+        if not self.collection:
+            return
+        for index, path in ((self.bm25, self.bm25_path), (self.metadata_index, self.metadata_index_path)):
+            if index is None:
+                continue
+            try:
+                index.source_count = self.collection.count()
+                index.save(path)
+            except Exception as e:
+                logger.error(f"Failed to save index to {path}: {e}")
+
+    def build_where(self, filters: Dict[str, List[str]], min_matches: int = METADATA_FILTER_MIN_MATCHES) -> Optional[dict]:
+        """
+        Builds a ChromaDB where clause from requested metadata values, using the metadata index to
+        keep only values that exist and clauses that still select enough chunks.
+
+        All usable field clauses are combined with $and if the intersection is large enough;
+        otherwise the most selective single clause that is large enough is used.
+
+        Args:
+            filters (Dict[str, List[str]]): Metadata field -> acceptable values (e.g., {"class": ["Forest"]}).
+            min_matches (int): Smallest number of chunks a filter must select to be applied.
+
+        Returns:
+            Optional[dict]: The where clause, or None to query unfiltered.
+        """
+        if self.metadata_index is None or not filters:
+            return None
+
+        clauses = []
+        for field, requested in filters.items():
+            values = self.metadata_index.resolve_values(field, requested or [])
+            if not values:
+                continue
+            clause = {field: values[0]} if len(values) == 1 else {field: {"$in": values}}
+            matches = self.metadata_index.match(clause)
+            if matches is not None and len(matches) >= min_matches:
+                clauses.append((clause, matches))
+
+        if not clauses:
+            return None
+        if len(clauses) > 1:
+            combined = set.intersection(*(matches for _, matches in clauses))
+            if len(combined) >= min_matches:
+                return {"$and": [clause for clause, _ in clauses]}
+        clause, matches = min(clauses, key=lambda item: len(item[1]))
+        logger.debug(f"Metadata filter {clause} selects {len(matches)} of {len(self.metadata_index)} chunks.")
+        return clause
+
+    def embed_queries(self, query_texts: List[str]) -> np.ndarray:
+        """
+        Embeds query texts with the collection's bi-encoder, so the result can be passed back
+        as query_embeddings or shared with other stages. Goes through the shared TextEmbedder
+        and therefore the inference scheduler, batching queries from concurrent runs.
+
+        Args:
+            query_texts (List[str]): The query texts.
+
+        Returns:
+            np.ndarray: Query embeddings (len(query_texts) x d), float32.
+        """
+        return get_text_embedder(self.embedding_model_name).encode(list(query_texts))
+
+    @staticmethod
+    def _results_to_docs(results: dict, row: int) -> list:
+        documents = results['documents'][row]
+        metadatas = results['metadatas'][row] if results.get('metadatas') else [{}] * len(documents)
+        distances = results['distances'][row] if results.get('distances') else [None] * len(documents)
+        return [
+            {"id": doc_id, "content": doc, "metadata": meta or {}, "distance": dist}
+            for doc_id, doc, meta, dist in zip(results['ids'][row], documents, metadatas, distances)
+        ]
+
+    def _fuse_with_bm25(self, query_texts: List[str], dense_results: List[list], k: int, allowed_ids: Optional[set] = None) -> List[list]:
+        """
+        Fuses each query's dense candidates with its BM25 candidates by reciprocal rank fusion.
+        Chunks found only by BM25 are fetched from the collection in one get call.
+        """
+        sparse_results = [self.bm25.search(text, k=max(k, HYBRID_CANDIDATES_PER_LIST), allowed_ids=allowed_ids) for text in query_texts]
+        by_id = {doc["id"]: doc for docs in dense_results for doc in docs}
+        missing = list(dict.fromkeys(doc_id for sparse in sparse_results for doc_id, _ in sparse if doc_id not in by_id))
+        if missing:
+            fetched = self.collection.get(ids=missing, include=["documents", "metadatas"])
+            for doc_id, doc, meta in zip(fetched['ids'], fetched['documents'], fetched['metadatas']):
+                by_id[doc_id] = {"id": doc_id, "content": doc, "metadata": meta or {}, "distance": None}
+
+        fused_results = []
+        for dense, sparse in zip(dense_results, sparse_results):
+            bm25_scores = dict(sparse)
+            fused = reciprocal_rank_fusion([[doc["id"] for doc in dense], [doc_id for doc_id, _ in sparse]], k=RRF_K)
+            dense_by_id = {doc["id"]: doc for doc in dense}
+            fused_results.append([
+                {**dense_by_id.get(doc_id, by_id[doc_id]), "rrf_score": score, "bm25_score": bm25_scores.get(doc_id)}
+                for doc_id, score in fused if doc_id in by_id
+            ][:k])
+        return fused_results
+
+    def query(self, query_text: str, k: int = None, query_embedding: Optional[np.ndarray] = None, where: Optional[dict] = None) -> list:
         """
         Queries the ChromaDB collection for relevant text chunks.
 
         Args:
             query_text (str): The query text.
             k (int, optional): Number of nearest neighbors to retrieve. Defaults to config.
+            query_embedding (np.ndarray, optional): Precomputed embedding of query_text from the same
+                                                    model; skips embedding the query again.
+            where (dict, optional): ChromaDB metadata filter, e.g. from build_where().
 
         Returns:
             list: List of retrieved text chunks as dictionaries.
                   Returns empty list if collection is unavailable.
         """
+        embeddings = None if query_embedding is None else np.asarray(query_embedding).reshape(1, -1)
+        results = self.query_batch([query_text], k=k, query_embeddings=embeddings, where=where)
+        return results[0] if results else []
+
+    def query_batch(self, query_texts: List[str], k: int = None, query_embeddings: Optional[np.ndarray] = None,
+                    where: Optional[dict] = None) -> List[list]:
+        """
+        Queries the ChromaDB collection for several queries in a single call.
+        In hybrid mode, each query's dense and BM25 candidates are fused by reciprocal rank fusion.
+
+        Args:
+            query_texts (List[str]): The query texts.
+            k (int, optional): Number of nearest neighbors to retrieve per query. Defaults to config.
+            query_embeddings (np.ndarray, optional): Precomputed query embeddings (len(query_texts) x d).
+                                                     If given, the texts are not embedded again.
+            where (dict, optional): ChromaDB metadata filter applied to every query, e.g. from build_where().
+
+        Returns:
+            List[list]: One list of retrieved text chunks per query, in input order.
+                        Lists are empty if the collection is unavailable or the query fails.
+        """
         if not self.collection:
             logger.warning("ChromaDB collection is not available. Returning empty results.")
+            return [[] for _ in query_texts]
+        if not query_texts:
             return []
 
         k = k or CHROMA_RETRIEVAL_K
-        logger.debug(f"Querying ChromaDB for: {query_text[:50]}... (k={k})")
+        logger.debug(f"Querying ChromaDB for {len(query_texts)} queries, first: {query_texts[0][:50]}... (k={k})")
 
         try:
+            if query_embeddings is None:
+                query_embeddings = self.embed_queries(query_texts)
+            allowed_ids = None
+            if where and self.metadata_index is not None:
+                allowed_ids = self.metadata_index.match(where)
+            # BM25 can only honour filters the metadata index can evaluate
+            use_bm25 = self.hybrid and self.bm25 is not None and len(self.bm25) > 0 and (not where or allowed_ids is not None)
             results = self.collection.query(
-                query_texts=[query_text],
-                n_results=k
+                query_embeddings=np.asarray(query_embeddings, dtype=np.float32),
+                n_results=max(k, HYBRID_CANDIDATES_PER_LIST) if use_bm25 else k,
+                where=where or None
             )
-            retrieved_docs = []
-            for i in range(len(results['ids'][0])):
-                doc = {
-                    "content": results['documents'][0][i],
-                    "metadata": results['metadatas'][0][i] if results['metadatas'] else {},
-                    "distance": results['distances'][0][i] if results['distances'] else None
-                }
-                retrieved_docs.append(doc)
-
-            logger.debug(f"ChromaDB query returned {len(retrieved_docs)} results.")
-            return retrieved_docs
+            retrieved = [self._results_to_docs(results, row) for row in range(len(query_texts))]
+            if use_bm25:
+                retrieved = self._fuse_with_bm25(query_texts, retrieved, k, allowed_ids)
+
+            logger.debug(f"ChromaDB batch query returned {sum(len(r) for r in retrieved)} results.")
+            return retrieved
 
         except Exception as e:
             logger.error(f"Error querying ChromaDB: {e}")
-            return []
+            return [[] for _ in query_texts]
+
+    def max_batch_size(self) -> int:
+        """Returns the largest number of records the client accepts in one add/upsert call."""
+        try:
+            return int(self.client.get_max_batch_size())
+        except Exception:
+            return 5000 # Conservative default for clients without get_max_batch_size
+
+    def existing_ids(self, ids: List[str]) -> set:
+        """
+        Returns the subset of ids already stored in the collection.
+
+        Args:
+            ids (List[str]): Candidate document ids.
+
+        Returns:
+            set: The ids that are present.
+        """
+        if not self.collection or not ids:
+            return set()
+        try:
+            return set(self.collection.get(ids=list(ids), include=[])['ids'])
+        except Exception as e:
+            logger.error(f"Error looking up ChromaDB ids: {e}")
+            return set()
 
+    def upsert(self, ids: List[str], documents: List[str], metadatas: List[dict], embeddings: Optional[np.ndarray] = None) -> bool:
+        """
+        Inserts or updates documents in the collection and the local indexes.
+
+        Args:
+            ids (List[str]): Document ids.
+            documents (List[str]): Document texts.
+            metadatas (List[dict]): Metadata per document.
+            embeddings (np.ndarray, optional): Precomputed embeddings (len(ids) x d). If None, the
+                                               collection's embedding function is used.
+
+        Returns:
+            bool: True if the upsert succeeded.
+        """
+        if not self.collection:
+            logger.warning("ChromaDB collection is not available. Nothing upserted.")
+            return False
+        try:
+            self.collection.upsert(
+                ids=list(ids), documents=list(documents), metadatas=list(metadatas),
+                embeddings=None if embeddings is None else np.asarray(embeddings, dtype=np.float32)
+            )
+            if self.bm25 is not None:
+                self.bm25.add(ids, documents)
+            if self.metadata_index is not None:
+                self.metadata_index.add(ids, metadatas)
+            return True
+        except Exception as e:
+            logger.error(f"Error upserting {len(ids)} documents into ChromaDB: {e}")
+            return False
+
+    def delete(self, ids: List[str]) -> bool:
+        """
+        Deletes documents from the collection and the local indexes by id.
+
+        Args:
+            ids (List[str]): Document ids.
+
+        Returns:
+            bool: True if the delete succeeded.
+        """
+        if not self.collection or not ids:
+            return False
+        try:
+            self.collection.delete(ids=list(ids))
+            if self.bm25 is not None:
+                self.bm25.remove(ids)
+            if self.metadata_index is not None:
+                self.metadata_index.remove(ids)
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting {len(ids)} documents from ChromaDB: {e}")
+            return False
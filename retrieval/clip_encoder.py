@@ -1,8 +1,19 @@
 import logging
+import time
+import numpy as np
 import torch
 import open_clip
 from PIL import Image
-from sat_sight.core.config import DEBUG
+from concurrent.futures import Future
+from typing import List, Tuple
+from sat_sight.core.config import (
+    DEBUG, FAST_IMAGE_PREPROCESS, TILE_OVERLAP, TILE_TIME_BUDGET_S, TILE_MAX_TILES,
+    TILE_BATCH_SIZE, TILE_CACHE_SIZE, TILE_SECONDS_ESTIMATE, CLIP_IMAGE_MAX_BATCH, CLIP_TEXT_MAX_BATCH
+)
+from sat_sight.retrieval.image_preprocess import preprocess_image, normalize, read_image_size, CLIP_MEAN, CLIP_STD
+from sat_sight.retrieval.tiling import plan_tile_grid, extract_tiles, file_signature
+from sat_sight.utils.inference_scheduler import get_inference_scheduler
+from sat_sight.utils.lru_cache import LRUCache
 
 logger = logging.getLogger(__name__)
 
@@ -11,25 +22,76 @@ class CLIPEncoder:
     A class to load the CLIP model and encode images/texts.
     Uses open_clip library which is compatible with Hugging Face models and original CLIP.
     """
-    def __init__(self, model_name: str = "ViT-L-14", pretrained: str = "openai"):
+    def __init__(self, model_name: str = "ViT-L-14", pretrained: str = "openai", fast_preprocess: bool = FAST_IMAGE_PREPROCESS):
         """
         Initializes the CLIP encoder.
 
         Args:
             model_name (str): Name of the CLIP visual model (e.g., "ViT-L-14").
             pretrained (str): Pretrained weights source (e.g., "openai").
+            fast_preprocess (bool): Use reduced-resolution decode and numpy preprocessing
+                                    instead of the full-size open_clip transform.
         """
+        self.fast_preprocess = fast_preprocess
+        self.tile_cache = LRUCache(max_entries=TILE_CACHE_SIZE)
+        self.seconds_per_tile = TILE_SECONDS_ESTIMATE # Running estimate, refined after every tiled encode
         logger.info(f"Initializing CLIP model: {model_name} from {pretrained}")
         try:
             self.model, _, self.preprocess = open_clip.create_model_and_transforms(
                 model_name, pretrained=pretrained, device='cpu' # Load on CPU initially
             )
             self.model.eval() # Set to evaluation mode
+            image_size = getattr(self.model.visual, "image_size", 224)
+            self.image_size = image_size[0] if isinstance(image_size, (tuple, list)) else image_size
+            self.image_mean = getattr(self.model.visual, "image_mean", None) or CLIP_MEAN
+            self.image_std = getattr(self.model.visual, "image_std", None) or CLIP_STD
             logger.info("CLIP model loaded successfully.")
         except Exception as e:
             logger.error(f"Failed to load CLIP model: {e}")
             raise e
 
+        # Single-image and single-prompt calls from concurrent runs share forward passes
+        self.scheduler = get_inference_scheduler()
+        self.image_queue = f"clip-image:{model_name}:{pretrained}"
+        self.text_queue = f"clip-text:{model_name}:{pretrained}"
+        self.scheduler.register(self.image_queue, self._encode_image_tensors, max_batch_size=CLIP_IMAGE_MAX_BATCH)
+        self.scheduler.register(self.text_queue, self._encode_texts, max_batch_size=CLIP_TEXT_MAX_BATCH)
+
+    def _encode_image_tensors(self, image_tensors: List[torch.Tensor]) -> List[torch.Tensor]:
+        """Scheduler batch function: preprocessed (3 x H x W) tensors -> normalized embeddings."""
+        return list(self.encode_image_batch(torch.stack(image_tensors), batch_size=CLIP_IMAGE_MAX_BATCH))
+
+    def _encode_texts(self, texts: List[str]) -> List[torch.Tensor]:
+        """Scheduler batch function: text prompts -> normalized embeddings."""
+        with torch.no_grad():
+            text_features = self.model.encode_text(open_clip.tokenize(texts))
+            text_features = text_features / text_features.norm(dim=-1, keepdim=True)
+        return list(text_features.cpu())
+
+    def submit_image(self, image_path: str) -> Future:
+        """
+        Preprocesses an image in the calling thread and queues it for the next shared CLIP batch.
+
+        Args:
+            image_path (str): Path to the image file.
+
+        Returns:
+            Future: Resolves to the image embedding (embedding_dim,).
+        """
+        return self.scheduler.submit_one(self.image_queue, self.load_image_tensor(image_path))
+
+    def submit_text(self, text: str) -> Future:
+        """
+        Queues a text prompt for the next shared CLIP batch.
+
+        Args:
+            text (str): The text prompt.
+
+        Returns:
+            Future: Resolves to the text embedding (embedding_dim,).
+        """
+        return self.scheduler.submit_one(self.text_queue, text)
+
     def encode_image(self, image_path: str) -> torch.Tensor:
         """
         Encodes a single image from a file path.
@@ -38,23 +100,37 @@ class CLIPEncoder:
             image_path (str): Path to the image file.
 
         Returns:
-            torch.Tensor: The image embedding (1 x embedding_dim).
+            torch.Tensor: The image embedding (embedding_dim,).
         """
         try:
             logger.debug(f"Encoding image: {image_path}")
-            image = Image.open(image_path).convert("RGB") # Ensure RGB
-            image_tensor = self.preprocess(image).unsqueeze(0) # Add batch dimension
-
-            with torch.no_grad(): # Disable gradient calculation for efficiency
-                image_features = self.model.encode_image(image_tensor)
-                image_features = image_features / image_features.norm(dim=-1, keepdim=True)
-
+            image_features = self.submit_image(image_path).result()
             logger.debug(f"Encoded image shape: {image_features.shape}")
-            return image_features.squeeze(0).cpu() # Remove batch dim and move to CPU for storage
+            return image_features
         except Exception as e:
             logger.error(f"Error encoding image {image_path}: {e}")
             raise e
 
+    def load_image_tensor(self, image_path: str) -> torch.Tensor:
+        """
+        Loads and preprocesses an image into a (3 x H x W) model input tensor.
+        Uses the fast reduced-resolution path when enabled, falling back to the
+        open_clip transform if it fails.
+
+        Args:
+            image_path (str): Path to the image file.
+
+        Returns:
+            torch.Tensor: The preprocessed image tensor.
+        """
+        if self.fast_preprocess:
+            try:
+                return torch.from_numpy(preprocess_image(image_path, self.image_size, self.image_mean, self.image_std))
+            except Exception as e:
+                logger.warning(f"Fast preprocessing failed for {image_path}: {e}. Using open_clip transform.")
+        image = Image.open(image_path).convert("RGB") # Ensure RGB
+        return self.preprocess(image)
+
     def encode_text(self, text: str) -> torch.Tensor:
         """
         Encodes a single text prompt.
@@ -63,19 +139,73 @@ class CLIPEncoder:
             text (str): The text prompt.
 
         Returns:
-            torch.Tensor: The text embedding (1 x embedding_dim).
+            torch.Tensor: The text embedding (embedding_dim,).
         """
         try:
             logger.debug(f"Encoding text: {text[:50]}...") # Log first 50 chars
-            text_tokens = open_clip.tokenize([text]) # Tokenize as a list
-
-            with torch.no_grad():
-                text_features = self.model.encode_text(text_tokens)
-                text_features = text_features / text_features.norm(dim=-1, keepdim=True)
-
+            text_features = self.submit_text(text).result()
             logger.debug(f"Encoded text shape: {text_features.shape}")
-            return text_features.squeeze(0).cpu() # Remove batch dim and move to CPU
+            return text_features
         except Exception as e:
             logger.error(f"Error encoding text '{text}': {e}")
             raise e
 
+    def encode_image_batch(self, image_tensors: torch.Tensor, batch_size: int = TILE_BATCH_SIZE) -> torch.Tensor:
+        """
+        Encodes a batch of preprocessed images in chunks of batch_size.
+
+        Args:
+            image_tensors (torch.Tensor): Preprocessed images (N x 3 x H x W).
+            batch_size (int): Number of images per forward pass.
+
+        Returns:
+            torch.Tensor: Normalized image embeddings (N x embedding_dim).
+        """
+        outputs = []
+        with torch.no_grad():
+            for start in range(0, image_tensors.shape[0], batch_size):
+                features = self.model.encode_image(image_tensors[start:start + batch_size])
+                outputs.append(features / features.norm(dim=-1, keepdim=True))
+        return torch.cat(outputs).cpu()
+
+    def encode_image_tiles(self, image_path: str, time_budget_s: float = TILE_TIME_BUDGET_S,
+                           max_tiles: int = TILE_MAX_TILES, overlap: float = TILE_OVERLAP) -> Tuple[np.ndarray, List[tuple]]:
+        """
+        Encodes a large scene as a grid of overlapping tiles.
+        The number of tiles follows the time budget using the running per-tile cost estimate;
+        tiles already encoded for the same file version are served from the tile cache.
+
+        Args:
+            image_path (str): Path to the image file.
+            time_budget_s (float): Target encoding time for the whole scene, in seconds.
+            max_tiles (int): Hard upper bound on the number of tiles.
+            overlap (float): Fractional overlap between neighbouring tiles.
+
+        Returns:
+            Tuple[np.ndarray, List[tuple]]: Tile embeddings (N x embedding_dim, float32) and
+                                            tile boxes (top, left, bottom, right) in original pixels.
+        """
+        width, height = read_image_size(image_path)
+        budget_tiles = int(time_budget_s / max(self.seconds_per_tile, 1e-3))
+        rows, cols = plan_tile_grid(width, height, self.image_size, overlap, min(max_tiles, budget_tiles))
+        logger.debug(f"Tiling {image_path} ({width}x{height}) into a {rows}x{cols} grid.")
+
+        tiles, boxes, grid_shape = extract_tiles(image_path, rows, cols, self.image_size, overlap)
+        signature = file_signature(image_path)
+        keys = [(signature, grid_shape, box) for box in boxes]
+
+        embeddings = [self.tile_cache.get(key) for key in keys]
+        missing = [i for i, emb in enumerate(embeddings) if emb is None]
+
+        if missing:
+            batch = torch.from_numpy(normalize(tiles[missing], self.image_mean, self.image_std))
+            start = time.perf_counter()
+            encoded = self.encode_image_batch(batch).numpy().astype(np.float32)
+            elapsed = time.perf_counter() - start
+            self.seconds_per_tile = 0.7 * self.seconds_per_tile + 0.3 * (elapsed / len(missing))
+            for i, emb in zip(missing, encoded):
+                embeddings[i] = emb
+                self.tile_cache.put(keys[i], emb)
+
+        logger.info(f"Encoded {len(boxes)} tiles ({len(boxes) - len(missing)} from cache) for {image_path}.")
+        return np.stack(embeddings), boxes
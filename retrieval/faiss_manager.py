@@ -3,6 +3,7 @@ import numpy as np
 import faiss
 import pickle
 from pathlib import Path
+from typing import Callable, List, Optional
 from sat_sight.core.config import FAISS_INDEX_PATH, DEBUG
 
 logger = logging.getLogger(__name__)
@@ -24,6 +25,9 @@ class FAISSManager:
         self.dimension = dimension
         self.index = None
         self.metadata_map = {} # Map FAISS ID -> metadata (e.g., image path, class, description)
+        self.description_embeddings = None # Unique description texts embedded with a bi-encoder (U x d)
+        self.description_index = {} # Map description text -> row in description_embeddings
+        self.description_model_name = None
         self.load_index()
 
     def load_index(self):
@@ -59,6 +63,8 @@ class FAISSManager:
             logger.info(f"Metadata map not found at {metadata_file}. Starting with empty map.")
             self.metadata_map = {}
 
+        self.load_description_embeddings()
+
     def save_index(self):
         """
         Saves the current FAISS index and metadata map to disk.
@@ -72,6 +78,81 @@ class FAISSManager:
         with open(metadata_file, 'wb') as f:
             pickle.dump(self.metadata_map, f)
 
+        if self.description_embeddings is not None:
+            self.save_description_embeddings()
+
+    def _metadata_values(self) -> list:
+        if isinstance(self.metadata_map, dict):
+            return list(self.metadata_map.values())
+        if isinstance(self.metadata_map, list):
+            return self.metadata_map
+        return []
+
+    def load_description_embeddings(self):
+        """
+        Loads the precomputed description embeddings stored next to the metadata map, if present.
+        """
+        desc_file = Path(self.index_path).with_suffix('.desc.npz')
+        if not desc_file.exists():
+            logger.info(f"Description embeddings not found at {desc_file}.")
+            return
+        try:
+            data = np.load(desc_file, allow_pickle=False)
+            descriptions = [str(d) for d in data["descriptions"]]
+            self.description_embeddings = data["embeddings"].astype('float32')
+            self.description_index = {desc: i for i, desc in enumerate(descriptions)}
+            self.description_model_name = str(data["model_name"])
+            logger.info(f"Loaded {len(descriptions)} description embeddings ({self.description_model_name}).")
+        except Exception as e:
+            logger.error(f"Failed to load description embeddings: {e}. Image reranking will use the cross-encoder.")
+            self.description_embeddings = None
+            self.description_index = {}
+
+    def save_description_embeddings(self):
+        """
+        Saves the description embeddings next to the index as <index>.desc.npz.
+        """
+        desc_file = Path(self.index_path).with_suffix('.desc.npz')
+        descriptions = sorted(self.description_index, key=self.description_index.get)
+        logger.info(f"Saving {len(descriptions)} description embeddings to {desc_file}")
+        np.savez(desc_file, descriptions=np.array(descriptions, dtype=str),
+                 embeddings=self.description_embeddings, model_name=np.array(self.description_model_name or ""))
+
+    def build_description_embeddings(self, embed_fn: Callable[[List[str]], np.ndarray], model_name: str = ""):
+        """
+        Embeds every unique 'description' in the metadata map once and saves the result.
+        Descriptions come from a small fixed set, so this is run at index time rather than per query.
+
+        Args:
+            embed_fn (Callable): Maps a list of texts to normalized embeddings (N x d).
+            model_name (str): Name of the bi-encoder, stored to detect stale embeddings.
+        """
+        descriptions = sorted({meta.get("description", "") for meta in self._metadata_values() if meta.get("description")})
+        logger.info(f"Embedding {len(descriptions)} unique image descriptions.")
+        self.description_embeddings = np.asarray(embed_fn(descriptions), dtype='float32')
+        self.description_index = {desc: i for i, desc in enumerate(descriptions)}
+        self.description_model_name = model_name
+        self.save_description_embeddings()
+
+    def get_description_embeddings(self, metadata_list: List[dict]) -> Optional[np.ndarray]:
+        """
+        Looks up the precomputed description embedding of every metadata entry.
+
+        Args:
+            metadata_list (List[dict]): Metadata dictionaries returned by search.
+
+        Returns:
+            Optional[np.ndarray]: Embeddings (len(metadata_list) x d); rows for unknown descriptions are zero.
+                                  None if description embeddings are not available.
+        """
+        if self.description_embeddings is None:
+            return None
+        rows = np.array([self.description_index.get(meta.get("description", ""), -1) for meta in metadata_list])
+        embeddings = np.zeros((len(metadata_list), self.description_embeddings.shape[1]), dtype='float32')
+        known = rows >= 0
+        embeddings[known] = self.description_embeddings[rows[known]]
+        return embeddings
+
     def add_embedding(self, embedding: np.ndarray, metadata: dict, id: int = None):
         """
         Adds a single embedding and its metadata to the index.
@@ -131,3 +212,36 @@ class FAISSManager:
         logger.debug(f"Search returned {len(metadata_list)} results.")
         return distances[0], metadata_list # Return first query's results (distances, metadatas)
 
+    def search_batch(self, query_embeddings: np.ndarray, k: int = 5) -> tuple:
+        """
+        Searches the index for the k most similar embeddings of every query in one call.
+
+        Args:
+            query_embeddings (np.ndarray): Query embeddings (N x dimension), should be normalized.
+            k (int): Number of nearest neighbors to retrieve per query.
+
+        Returns:
+            tuple: (distances, metadata_lists)
+                   distances (np.ndarray): Similarity scores (N x k).
+                   metadata_lists (list): One list of metadata dictionaries per query.
+        """
+        if query_embeddings.ndim == 1:
+            query_embeddings = query_embeddings.reshape(1, -1)
+
+        if self.index.ntotal == 0:
+            logger.warning("FAISS index is empty. Returning empty results.")
+            return np.empty((query_embeddings.shape[0], 0), dtype='float32'), [[] for _ in range(query_embeddings.shape[0])]
+
+        logger.debug(f"Batch searching {query_embeddings.shape[0]} queries for {k} nearest neighbors.")
+        distances, indices = self.index.search(np.ascontiguousarray(query_embeddings, dtype='float32'), k)
+
+        metadata_lists = []
+        for row in indices:
+            if isinstance(self.metadata_map, dict):
+                metadata_lists.append([self.metadata_map.get(i, {}) for i in row])
+            elif isinstance(self.metadata_map, list):
+                metadata_lists.append([self.metadata_map[i] if 0 <= i < len(self.metadata_map) else {} for i in row])
+            else:
+                metadata_lists.append([{} for _ in row])
+
+        return distances, metadata_lists
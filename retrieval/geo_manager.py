@@ -1,33 +1,244 @@
 """
 Manager for geospatial data retrieval (e.g., from OpenStreetMap).
-Provides functions to query location-specific information.
+Provides functions to query location-specific information, either live (Overpass/Nominatim via
+osmnx) or entirely from a local OSM extract (see retrieval/osm_offline.py).
 """
 import logging
 import osmnx as ox
-from typing import Dict, Any, Optional, List
+from osmnx._errors import InsufficientResponseError
+from typing import Dict, Any, Iterable, Optional, List
 import geopandas as gpd
 import pandas as pd
+from shapely.geometry import Point
+from sat_sight.core.config import (
+    GEO_OFFLINE_EXTRACT_PATH, GEO_OFFLINE_GAZETTEER_PATH, GEO_INCLUDE_RAW_RECORDS, GEO_SUMMARY_TOP_N,
+    GEOCODE_CACHE_TTL_S, GEOCODE_NEGATIVE_TTL_S
+)
+from sat_sight.retrieval.location_index import get_location_index
+from sat_sight.retrieval.osm_offline import OfflineOSMStore, normalize_place_name, tag_mask
+from sat_sight.utils.persistent_cache import PersistentCache
 
 logger = logging.getLogger(__name__)
 
+# Output key -> (OSM tag filter, columns reported). All categories are fetched with a single
+# combined Overpass query and split locally, so adding a category adds no round-trip.
+OSM_FEATURE_CATEGORIES = {
+    "nearby_roads": ({"highway": True}, ["highway", "name", "length"]),
+    "nearby_landuse_or_buildings": ({"landuse": True, "building": True}, ["landuse", "building", "name"]),
+    "nearby_protected_areas": ({"boundary": "protected_area", "protection_title": True}, ["protection_title", "name", "operator"]),
+    "nearby_water_bodies": ({"natural": "water", "water": True}, ["natural", "water", "name"]),
+    "nearby_amenities": ({"amenity": True}, ["amenity", "name", "operator"]),
+}
+
+# Column whose values are counted per category in the summary
+CATEGORY_TYPE_COLUMNS = {
+    "nearby_roads": "highway",
+    "nearby_landuse_or_buildings": "landuse",
+    "nearby_protected_areas": "protection_title",
+    "nearby_water_bodies": "water",
+    "nearby_amenities": "amenity",
+}
+
+
+def combined_tags(categories: Dict[str, tuple] = OSM_FEATURE_CATEGORIES) -> Dict[str, Any]:
+    """
+    Merges the tag filters of all categories into one osmnx tags dict (features matching any tag).
+    A key requested as True by any category is fetched whole; otherwise its values are merged into a list.
+    """
+    merged: Dict[str, Any] = {}
+    for tags, _ in categories.values():
+        for key, value in tags.items():
+            if value is True or merged.get(key) is True:
+                merged[key] = True
+                continue
+            values = merged.get(key, [])
+            values = values if isinstance(values, list) else [values]
+            for item in (value if isinstance(value, list) else [value]):
+                if item not in values:
+                    values.append(item)
+            merged[key] = values
+    return merged
+
+
+def split_features(features: Optional[gpd.GeoDataFrame], categories: Dict[str, tuple] = OSM_FEATURE_CATEGORIES) -> Dict[str, List[dict]]:
+    """
+    Splits one combined OSM feature download into per-category records with vectorised tag masks.
+
+    Args:
+        features (gpd.GeoDataFrame, optional): Features returned for combined_tags(categories).
+        categories (Dict[str, tuple]): Output key -> (tag filter, columns).
+
+    Returns:
+        Dict[str, List[dict]]: Output key -> records with the category's columns (missing columns are None).
+    """
+    if features is None or features.empty:
+        return {key: [] for key in categories}
+    result = {}
+    for key, (tags, columns) in categories.items():
+        selected = features.loc[tag_mask(features, tags)].reindex(columns=columns)
+        result[key] = selected.astype(object).where(selected.notna(), None).to_dict('records')
+    return result
+
+
+def summarize_features(features: Optional[gpd.GeoDataFrame], lat: float, lon: float, radius: float,
+                       categories: Dict[str, tuple] = OSM_FEATURE_CATEGORIES, top_n: int = GEO_SUMMARY_TOP_N) -> Dict[str, Any]:
+    """
+    Aggregates the features around a point into a compact, bounded-size summary.
+    Geometries are projected once to the local UTM zone; lengths, areas and distances are in meters
+    and measured inside the square query area.
+
+    Args:
+        features (gpd.GeoDataFrame, optional): Features returned for combined_tags(categories).
+        lat (float): Latitude of the query center.
+        lon (float): Longitude of the query center.
+        radius (float): Query radius in meters (half the side of the query square).
+        categories (Dict[str, tuple]): Output key -> (tag filter, columns).
+        top_n (int): Most frequent types reported per category.
+
+    Returns:
+        Dict[str, Any]: feature_counts and type_counts per category, building_count, road_length_km,
+                        nearest_water_m / nearest_water_name, and landuse_area_shares.
+    """
+    names = {key: key.replace("nearby_", "") for key in categories}
+    summary: Dict[str, Any] = {
+        "feature_counts": {name: 0 for name in names.values()},
+        "type_counts": {name: {} for name in names.values()},
+        "building_count": 0,
+        "road_length_km": 0.0,
+        "nearest_water_m": None,
+        "nearest_water_name": None,
+        "landuse_area_shares": {},
+    }
+    if features is None or features.empty:
+        return summary
+
+    projected = features.to_crs(features.estimate_utm_crs())
+    center = gpd.GeoSeries([Point(lon, lat)], crs="EPSG:4326").to_crs(projected.crs).iloc[0]
+    area = center.buffer(radius, cap_style="square")
+    geometry = projected.geometry
+
+    masks = {key: tag_mask(projected, tags) for key, (tags, _) in categories.items()}
+    for key, mask in masks.items():
+        summary["feature_counts"][names[key]] = int(mask.sum())
+        type_column = CATEGORY_TYPE_COLUMNS.get(key)
+        if type_column in projected.columns:
+            counts = projected.loc[mask, type_column].dropna().astype(str).value_counts().head(top_n)
+            summary["type_counts"][names[key]] = {value: int(count) for value, count in counts.items()}
+
+    if "building" in projected.columns:
+        summary["building_count"] = int(projected["building"].notna().sum())
+
+    if "nearby_roads" in masks:
+        roads = geometry[masks["nearby_roads"] & geometry.geom_type.isin(["LineString", "MultiLineString"])]
+        summary["road_length_km"] = round(float(roads.intersection(area).length.sum()) / 1000.0, 3)
+
+    if "nearby_water_bodies" in masks and masks["nearby_water_bodies"].any():
+        distances = geometry[masks["nearby_water_bodies"]].distance(center)
+        nearest = distances.idxmin()
+        summary["nearest_water_m"] = round(float(distances[nearest]), 1)
+        name = projected.at[nearest, "name"] if "name" in projected.columns else None
+        summary["nearest_water_name"] = None if pd.isna(name) else str(name)
+
+    if "landuse" in projected.columns:
+        polygons = projected["landuse"].notna() & geometry.geom_type.isin(["Polygon", "MultiPolygon"])
+        areas = geometry[polygons].intersection(area).area
+        by_landuse = areas.groupby(projected.loc[polygons, "landuse"].astype(str)).sum()
+        total = float(by_landuse.sum())
+        if total > 0:
+            shares = (by_landuse / total).sort_values(ascending=False).head(top_n)
+            summary["landuse_area_shares"] = {value: round(float(share), 3) for value, share in shares.items()}
+
+    return summary
+
+
+def metadata_region_hints() -> List[str]:
+    """Returns the distinct "region, country" hints of the geo-enriched image metadata (for geocode preloading)."""
+    location_index = get_location_index()
+    if location_index is None:
+        return []
+    hints = {", ".join(part for part in (record.get("location"), record.get("country")) if part) for record in location_index.records}
+    return sorted(hint for hint in hints if hint)
+
+
 class GeoManager:
     """
     A class to manage geospatial data retrieval (e.g., from OpenStreetMap).
     Provides functions to query location-specific information.
     """
-    def __init__(self, default_radius_meters: int = 1000):
+    def __init__(self, default_radius_meters: int = 1000, offline_extract_path: str = GEO_OFFLINE_EXTRACT_PATH,
+                 offline_gazetteer_path: str = GEO_OFFLINE_GAZETTEER_PATH):
         """
         Initializes the Geo Manager.
 
         Args:
             default_radius_meters (int): Default radius in meters for geospatial queries if not specified.
+            offline_extract_path (str): Local OSM extract. If set, geocoding and feature queries are
+                                        answered from it without any network access.
+            offline_gazetteer_path (str): "name<TAB>lat<TAB>lon" gazetteer used for offline geocoding.
         """
         self.default_radius_meters = default_radius_meters
+        self.offline_store = None
+        self.geocode_cache = None
+        if offline_extract_path:
+            self.offline_store = OfflineOSMStore(offline_extract_path, offline_gazetteer_path, tags=combined_tags())
+            logger.info(f"GeoManager initialized in offline mode ({offline_extract_path}).")
+            return
         ox.settings.cache_folder = "data/osm_cache" # Optional: cache OSM data locally
         ox.settings.use_cache = True # Use cache to avoid repeated API calls
+        self.geocode_cache = PersistentCache("geocode")
         logger.info("GeoManager initialized with OSMnx.")
 
-    def query_location_info(self, location_hint: str, radius_meters: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    def geocode(self, location_hint: str) -> Optional[tuple]:
+        """
+        Resolves a location hint to (lat, lon) with the local gazetteer (offline mode) or Nominatim.
+        Nominatim results, including misses, are kept in the persistent geocode cache, so each
+        distinct hint is only sent once per TTL.
+
+        Returns:
+            Optional[tuple]: (lat, lon), or None if the hint cannot be geocoded.
+        """
+        if self.offline_store is not None:
+            return self.offline_store.geocode(location_hint)
+
+        key = normalize_place_name(location_hint)
+        entry = self.geocode_cache.get(key)
+        if entry is not None and entry.is_fresh:
+            return None if entry.is_negative else tuple(entry.value)
+
+        try:
+            lat, lon = ox.geocoder.geocode(query=location_hint)
+        except InsufficientResponseError:
+            logger.info(f"GeoManager: No geocoding result for '{location_hint}', caching the miss.")
+            self.geocode_cache.put(key, None, ttl_s=GEOCODE_NEGATIVE_TTL_S)
+            return None
+        self.geocode_cache.put(key, [float(lat), float(lon)], ttl_s=GEOCODE_CACHE_TTL_S)
+        return float(lat), float(lon)
+
+    def preload_geocodes(self, location_hints: Optional[Iterable[str]] = None) -> int:
+        """
+        Geocodes hints that are not cached yet, so later queries are cache hits.
+
+        Args:
+            location_hints (Iterable[str], optional): Hints to resolve. Defaults to the regions of the image metadata.
+
+        Returns:
+            int: Number of hints resolved (successfully or as misses) during this call.
+        """
+        if self.offline_store is not None:
+            return 0
+        hints = list(location_hints) if location_hints is not None else metadata_region_hints()
+        pending = {normalize_place_name(hint): hint for hint in hints}
+        missing = self.geocode_cache.missing(pending.keys())
+        logger.info(f"GeoManager: Preloading {len(missing)} of {len(pending)} geocodes.")
+        for key in missing:
+            try:
+                self.geocode(pending[key])
+            except Exception as e:
+                logger.warning(f"GeoManager: Failed to preload geocode for '{pending[key]}': {e}")
+        return len(missing)
+
+    def query_location_info(self, location_hint: str, radius_meters: Optional[int] = None,
+                            include_records: bool = GEO_INCLUDE_RAW_RECORDS) -> Optional[Dict[str, Any]]:
         """
         Queries OpenStreetMap for information around a location hint (address, place name, or coordinates).
 
@@ -35,17 +246,19 @@ class GeoManager:
             location_hint (str): A string representing the location (e.g., "Paris, France", "48.8566, 2.3522", "Tropical Rainforest near Manaus").
                                 For satellite imagery, this might come from image metadata (e.g., 'region_hint': 'Andalusia, Spain') or filename.
             radius_meters (int, optional): Radius in meters around the central point to query. Uses default if not provided.
+            include_records (bool): Also return the raw per-feature records (nearby_roads, nearby_amenities, ...).
+                                    Off by default: dense urban areas yield thousands of rows.
 
         Returns:
-            Optional[Dict[str, Any]]: Dictionary containing retrieved geospatial information like nearby features,
-                                    elevation (if available via other means), land use, etc.
+            Optional[Dict[str, Any]]: Dictionary containing the query center and radius and a compact "summary"
+                                    (feature counts, type counts, road length, nearest water, land-use shares).
                                     Returns None if no data is found or an error occurs.
         """
         radius = radius_meters or self.default_radius_meters
         logger.debug(f"GeoManager: Querying OSM for location: '{location_hint}' within {radius}m radius.")
 
         try:
-            geocode_result = ox.geocoder.geocode(query=location_hint)
+            geocode_result = self.geocode(location_hint)
             if not geocode_result or len(geocode_result) < 2:
                  logger.warning(f"GeoManager: Could not geocode location hint: '{location_hint}'.")
                  return None
@@ -55,59 +268,20 @@ class GeoManager:
 
             point = (lat, lon)
 
-            try:
-                tags = {'highway': True} # Example: get highways
-                gdf_roads = ox.features.features_from_point(center_point=point, tags=tags, dist=radius)
-                road_info = gdf_roads[['highway', 'name', 'length']].to_dict('records') if not gdf_roads.empty else []
-            except Exception as e:
-                 logger.warning(f"GeoManager: Error querying OSM for roads near '{location_hint}': {e}")
-                 road_info = []
-
-            try:
-                tags = {'landuse': True, 'building': True} # Example: get landuse and buildings
-                gdf_landuse = ox.features.features_from_point(center_point=point, tags=tags, dist=radius)
-                landuse_info = gdf_landuse[['landuse', 'building', 'name']].to_dict('records') if not gdf_landuse.empty else []
-            except Exception as e:
-                 logger.warning(f"GeoManager: Error querying OSM for landuse/buildings near '{location_hint}': {e}")
-                 landuse_info = []
-
-            try:
-                tags = {'boundary': 'protected_area', 'protection_title': True}
-                gdf_protected = ox.features.features_from_point(center_point=point, tags=tags, dist=radius)
-                protected_info = gdf_protected[['protection_title', 'name', 'operator']].to_dict('records') if not gdf_protected.empty else []
-            except Exception as e:
-                 logger.warning(f"GeoManager: Error querying OSM for protected areas near '{location_hint}': {e}")
-                 protected_info = []
-
-            try:
-                tags = {'natural': 'water', 'water': True}
-                gdf_water = ox.features.features_from_point(center_point=point, tags=tags, dist=radius)
-                water_info = gdf_water[['natural', 'water', 'name']].to_dict('records') if not gdf_water.empty else []
-            except Exception as e:
-                 logger.warning(f"GeoManager: Error querying OSM for water bodies near '{location_hint}': {e}")
-                 water_info = []
-
-            try:
-                tags = {'amenity': True}
-                gdf_amenities = ox.features.features_from_point(center_point=point, tags=tags, dist=radius)
-                amenity_info = gdf_amenities[['amenity', 'name', 'operator']].to_dict('records') if not gdf_amenities.empty else []
-            except Exception as e:
-                 logger.warning(f"GeoManager: Error querying OSM for amenities near '{location_hint}': {e}")
-                 amenity_info = []
-
+            features = self._fetch_features(point, radius, location_hint)
+            summary = summarize_features(features, lat, lon, radius)
 
             geo_data = {
                 "queried_location_hint": location_hint,
                 "queried_center_coordinates": {"lat": lat, "lon": lon},
                 "query_radius_meters": radius,
-                "nearby_roads": road_info,
-                "nearby_landuse_or_buildings": landuse_info,
-                "nearby_protected_areas": protected_info,
-                "nearby_water_bodies": water_info,
-                "nearby_amenities": amenity_info,
+                "summary": summary,
             }
+            if include_records:
+                geo_data.update(split_features(features))
 
-            logger.info(f"GeoManager: Retrieved geospatial data for location '{location_hint}'. Found {len(road_info)} roads, {len(landuse_info)} landuse/buildings, {len(protected_info)} protected areas, {len(water_info)} water bodies, {len(amenity_info)} amenities.")
+            counts = ", ".join(f"{count} {name}" for name, count in summary["feature_counts"].items())
+            logger.info(f"GeoManager: Retrieved geospatial data for location '{location_hint}'. Found {counts}.")
             return geo_data
 
         except Exception as e:
@@ -116,6 +290,19 @@ class GeoManager:
             traceback.print_exc()
             return None
 
+    def _fetch_features(self, point: tuple, radius: int, location_hint: str) -> Optional[gpd.GeoDataFrame]:
+        """Gets all OSM features of every category around a point: one local R-tree query or one Overpass request."""
+        try:
+            if self.offline_store is not None:
+                return self.offline_store.features_from_point(point, radius)
+            return ox.features.features_from_point(center_point=point, tags=combined_tags(), dist=radius)
+        except InsufficientResponseError:
+            logger.debug(f"GeoManager: No OSM features near '{location_hint}'.")
+            return None
+        except Exception as e:
+            logger.warning(f"GeoManager: Error querying OSM features near '{location_hint}': {e}")
+            return None
+
     def query_elevation(self, lat: float, lon: float) -> Optional[float]:
         """
         Queries elevation for a specific latitude/longitude.
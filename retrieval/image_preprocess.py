@@ -0,0 +1,216 @@
+"""
+Fast image decoding and preprocessing for CLIP inputs.
+Large satellite rasters are decoded at reduced resolution (JPEG draft mode,
+TIFF overview levels) and resized/normalised in numpy, so a full-size RGB
+copy of the scene is never materialised.
+"""
+import logging
+import os
+import numpy as np
+from PIL import Image
+from typing import List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import rasterio
+    from rasterio.enums import Resampling
+    RASTERIO_AVAILABLE = True
+except ImportError:
+    logger.debug("rasterio not available, GeoTIFFs will be decoded with PIL")
+    RASTERIO_AVAILABLE = False
+
+CLIP_MEAN = (0.48145466, 0.4578275, 0.40821073) # OpenAI CLIP normalisation constants
+CLIP_STD = (0.26862954, 0.26130258, 0.27577711)
+
+TIFF_EXTENSIONS = {".tif", ".tiff"}
+
+
+def _reduced_size(width: int, height: int, min_side: int) -> Tuple[int, int]:
+    """Returns the (width, height) whose shortest side is min_side, keeping the aspect ratio."""
+    scale = min_side / min(width, height)
+    return max(min_side, int(round(width * scale))), max(min_side, int(round(height * scale)))
+
+
+def _to_uint8_rgb(arr: np.ndarray) -> np.ndarray:
+    """
+    Converts an (H, W), (H, W, C) array of any dtype to uint8 RGB.
+    Non-uint8 data (e.g. 16-bit Sentinel reflectances) gets a 2-98 percentile stretch per band.
+    """
+    if arr.ndim == 2:
+        arr = arr[:, :, None]
+    if arr.shape[2] == 1:
+        arr = np.repeat(arr, 3, axis=2)
+    elif arr.shape[2] > 3:
+        arr = arr[:, :, :3]
+
+    if arr.dtype == np.uint8:
+        return arr
+
+    arr = arr.astype(np.float32)
+    low = np.percentile(arr, 2, axis=(0, 1))
+    high = np.percentile(arr, 98, axis=(0, 1))
+    arr = (arr - low) / np.maximum(high - low, 1e-6)
+    return (np.clip(arr, 0.0, 1.0) * 255.0).astype(np.uint8)
+
+
+def _decode_raster_reduced(image_path: str, min_side: int) -> np.ndarray:
+    """Reads a GeoTIFF with rasterio at reduced resolution; GDAL serves the read from overviews when present."""
+    with rasterio.open(image_path) as src:
+        out_w, out_h = src.width, src.height
+        if min(out_w, out_h) > min_side:
+            out_w, out_h = _reduced_size(out_w, out_h, min_side)
+        bands = list(range(1, min(src.count, 3) + 1))
+        data = src.read(bands, out_shape=(len(bands), out_h, out_w), resampling=Resampling.average)
+    return _to_uint8_rgb(np.transpose(data, (1, 2, 0)))
+
+
+def _decode_pil_reduced(image_path: str, min_side: int) -> np.ndarray:
+    """Decodes with PIL, using draft mode for JPEGs and the smallest adequate page of pyramidal TIFFs."""
+    with Image.open(image_path) as image:
+        width, height = image.size
+
+        if image.format == "JPEG" and min(width, height) > min_side:
+            image.draft("RGB", _reduced_size(width, height, min_side)) # DCT scaling, decodes at 1/2, 1/4 or 1/8
+        elif getattr(image, "n_frames", 1) > 1:
+            best_frame, best_side = 0, min(width, height)
+            for frame in range(image.n_frames):
+                image.seek(frame)
+                side = min(image.size)
+                if min_side <= side < best_side:
+                    best_frame, best_side = frame, side
+            image.seek(best_frame)
+
+        if image.mode == "P":
+            image = image.convert("RGB") # Palette images cannot be box-reduced
+        factor = min(image.size) // min_side
+        if factor > 1:
+            image = image.reduce(factor) # Box reduction in C before any mode conversion
+
+        if image.mode in ("RGB", "L", "RGBA", "CMYK", "YCbCr", "LA"):
+            image = image.convert("RGB") # Converts the reduced image only
+        return _to_uint8_rgb(np.asarray(image))
+
+
+def read_image_size(image_path: str) -> Tuple[int, int]:
+    """Returns (width, height) of an image from its header, without decoding pixels."""
+    ext = os.path.splitext(image_path)[1].lower()
+    if ext in TIFF_EXTENSIONS and RASTERIO_AVAILABLE:
+        try:
+            with rasterio.open(image_path) as src:
+                return src.width, src.height
+        except Exception:
+            pass
+    with Image.open(image_path) as image:
+        return image.size
+
+
+def decode_reduced(image_path: str, min_side: int = 224) -> np.ndarray:
+    """
+    Decodes an image so that its shortest side is close to (and not below) min_side.
+
+    Args:
+        image_path (str): Path to the image file.
+        min_side (int): Smallest shortest side needed downstream.
+
+    Returns:
+        np.ndarray: uint8 RGB array of shape (H, W, 3).
+    """
+    ext = os.path.splitext(image_path)[1].lower()
+    if ext in TIFF_EXTENSIONS and RASTERIO_AVAILABLE:
+        try:
+            return _decode_raster_reduced(image_path, min_side)
+        except Exception as e:
+            logger.warning(f"rasterio decode failed for {image_path}: {e}. Falling back to PIL.")
+    return _decode_pil_reduced(image_path, min_side)
+
+
+def _area_weights(in_size: int, out_size: int) -> np.ndarray:
+    """
+    Builds the (out_size x in_size) area-averaging matrix for a 1-D downsample.
+    Row i holds the fractional overlap of every input pixel with output pixel i.
+    """
+    scale = in_size / out_size
+    starts = np.arange(out_size, dtype=np.float32)[:, None] * scale
+    edges = np.arange(in_size, dtype=np.float32)[None, :]
+    overlap = np.minimum(starts + scale, edges + 1.0) - np.maximum(starts, edges)
+    return np.clip(overlap, 0.0, None) / scale
+
+
+def resize_area(arr: np.ndarray, out_height: int, out_width: int) -> np.ndarray:
+    """
+    Resizes an (H, W, 3) array to (out_height, out_width).
+    Downsampling is an area average applied as two matrix products in numpy;
+    only the (rare) upsampling case goes through PIL.
+
+    Returns:
+        np.ndarray: float32 array of shape (out_height, out_width, 3) in [0, 255].
+    """
+    height, width = arr.shape[:2]
+    if (height, width) == (out_height, out_width):
+        return arr.astype(np.float32)
+    if height < out_height or width < out_width:
+        resized = Image.fromarray(arr.astype(np.uint8, copy=False)).resize((out_width, out_height), Image.BICUBIC)
+        return np.asarray(resized, dtype=np.float32)
+
+    rows = _area_weights(height, out_height)
+    cols = _area_weights(width, out_width)
+    return np.einsum("iy,yxc,jx->ijc", rows, arr.astype(np.float32), cols, optimize=True)
+
+
+def resize_center_crop(arr: np.ndarray, size: int) -> np.ndarray:
+    """
+    Center-crops the shortest side and resizes to (size, size).
+
+    Args:
+        arr (np.ndarray): uint8 array of shape (H, W, 3).
+        size (int): Output side length.
+
+    Returns:
+        np.ndarray: float32 array of shape (size, size, 3) in [0, 255].
+    """
+    height, width = arr.shape[:2]
+    side = min(height, width)
+    top, left = (height - side) // 2, (width - side) // 2
+    return resize_area(arr[top:top + side, left:left + side], size, size)
+
+
+def normalize(arr: np.ndarray, mean: Sequence[float] = CLIP_MEAN, std: Sequence[float] = CLIP_STD) -> np.ndarray:
+    """
+    Scales a (..., H, W, 3) array in [0, 255] and normalises it channel-wise.
+
+    Returns:
+        np.ndarray: float32 array of shape (..., 3, H, W).
+    """
+    mean = np.asarray(mean, dtype=np.float32) * 255.0
+    std = np.asarray(std, dtype=np.float32) * 255.0
+    arr = (arr.astype(np.float32, copy=False) - mean) / std
+    return np.moveaxis(arr, -1, -3).copy()
+
+
+def preprocess_image(image_path: str, size: int = 224, mean: Sequence[float] = CLIP_MEAN,
+                     std: Sequence[float] = CLIP_STD) -> np.ndarray:
+    """
+    Fast equivalent of the open_clip eval transform (resize shortest side, center crop, normalise).
+
+    Args:
+        image_path (str): Path to the image file.
+        size (int): Model input resolution.
+        mean (Sequence[float]): Per-channel mean in [0, 1].
+        std (Sequence[float]): Per-channel std in [0, 1].
+
+    Returns:
+        np.ndarray: float32 array of shape (3, size, size).
+    """
+    arr = decode_reduced(image_path, min_side=size)
+    return normalize(resize_center_crop(arr, size), mean, std)
+
+
+def preprocess_batch(image_paths: List[str], size: int = 224, mean: Sequence[float] = CLIP_MEAN,
+                     std: Sequence[float] = CLIP_STD) -> np.ndarray:
+    """
+    Preprocesses several images into one (N, 3, size, size) float32 batch.
+    Normalisation runs once over the stacked batch.
+    """
+    stacked = np.stack([resize_center_crop(decode_reduced(p, min_side=size), size) for p in image_paths])
+    return normalize(stacked, mean, std)
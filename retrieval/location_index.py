@@ -0,0 +1,388 @@
+"""
+Precomputed inverted index over the geo-enriched EuroSAT metadata (JSONL).
+Maps lowercased country, region, source tile and class values to the positions of the images
+carrying them, so location queries resolve against a few hundred distinct values instead of
+parsing every line. Image coordinates back a KD-tree for radius, bounding-box and
+nearest-neighbour queries. The index is persisted next to the JSONL and rebuilt automatically
+when the file's modification time or size changes.
+"""
+import json
+import logging
+import os
+import pickle
+import threading
+import numpy as np
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sat_sight.core.config import GEO_METADATA_PATH, LOCATION_INDEX_PATH
+
+try:
+    from scipy.spatial import cKDTree
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 2
+LOCATION_FIELDS = ("country", "region", "tile") # Fields a location name is matched against
+EARTH_RADIUS_KM = 6371.0088
+
+
+def _coordinate(coordinates: Dict[str, Any], *keys: str) -> float:
+    for key in keys:
+        value = coordinates.get(key)
+        if value is not None:
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                return np.nan
+    return np.nan
+
+
+def to_unit_vectors(lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Converts degrees to 3-D unit vectors; chord distance between them is monotonic in great-circle distance."""
+    lat_r, lon_r = np.radians(lats), np.radians(lons)
+    cos_lat = np.cos(lat_r)
+    return np.column_stack([cos_lat * np.cos(lon_r), cos_lat * np.sin(lon_r), np.sin(lat_r)])
+
+
+def chord_to_km(chord: np.ndarray) -> np.ndarray:
+    """Converts unit-sphere chord lengths to great-circle distances in kilometres."""
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2.0, 0.0, 1.0))
+
+
+def km_to_chord(km: float) -> float:
+    """Converts a great-circle distance in kilometres to a unit-sphere chord length."""
+    return 2.0 * np.sin(min(km / EARTH_RADIUS_KM, np.pi) / 2.0)
+
+
+def file_signature(path: str) -> Tuple[int, int]:
+    """Returns (mtime_ns, size) of a file, used to detect changes to the source JSONL."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class LocationIndex:
+    """
+    Value -> image-position postings for country, region, tile and class, plus the result
+    records search_by_location returns, built in one pass over the metadata JSONL.
+    Resolved query terms are cached as boolean masks, so repeated lookups are a few vector ops.
+    """
+    def __init__(self, source_path: str, signature: Tuple[int, int]):
+        """
+        Initializes an empty index.
+
+        Args:
+            source_path (str): The metadata JSONL the index describes.
+            signature (Tuple[int, int]): (mtime_ns, size) of the JSONL when it was indexed.
+        """
+        self.source_path = source_path
+        self.signature = signature
+        self.image_ids: List[str] = []
+        self.records: List[Dict[str, Any]] = []
+        self.postings: Dict[str, Dict[str, np.ndarray]] = {field: {} for field in LOCATION_FIELDS + ("class",)}
+        self.latitudes = np.empty(0, dtype=np.float64) # NaN for images without coordinates
+        self.longitudes = np.empty(0, dtype=np.float64)
+        self._match_cache: Dict[Tuple[str, str], np.ndarray] = {}
+        self._tree = None
+        self._tree_positions: Optional[np.ndarray] = None
+        self._tree_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @classmethod
+    def build(cls, source_path: str) -> "LocationIndex":
+        """
+        Parses the metadata JSONL once and builds the postings.
+
+        Args:
+            source_path (str): The metadata JSONL.
+
+        Returns:
+            LocationIndex: The new index.
+        """
+        index = cls(source_path, file_signature(source_path))
+        positions: Dict[str, Dict[str, List[int]]] = {field: {} for field in index.postings}
+        lats: List[float] = []
+        lons: List[float] = []
+        with open(source_path, "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                location = entry.get("location", {})
+                coordinates = entry.get("coordinates", {})
+                position = len(index.records)
+                values = {
+                    "country": location.get("country", ""),
+                    "region": location.get("region", ""),
+                    "tile": coordinates.get("source_tile", ""),
+                    "class": entry.get("class", ""),
+                }
+                for field, value in values.items():
+                    positions[field].setdefault((value or "").lower(), []).append(position)
+                lats.append(_coordinate(coordinates, "lat", "latitude"))
+                lons.append(_coordinate(coordinates, "lon", "lng", "longitude"))
+                index.image_ids.append(entry.get("image_path"))
+                index.records.append({
+                    "filename": entry.get("image_path"),
+                    "class": entry.get("class"),
+                    "location": location.get("region"),
+                    "country": location.get("country"),
+                    "coordinates": coordinates,
+                    "metadata": entry
+                })
+        index.postings = {
+            field: {value: np.asarray(items, dtype=np.int32) for value, items in values.items()}
+            for field, values in positions.items()
+        }
+        index.latitudes = np.asarray(lats, dtype=np.float64)
+        index.longitudes = np.asarray(lons, dtype=np.float64)
+        logger.info(f"Location index built over {len(index)} images from {source_path}")
+        return index
+
+    def _matching(self, field: str, term: str, predicate) -> np.ndarray:
+        """Boolean mask of images whose value of field satisfies predicate(value); memoised per (field, term)."""
+        key = (field, term)
+        mask = self._match_cache.get(key)
+        if mask is None:
+            mask = np.zeros(len(self.records), dtype=bool)
+            for value, postings in self.postings[field].items():
+                if predicate(value):
+                    mask[postings] = True
+            self._match_cache[key] = mask
+        return mask
+
+    def match_location(self, location_name: str) -> np.ndarray:
+        """Mask of images whose region, country or source tile contains location_name (case-insensitive)."""
+        name = location_name.lower()
+        key = ("location", name)
+        mask = self._match_cache.get(key)
+        if mask is None:
+            mask = np.zeros(len(self.records), dtype=bool)
+            for field in LOCATION_FIELDS:
+                mask |= self._matching(field, name, lambda value: name in value)
+            self._match_cache[key] = mask
+        return mask
+
+    def match_class(self, land_class: str) -> np.ndarray:
+        """Mask of images whose class contains land_class or is contained in it (case-insensitive)."""
+        land_class = land_class.lower()
+        return self._matching("class", land_class, lambda value: land_class in value or value in land_class)
+
+    def search(self, location_names: Sequence[str], land_class: Optional[str] = None) -> np.ndarray:
+        """
+        Resolves a location query to image positions.
+
+        Args:
+            location_names (Sequence[str]): Location names; an image matches if any of them matches.
+            land_class (str, optional): Land-use class filter.
+
+        Returns:
+            np.ndarray: Matching positions in file order.
+        """
+        if not location_names:
+            return np.empty(0, dtype=np.int64)
+        mask = self.match_location(location_names[0])
+        for name in location_names[1:]:
+            mask = mask | self.match_location(name)
+        if land_class:
+            mask = mask & self.match_class(land_class)
+        return np.flatnonzero(mask)
+
+    def _spatial_tree(self) -> Tuple[Any, np.ndarray]:
+        """Builds (once) the KD-tree over unit vectors of the images that have coordinates."""
+        with self._tree_lock:
+            if self._tree_positions is None:
+                located = np.flatnonzero(~(np.isnan(self.latitudes) | np.isnan(self.longitudes)))
+                points = to_unit_vectors(self.latitudes[located], self.longitudes[located])
+                self._tree = cKDTree(points) if SCIPY_AVAILABLE and len(located) else points
+                self._tree_positions = located
+                logger.info(f"Spatial index built over {len(located)} located images"
+                            f"{'' if SCIPY_AVAILABLE else ' (scipy unavailable, using brute force)'}.")
+            return self._tree, self._tree_positions
+
+    def _chord_distances(self, lat: float, lon: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Brute-force fallback: chord distances from the point to every located image."""
+        points, located = self._spatial_tree()
+        return np.linalg.norm(points - to_unit_vectors(np.array([lat]), np.array([lon]))[0], axis=1), located
+
+    def within_radius(self, lat: float, lon: float, radius_km: float, land_class: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds images within a great-circle radius of a point.
+
+        Args:
+            lat (float): Latitude in degrees.
+            lon (float): Longitude in degrees.
+            radius_km (float): Search radius in kilometres.
+            land_class (str, optional): Land-use class filter.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Positions and distances (km), nearest first.
+        """
+        tree, located = self._spatial_tree()
+        if not len(located):
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        chord = km_to_chord(radius_km)
+        if SCIPY_AVAILABLE:
+            point = to_unit_vectors(np.array([lat]), np.array([lon]))[0]
+            hits = np.asarray(tree.query_ball_point(point, chord), dtype=np.int64)
+            positions = located[hits]
+            chords = np.linalg.norm(tree.data[hits] - point, axis=1)
+        else:
+            chords, positions = self._chord_distances(lat, lon)
+            keep = chords <= chord
+            chords, positions = chords[keep], positions[keep]
+        if land_class:
+            keep = self.match_class(land_class)[positions]
+            chords, positions = chords[keep], positions[keep]
+        order = np.argsort(chords, kind="stable")
+        return positions[order], chord_to_km(chords[order])
+
+    def nearest(self, lat: float, lon: float, k: int = 10, land_class: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the k images nearest to a point.
+
+        Args:
+            lat (float): Latitude in degrees.
+            lon (float): Longitude in degrees.
+            k (int): Number of images.
+            land_class (str, optional): Land-use class filter.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Positions and distances (km), nearest first.
+        """
+        tree, located = self._spatial_tree()
+        if not len(located) or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        allowed = self.match_class(land_class)[located] if land_class else None
+        if not SCIPY_AVAILABLE:
+            chords, positions = self._chord_distances(lat, lon)
+            if allowed is not None:
+                chords, positions = chords[allowed], positions[allowed]
+            order = np.argsort(chords, kind="stable")[:k]
+            return positions[order], chord_to_km(chords[order])
+
+        point = to_unit_vectors(np.array([lat]), np.array([lon]))[0]
+        fetch = k
+        while True: # Widen the search until k images pass the class filter (or the tree is exhausted)
+            fetch = min(fetch, len(located))
+            chords, hits = tree.query(point, k=fetch)
+            chords, hits = np.atleast_1d(chords), np.atleast_1d(hits)
+            if allowed is not None:
+                keep = allowed[hits]
+                chords, hits = chords[keep], hits[keep]
+            if len(hits) >= k or fetch == len(located):
+                return located[hits[:k]], chord_to_km(chords[:k])
+            fetch *= 4
+
+    def within_bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+                    land_class: Optional[str] = None) -> np.ndarray:
+        """
+        Finds images inside a latitude/longitude box. A box with min_lon > max_lon crosses the antimeridian.
+
+        Args:
+            min_lat (float): Southern edge in degrees.
+            min_lon (float): Western edge in degrees.
+            max_lat (float): Northern edge in degrees.
+            max_lon (float): Eastern edge in degrees.
+            land_class (str, optional): Land-use class filter.
+
+        Returns:
+            np.ndarray: Matching positions in file order.
+        """
+        with np.errstate(invalid="ignore"):
+            mask = (self.latitudes >= min_lat) & (self.latitudes <= max_lat)
+            if min_lon <= max_lon:
+                mask &= (self.longitudes >= min_lon) & (self.longitudes <= max_lon)
+            else:
+                mask &= (self.longitudes >= min_lon) | (self.longitudes <= max_lon)
+        if land_class:
+            mask &= self.match_class(land_class)
+        return np.flatnonzero(mask)
+
+    def save(self, path: str):
+        """
+        Saves the index to disk.
+
+        Args:
+            path (str): Destination pickle file.
+        """
+        state = {
+            "version": INDEX_VERSION, "source_path": self.source_path, "signature": self.signature,
+            "image_ids": self.image_ids, "records": self.records, "postings": self.postings,
+            "latitudes": self.latitudes, "longitudes": self.longitudes,
+        }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        logger.info(f"Location index with {len(self)} images saved to {path}")
+
+    @classmethod
+    def load(cls, path: str) -> Optional["LocationIndex"]:
+        """
+        Loads an index saved with save().
+
+        Args:
+            path (str): Pickle file.
+
+        Returns:
+            Optional[LocationIndex]: The index, or None if the file is missing or unreadable.
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+            if state.get("version") != INDEX_VERSION:
+                logger.warning(f"Ignoring location index {path} with unknown version {state.get('version')}")
+                return None
+        except Exception as e:
+            logger.error(f"Failed to load location index from {path}: {e}")
+            return None
+
+        index = cls(state["source_path"], tuple(state["signature"]))
+        index.image_ids = state["image_ids"]
+        index.records = state["records"]
+        index.postings = state["postings"]
+        index.latitudes = state["latitudes"]
+        index.longitudes = state["longitudes"]
+        return index
+
+
+_index: Optional[LocationIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_location_index(source_path: str = GEO_METADATA_PATH, index_path: str = LOCATION_INDEX_PATH) -> Optional[LocationIndex]:
+    """
+    Returns the process-wide location index, loading it from index_path or rebuilding it
+    (and saving it) when it is missing or the JSONL's mtime/size no longer match.
+
+    Args:
+        source_path (str): The metadata JSONL.
+        index_path (str): Persisted index file.
+
+    Returns:
+        Optional[LocationIndex]: The index, or None if the JSONL does not exist.
+    """
+    global _index
+    if not os.path.exists(source_path):
+        return None
+    signature = file_signature(source_path)
+    with _index_lock:
+        if _index is not None and _index.source_path == source_path and _index.signature == signature:
+            return _index
+
+        index = LocationIndex.load(index_path)
+        if index is None or index.source_path != source_path or index.signature != signature:
+            index = LocationIndex.build(source_path)
+            try:
+                index.save(index_path)
+            except OSError as e:
+                logger.warning(f"Could not persist location index to {index_path}: {e}")
+        _index = index
+        return _index
@@ -0,0 +1,154 @@
+"""
+Precomputed value indexes over knowledge-base chunk metadata.
+Lets ChromaManager check, before querying, which filter values exist and how many chunks a
+where clause selects, and lets the BM25 side apply the same filter without a database call.
+"""
+import logging
+import os
+import pickle
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from sat_sight.core.config import METADATA_INDEX_FIELDS
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+
+
+class MetadataIndex:
+    """
+    Maps (field, value) to the ids of the chunks carrying that value, for a fixed set of fields.
+    """
+    def __init__(self, fields: Sequence[str] = METADATA_INDEX_FIELDS):
+        """
+        Initializes an empty index.
+
+        Args:
+            fields (Sequence[str]): Metadata fields to index.
+        """
+        self.fields = tuple(fields)
+        self.values: Dict[str, Dict[Any, set]] = {field: {} for field in self.fields}
+        self.doc_values: Dict[str, Dict[str, Any]] = {}
+        self.source_count: Optional[int] = None # Collection size the index was last synchronised with
+
+    def __len__(self) -> int:
+        return len(self.doc_values)
+
+    def add(self, ids: Sequence[str], metadatas: Sequence[Optional[Dict[str, Any]]]):
+        """Adds or replaces the indexed metadata of chunks."""
+        self.remove([doc_id for doc_id in ids if doc_id in self.doc_values])
+        for doc_id, metadata in zip(ids, metadatas):
+            indexed = {field: metadata[field] for field in self.fields if metadata and metadata.get(field) is not None}
+            self.doc_values[doc_id] = indexed
+            for field, value in indexed.items():
+                self.values[field].setdefault(value, set()).add(doc_id)
+
+    def remove(self, ids: Iterable[str]):
+        """Removes chunks by id; unknown ids are ignored."""
+        for doc_id in ids:
+            for field, value in self.doc_values.pop(doc_id, {}).items():
+                ids_with_value = self.values[field].get(value)
+                if ids_with_value is not None:
+                    ids_with_value.discard(doc_id)
+                    if not ids_with_value:
+                        del self.values[field][value]
+
+    def value_counts(self, field: str) -> Dict[Any, int]:
+        """Returns the number of chunks per stored value of a field."""
+        return {value: len(ids) for value, ids in self.values.get(field, {}).items()}
+
+    def resolve_values(self, field: str, requested: Iterable[Any]) -> List[Any]:
+        """
+        Maps requested values to the values actually stored for a field (case-insensitive for strings).
+
+        Args:
+            field (str): Indexed metadata field.
+            requested (Iterable[Any]): Values to look for.
+
+        Returns:
+            List[Any]: Matching stored values; unknown values are dropped.
+        """
+        stored = self.values.get(field, {})
+        lowered = {str(value).lower(): value for value in stored}
+        resolved = []
+        for value in requested:
+            match = value if value in stored else lowered.get(str(value).lower())
+            if match is not None and match not in resolved:
+                resolved.append(match)
+        return resolved
+
+    def match(self, where: Optional[Dict[str, Any]]) -> Optional[set]:
+        """
+        Evaluates a ChromaDB where clause against the index.
+        Supports equality, $eq, $in, $and and $or over indexed fields.
+
+        Args:
+            where (Dict[str, Any], optional): The where clause.
+
+        Returns:
+            Optional[set]: Ids of matching chunks, or None if the clause uses anything unsupported.
+        """
+        if not where:
+            return None
+        if len(where) != 1:
+            return self.match({"$and": [{key: value} for key, value in where.items()]})
+
+        key, condition = next(iter(where.items()))
+        if key in ("$and", "$or"):
+            parts = [self.match(part) for part in condition]
+            if any(part is None for part in parts):
+                return None
+            return set.intersection(*parts) if key == "$and" else set.union(*parts)
+        if key not in self.values:
+            return None
+
+        if isinstance(condition, dict):
+            if set(condition) == {"$in"}:
+                values = condition["$in"]
+            elif set(condition) == {"$eq"}:
+                values = [condition["$eq"]]
+            else:
+                return None
+        else:
+            values = [condition]
+        return set().union(*(self.values[key].get(value, set()) for value in values))
+
+    def save(self, path: str):
+        """Saves the index to a pickle file."""
+        state = {"version": INDEX_VERSION, "fields": self.fields, "source_count": self.source_count, "doc_values": self.doc_values}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        logger.info(f"Metadata index with {len(self)} documents saved to {path}")
+
+    @classmethod
+    def load(cls, path: str, fields: Sequence[str] = METADATA_INDEX_FIELDS) -> Optional["MetadataIndex"]:
+        """
+        Loads an index saved with save().
+
+        Args:
+            path (str): Pickle file.
+            fields (Sequence[str]): Fields the caller expects; an index built for other fields is discarded.
+
+        Returns:
+            Optional[MetadataIndex]: The index, or None if missing, unreadable or built for other fields.
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+        except Exception as e:
+            logger.error(f"Failed to load metadata index from {path}: {e}")
+            return None
+        if state.get("version") != INDEX_VERSION or tuple(state.get("fields", ())) != tuple(fields):
+            logger.info(f"Metadata index {path} was built with different settings; it will be rebuilt.")
+            return None
+
+        index = cls(fields)
+        index.source_count = state["source_count"]
+        ids = list(state["doc_values"])
+        index.add(ids, [state["doc_values"][doc_id] for doc_id in ids])
+        logger.info(f"Metadata index with {len(index)} documents loaded from {path}")
+        return index
@@ -0,0 +1,193 @@
+"""
+ONNX Runtime backend for cross-encoder reranking.
+Exports a Hugging Face cross-encoder to ONNX once (optionally int8 dynamic-quantised)
+and serves CrossEncoder-compatible predict() calls with a fixed maximum sequence
+length and length-sorted, padding-aware batching.
+"""
+import logging
+import numpy as np
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from transformers import AutoConfig, AutoTokenizer
+from sat_sight.core.config import RERANK_ONNX_DIR, RERANK_MAX_SEQ_LENGTH
+
+logger = logging.getLogger(__name__)
+
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    logger.warning("onnxruntime not available, ONNX reranker backend disabled")
+    ONNXRUNTIME_AVAILABLE = False
+
+
+def export_cross_encoder_onnx(model_name: str, output_dir: str = RERANK_ONNX_DIR, quantize: bool = True) -> str:
+    """
+    Exports a cross-encoder to ONNX and optionally applies int8 dynamic quantisation.
+
+    Args:
+        model_name (str): Hugging Face model name (e.g., "cross-encoder/ms-marco-MiniLM-L-6-v2").
+        output_dir (str): Directory for the exported files.
+        quantize (bool): Also write an int8 dynamically quantised model.
+
+    Returns:
+        str: Path of the model to load (the quantised one if quantize is True).
+    """
+    import torch
+    from transformers import AutoModelForSequenceClassification
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    base_name = model_name.replace("/", "__")
+    fp32_path = output_dir / f"{base_name}.onnx"
+    int8_path = output_dir / f"{base_name}.int8.onnx"
+
+    if not fp32_path.exists():
+        logger.info(f"Exporting {model_name} to ONNX at {fp32_path}")
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        model.eval()
+        dummy = tokenizer([["query", "document"]], return_tensors="pt", padding=True)
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in dummy]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["logits"] = {0: "batch"}
+        with torch.no_grad():
+            torch.onnx.export(
+                model, tuple(dummy[name] for name in input_names), str(fp32_path),
+                input_names=input_names, output_names=["logits"], dynamic_axes=dynamic_axes, opset_version=17,
+                dynamo=False # TorchScript exporter; avoids the onnxscript dependency
+            )
+
+    if not quantize:
+        return str(fp32_path)
+
+    if not int8_path.exists():
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        logger.info(f"Quantising {fp32_path} to int8 at {int8_path}")
+        quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+    return str(int8_path)
+
+
+class ONNXCrossEncoder:
+    """
+    A drop-in replacement for sentence_transformers.CrossEncoder.predict backed by ONNX Runtime.
+    """
+    def __init__(self, model_name: str, model_dir: str = RERANK_ONNX_DIR, quantize: bool = True,
+                 max_seq_length: int = RERANK_MAX_SEQ_LENGTH, num_threads: Optional[int] = None):
+        """
+        Initializes the ONNX cross-encoder, exporting the model on first use.
+
+        Args:
+            model_name (str): Hugging Face cross-encoder name.
+            model_dir (str): Directory holding (or receiving) the exported ONNX files.
+            quantize (bool): Use the int8 dynamically quantised model.
+            max_seq_length (int): Fixed maximum (query + document) length in tokens; longer pairs are truncated.
+            num_threads (int, optional): Intra-op threads for ONNX Runtime. Defaults to all cores.
+        """
+        if not ONNXRUNTIME_AVAILABLE:
+            raise ImportError("onnxruntime is required for the ONNX reranker backend")
+
+        self.model_name = model_name
+        self.max_seq_length = max_seq_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.activation = self._default_activation(AutoConfig.from_pretrained(model_name))
+
+        model_path = export_cross_encoder_onnx(model_name, model_dir, quantize=quantize)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        logger.info(f"ONNX cross-encoder loaded from {model_path} (max_seq_length={max_seq_length}).")
+
+    @staticmethod
+    def _default_activation(config) -> Callable[[np.ndarray], np.ndarray]:
+        """Mirrors CrossEncoder's default: sigmoid for single-label models unless the config says otherwise."""
+        configured = getattr(config, "sbert_ce_default_activation_function", None)
+        st_settings = getattr(config, "sentence_transformers", None)
+        if isinstance(st_settings, dict) and st_settings.get("activation_fn"):
+            configured = st_settings["activation_fn"] # sentence-transformers >= 4 config layout
+        if configured and configured.endswith("Identity"):
+            return lambda x: x
+        if getattr(config, "num_labels", 1) == 1:
+            return lambda x: 1.0 / (1.0 + np.exp(-x))
+        return lambda x: x
+
+    def _tokenize(self, pairs: Sequence[Sequence[str]]) -> Dict[str, List[List[int]]]:
+        return self.tokenizer(
+            [p[0] for p in pairs], [p[1] for p in pairs],
+            truncation="longest_first", max_length=self.max_seq_length, padding=False
+        )
+
+    def predict(self, pairs: Sequence[Sequence[str]], batch_size: int = 32, **kwargs: Any) -> np.ndarray:
+        """
+        Scores (query, document) pairs.
+        Pairs are tokenized once, sorted by length and padded only to the longest pair in each batch.
+
+        Args:
+            pairs (Sequence[Sequence[str]]): (query, document) pairs.
+            batch_size (int): Pairs per ONNX Runtime call.
+
+        Returns:
+            np.ndarray: One score per pair, in input order.
+        """
+        if not len(pairs):
+            return np.empty(0, dtype=np.float32)
+
+        encoded = self._tokenize(pairs)
+        lengths = np.array([len(ids) for ids in encoded["input_ids"]])
+        order = np.argsort(lengths, kind="stable")
+        pad_id = self.tokenizer.pad_token_id or 0
+        scores = np.empty(len(pairs), dtype=np.float32)
+
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            width = int(lengths[idx].max())
+            feeds = {}
+            for name in self.input_names:
+                pad_value = pad_id if name == "input_ids" else 0
+                batch = np.full((len(idx), width), pad_value, dtype=np.int64)
+                for row, i in enumerate(idx):
+                    values = encoded[name][i]
+                    batch[row, :len(values)] = values
+                feeds[name] = batch
+            logits = self.session.run(None, feeds)[0]
+            scores[idx] = logits[:, 0] if logits.ndim == 2 else logits
+
+        return self.activation(scores).astype(np.float32)
+
+
+def check_score_parity(reference: Callable[[List[List[str]]], np.ndarray], candidate: Callable[[List[List[str]]], np.ndarray],
+                       pairs: List[List[str]], max_abs_tolerance: float = 0.1, min_rank_correlation: float = 0.98) -> Dict[str, Any]:
+    """
+    Compares two cross-encoder backends on the same pairs.
+
+    Args:
+        reference (Callable): Predict function of the reference backend (e.g., torch CrossEncoder).
+        candidate (Callable): Predict function of the backend under test (e.g., ONNXCrossEncoder).
+        pairs (List[List[str]]): (query, document) pairs.
+        max_abs_tolerance (float): Largest acceptable absolute score difference.
+        min_rank_correlation (float): Smallest acceptable Spearman correlation of the two rankings.
+
+    Returns:
+        Dict[str, Any]: 'max_abs_diff', 'mean_abs_diff', 'rank_correlation' and 'passed'.
+    """
+    ref = np.asarray(reference(pairs), dtype=np.float64).reshape(-1)
+    cand = np.asarray(candidate(pairs), dtype=np.float64).reshape(-1)
+    diff = np.abs(ref - cand)
+
+    ref_ranks = np.argsort(np.argsort(ref))
+    cand_ranks = np.argsort(np.argsort(cand))
+    if len(pairs) > 1:
+        rank_correlation = float(np.corrcoef(ref_ranks, cand_ranks)[0, 1])
+    else:
+        rank_correlation = 1.0
+
+    result = {
+        "max_abs_diff": float(diff.max()),
+        "mean_abs_diff": float(diff.mean()),
+        "rank_correlation": rank_correlation,
+    }
+    result["passed"] = result["max_abs_diff"] <= max_abs_tolerance and rank_correlation >= min_rank_correlation
+    return result
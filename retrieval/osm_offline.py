@@ -0,0 +1,170 @@
+"""
+Offline OpenStreetMap data for GeoManager.
+Loads a regional OSM extract (GeoPackage, GeoParquet, or PBF via pyrosm) once into a spatially
+indexed GeoDataFrame and answers feature and geocoding queries locally, so geo lookups need no
+Overpass/Nominatim access and have predictable latency (air-gapped deployments, tests).
+"""
+import logging
+import math
+import os
+import re
+from typing import Any, Dict, Optional, Tuple
+import geopandas as gpd
+import pandas as pd
+from shapely.geometry import box
+
+try:
+    from pyrosm import OSM
+    PYROSM_AVAILABLE = True
+except ImportError:
+    PYROSM_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+_COORDINATE_PATTERN = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*[,\s]\s*(-?\d+(?:\.\d+)?)\s*$")
+METERS_PER_DEGREE = 111320.0
+
+
+def normalize_place_name(name: str) -> str:
+    """Lowercases a place name and collapses whitespace, for gazetteer lookups."""
+    return " ".join(str(name).lower().split())
+
+
+def bbox_from_point(lat: float, lon: float, dist: float) -> Tuple[float, float, float, float]:
+    """Returns (west, south, east, north) of the square extending dist meters around a point (as osmnx does)."""
+    delta_lat = dist / METERS_PER_DEGREE
+    delta_lon = dist / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+    return lon - delta_lon, lat - delta_lat, lon + delta_lon, lat + delta_lat
+
+
+def tag_mask(features: gpd.GeoDataFrame, tags: Dict[str, Any]) -> pd.Series:
+    """Rows of features matching any of the tags (True: key present; str/list: key has one of the values)."""
+    mask = pd.Series(False, index=features.index)
+    for key, value in tags.items():
+        if key not in features.columns:
+            continue
+        column = features[key]
+        if value is True:
+            mask |= column.notna()
+        else:
+            mask |= column.isin(value if isinstance(value, list) else [value])
+    return mask
+
+
+def load_extract(path: str, tags: Optional[Dict[str, Any]] = None) -> gpd.GeoDataFrame:
+    """
+    Reads an OSM extract into one GeoDataFrame in EPSG:4326 with one column per OSM tag.
+
+    Args:
+        path (str): .gpkg (all layers are concatenated), .parquet/.geoparquet, or .pbf (requires pyrosm).
+        tags (Dict[str, Any], optional): osmnx-style tag filter; PBF extracts are only parsed for these
+                                         tags (plus named places, for the local geocoder).
+
+    Returns:
+        gpd.GeoDataFrame: The features.
+    """
+    lower = path.lower()
+    if lower.endswith(".pbf"):
+        if not PYROSM_AVAILABLE:
+            raise ImportError("pyrosm is required to read .pbf extracts (pip install pyrosm), or convert the extract to GeoPackage.")
+        custom_filter = {key: True if value is True else (value if isinstance(value, list) else [value]) for key, value in (tags or {}).items()}
+        custom_filter["place"] = True
+        features = OSM(path).get_data_by_custom_criteria(
+            custom_filter=custom_filter, tags_as_columns=sorted(set(custom_filter) | {"name", "operator"}),
+            keep_nodes=True, keep_ways=True, keep_relations=True
+        )
+    elif lower.endswith((".parquet", ".geoparquet")):
+        features = gpd.read_parquet(path)
+    else:
+        layers = gpd.list_layers(path)["name"].tolist()
+        frames = [gpd.read_file(path, layer=layer) for layer in layers]
+        features = gpd.GeoDataFrame(pd.concat(frames, ignore_index=True), geometry="geometry", crs=frames[0].crs) if frames else gpd.GeoDataFrame()
+    if features is None or features.empty:
+        return gpd.GeoDataFrame(geometry=[], crs="EPSG:4326")
+    return features.to_crs("EPSG:4326") if features.crs and features.crs.to_epsg() != 4326 else features
+
+
+class LocalGeocoder:
+    """
+    Resolves place names to coordinates without Nominatim, from a gazetteer file and the named
+    places (OSM 'place' features) of the loaded extract.
+    """
+    def __init__(self, gazetteer_path: Optional[str] = None, features: Optional[gpd.GeoDataFrame] = None):
+        """
+        Builds the name table.
+
+        Args:
+            gazetteer_path (str, optional): Tab-separated "name<TAB>lat<TAB>lon" file ('#' starts a comment).
+            features (gpd.GeoDataFrame, optional): Extract features; rows with 'place' and 'name' are added.
+        """
+        self.places: Dict[str, Tuple[float, float]] = {}
+        if features is not None and not features.empty and {"place", "name"} <= set(features.columns):
+            named = features[features["place"].notna() & features["name"].notna()]
+            centroids = named.geometry.representative_point()
+            for name, point in zip(named["name"], centroids):
+                self.places.setdefault(normalize_place_name(name), (point.y, point.x))
+        if gazetteer_path and os.path.exists(gazetteer_path):
+            with open(gazetteer_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip() or line.startswith("#"):
+                        continue
+                    try:
+                        name, lat, lon = line.rstrip("\n").split("\t")[:3]
+                        self.places[normalize_place_name(name)] = (float(lat), float(lon)) # The gazetteer wins over the extract
+                    except ValueError:
+                        logger.warning(f"Skipping malformed gazetteer line: {line.strip()!r}")
+        logger.info(f"Local geocoder ready with {len(self.places)} places.")
+
+    def geocode(self, query: str) -> Optional[Tuple[float, float]]:
+        """
+        Resolves "lat, lon" strings, full place names, then the leading comma-separated part ("Paris, France" -> "paris").
+
+        Returns:
+            Optional[Tuple[float, float]]: (lat, lon), or None if the place is unknown.
+        """
+        match = _COORDINATE_PATTERN.match(query)
+        if match:
+            lat, lon = float(match.group(1)), float(match.group(2))
+            if -90 <= lat <= 90 and -180 <= lon <= 180:
+                return lat, lon
+        name = normalize_place_name(query)
+        if name in self.places:
+            return self.places[name]
+        head = normalize_place_name(query.split(",")[0])
+        return self.places.get(head)
+
+
+class OfflineOSMStore:
+    """
+    A regional OSM extract held in memory with an R-tree (GeoDataFrame.sindex) for local feature queries.
+    """
+    def __init__(self, extract_path: str, gazetteer_path: Optional[str] = None, tags: Optional[Dict[str, Any]] = None):
+        """
+        Loads the extract and builds the spatial index and the local geocoder.
+
+        Args:
+            extract_path (str): OSM extract (.gpkg, .parquet or .pbf).
+            gazetteer_path (str, optional): "name<TAB>lat<TAB>lon" gazetteer for offline geocoding.
+            tags (Dict[str, Any], optional): Tag filter; only matching features are kept (named places feed the geocoder first).
+        """
+        logger.info(f"Loading offline OSM extract: {extract_path}")
+        features = load_extract(extract_path, tags)
+        self.geocoder = LocalGeocoder(gazetteer_path, features)
+        if tags:
+            features = features.loc[tag_mask(features, tags)]
+        self.features = features.reset_index(drop=True)
+        self.features.sindex # Build the R-tree up front instead of on the first query
+        logger.info(f"Offline OSM store ready with {len(self.features)} features.")
+
+    def geocode(self, query: str) -> Optional[Tuple[float, float]]:
+        """Resolves a place name or "lat, lon" string locally."""
+        return self.geocoder.geocode(query)
+
+    def features_from_point(self, point: Tuple[float, float], dist: float) -> gpd.GeoDataFrame:
+        """
+        Local equivalent of osmnx.features.features_from_point: features intersecting the
+        bounding box extending dist meters around (lat, lon).
+        """
+        lat, lon = point
+        positions = self.features.sindex.query(box(*bbox_from_point(lat, lon, dist)), predicate="intersects")
+        return self.features.iloc[sorted(positions)]
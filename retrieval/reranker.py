@@ -1,7 +1,19 @@
+import hashlib
+import json
 import logging
+import os
+import threading
+import time
 import numpy as np
 from typing import List, Dict, Any, Tuple
 from sentence_transformers import CrossEncoder # Import the cross-encoder model type
+from sat_sight.core.config import (
+    RERANK_BATCH_SIZE, RERANK_CACHE_SIZE, RERANK_MICRO_BATCHING, RERANK_MAX_WAIT_MS, RERANK_BACKEND,
+    RERANK_MIN_DEPTH, RERANK_DEPTH_STEP, RERANK_DECISIVE_K, RERANK_DECISIVE_MARGIN, RERANK_DEPTH_LOG_PATH,
+    RETRIEVAL_SERVICE_URL
+)
+from sat_sight.utils.inference_scheduler import get_inference_scheduler
+from sat_sight.utils.lru_cache import LRUCache
 
 logger = logging.getLogger(__name__)
 
@@ -10,23 +22,90 @@ class Reranker:
     A class to handle reranking of retrieved results (images or text) based on
     their semantic relevance to a given query using a cross-encoder model.
     """
-    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"):
+    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2", batch_size: int = RERANK_BATCH_SIZE,
+                 cache_size: int = RERANK_CACHE_SIZE, micro_batching: bool = RERANK_MICRO_BATCHING,
+                 max_wait_ms: float = RERANK_MAX_WAIT_MS, backend: str = RERANK_BACKEND):
         """
         Initializes the reranker with a cross-encoder model.
 
         Args:
             model_name (str): Name of the Hugging Face cross-encoder model to use for reranking.
                              Default is a fast, reasonably effective model for passage ranking.
+            batch_size (int): Number of (query, document) pairs per cross-encoder forward pass.
+            cache_size (int): Number of (query, document-hash) scores kept in the LRU cache. 0 disables caching.
+            micro_batching (bool): Merge pairs from concurrent requests into shared forward passes.
+            max_wait_ms (float): How long a request may wait for others to join its batch.
+            backend (str): "torch" for sentence_transformers CrossEncoder, "onnx" for the int8
+                           ONNX Runtime model (falls back to torch if it cannot be loaded).
         """
         self.model_name = model_name
-        logger.info(f"Initializing Cross-Encoder Reranker with model: {self.model_name}")
+        self.batch_size = batch_size
+        self.score_cache = LRUCache(max_entries=cache_size) if cache_size > 0 else None
+        logger.info(f"Initializing Cross-Encoder Reranker with model: {self.model_name} ({backend} backend)")
+        self.backend = backend
+        if backend == "onnx":
+            try:
+                from sat_sight.retrieval.onnx_cross_encoder import ONNXCrossEncoder
+                self.model = ONNXCrossEncoder(self.model_name)
+            except Exception as e:
+                logger.warning(f"ONNX reranker backend unavailable ({e}), falling back to torch.")
+                self.backend = "torch"
+
         try:
-            self.model = CrossEncoder(self.model_name)
+            if self.backend != "onnx":
+                self.model = CrossEncoder(self.model_name)
             logger.info("Cross-Encoder Reranker model loaded successfully.")
         except Exception as e:
             logger.error(f"Failed to load cross-encoder model {self.model_name}: {e}")
             raise e # Re-raise to halt initialization if reranker is critical
 
+        # Concurrent rerank requests share forward passes via the process-wide inference scheduler
+        self.batcher = get_inference_scheduler().register(
+            f"rerank:{self.model_name}:{self.backend}", self._predict, max_batch_size=batch_size, max_wait_ms=max_wait_ms
+        ) if micro_batching else None
+
+    def _predict(self, pairs: List[List[str]]) -> np.ndarray:
+        """Runs the cross-encoder over (query, document) pairs in batches of self.batch_size."""
+        return np.asarray(self.model.predict(pairs, batch_size=self.batch_size), dtype=np.float32).reshape(-1)
+
+    def score_pairs(self, query: str, documents: List[str]) -> np.ndarray:
+        """
+        Scores documents against a query, using the score cache and the micro-batcher.
+        Only documents not seen with this query before reach the model, each unique one once.
+
+        Args:
+            query (str): The user's query.
+            documents (List[str]): Document texts to score.
+
+        Returns:
+            np.ndarray: One relevance score per document, in input order.
+        """
+        keys = [(query, hashlib.sha1(doc.encode("utf-8")).hexdigest()) for doc in documents]
+        scores = np.empty(len(documents), dtype=np.float32)
+
+        to_score: Dict[tuple, List[int]] = {}
+        for i, key in enumerate(keys):
+            cached = self.score_cache.get(key) if self.score_cache is not None else None
+            if cached is None:
+                to_score.setdefault(key, []).append(i)
+            else:
+                scores[i] = cached
+
+        if to_score:
+            unique_positions = [positions[0] for positions in to_score.values()]
+            pairs = [[query, documents[i]] for i in unique_positions]
+            if self.batcher is not None:
+                new_scores = self.batcher.submit(pairs).result()
+            else:
+                new_scores = self._predict(pairs)
+            for (key, positions), score in zip(to_score.items(), new_scores):
+                scores[positions] = score
+                if self.score_cache is not None:
+                    self.score_cache.put(key, float(score))
+
+        logger.debug(f"Scored {len(documents)} documents ({len(documents) - sum(len(p) for p in to_score.values())} cached).")
+        return scores
+
     def rerank_text_chunks(self, query: str, chunks: List[Dict[str, Any]], top_k: int = 5) -> List[Dict[str, Any]]:
         """
         Reranks a list of text chunks based on their relevance to the query.
@@ -48,9 +127,7 @@ class Reranker:
         logger.debug(f"Reranking {len(chunks)} text chunks for query: '{query[:50]}...'")
 
         texts_to_rerank = [chunk.get("content", "") for chunk in chunks]
-        query_text_pairs = [[query, text] for text in texts_to_rerank]
-
-        scores = self.model.predict(query_text_pairs)
+        scores = self.score_pairs(query, texts_to_rerank)
 
         scored_chunks = [(chunk, score) for chunk, score in zip(chunks, scores)]
         scored_chunks.sort(key=lambda x: x[1], reverse=True) # Sort by score (x[1]) descending
@@ -87,9 +164,7 @@ class Reranker:
         logger.debug(f"Reranking {len(metadata_list)} image metadata entries for query: '{query[:50]}...'")
 
         descriptions_to_rerank = [meta.get("description", "") for meta in metadata_list]
-        query_desc_pairs = [[query, desc] for desc in descriptions_to_rerank]
-
-        scores = self.model.predict(query_desc_pairs)
+        scores = self.score_pairs(query, descriptions_to_rerank)
 
         scored_metadata = [(meta, score) for meta, score in zip(metadata_list, scores)]
         scored_metadata.sort(key=lambda x: x[1], reverse=True) # Sort by score (x[1]) descending
@@ -103,3 +178,184 @@ class Reranker:
         logger.debug(f"Reranked and selected top {top_k} image metadata entries.")
         return reranked_metadata
 
+
+    def rerank_by_embeddings(self, query: str, items: List[Dict[str, Any]], query_embedding: np.ndarray,
+                             item_embeddings: np.ndarray, top_k: int = 5, final_top_n: int = 0,
+                             text_key: str = "description") -> List[Dict[str, Any]]:
+        """
+        Cheap first-stage reranking: one dot product between the query embedding and precomputed
+        item embeddings. Optionally the cross-encoder rescores only the best final_top_n items.
+
+        Args:
+            query (str): The user's query (used only by the optional cross-encoder stage).
+            items (List[Dict[str, Any]]): Items to rerank (e.g., image metadata from FAISS).
+            query_embedding (np.ndarray): Normalized query embedding (d,).
+            item_embeddings (np.ndarray): Normalized item embeddings (len(items) x d).
+            top_k (int): Number of top reranked results to return.
+            final_top_n (int): Number of leading items to rescore with the cross-encoder (0 disables).
+            text_key (str): Item field scored by the cross-encoder stage.
+
+        Returns:
+            List[Dict[str, Any]]: The top-k items (shallow copies) with 'rerank_score' (cosine similarity)
+                                  and, for cross-encoder rescored items, 'cross_encoder_score'.
+        """
+        if not items:
+            logger.warning("Reranker: Empty list of items provided for embedding reranking.")
+            return []
+
+        scores = item_embeddings @ query_embedding.astype(np.float32).reshape(-1)
+        order = np.argsort(-scores, kind="stable")
+
+        ranked = []
+        for i in order[:max(top_k, final_top_n)]:
+            updated_item = items[i].copy()
+            updated_item["rerank_score"] = float(scores[i])
+            ranked.append(updated_item)
+
+        if final_top_n > 0:
+            head = ranked[:final_top_n]
+            ce_scores = self.score_pairs(query, [item.get(text_key, "") for item in head])
+            for item, score in zip(head, ce_scores):
+                item["cross_encoder_score"] = float(score)
+            head.sort(key=lambda item: item["cross_encoder_score"], reverse=True)
+            ranked = head + ranked[final_top_n:]
+
+        logger.debug(f"Embedding-reranked {len(items)} items, kept top {top_k} (cross-encoder over {final_top_n}).")
+        return ranked[:top_k]
+
+    def rerank_adaptive(self, query: str, items: List[Dict[str, Any]], text_key: str = "content", top_k: int = 5,
+                        min_depth: int = RERANK_MIN_DEPTH, step: int = RERANK_DEPTH_STEP,
+                        decisive_k: int = RERANK_DECISIVE_K, margin: float = RERANK_DECISIVE_MARGIN) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Reranks candidates in first-stage order, only as deep as needed.
+
+        Scores the first min_depth candidates, then extends by step candidates at a time. It stops once
+        the last scored batch is decisively out of contention: none of it made the top decisive_k and
+        its best score trails the decisive_k-th score by at least margin. Unscored tail candidates are
+        dropped, since the first-stage order already ranks them below everything that was scored.
+
+        Args:
+            query (str): The user's query.
+            items (List[Dict[str, Any]]): Candidates in first-stage (retrieval) order.
+            text_key (str): Field holding the text to score ('content' for chunks, 'description' for images).
+            top_k (int): Number of top reranked results to return.
+            min_depth (int): Candidates always scored (raised to top_k if smaller).
+            step (int): Candidates scored per extension.
+            decisive_k (int): Rank position whose lead over deeper candidates decides early exit.
+            margin (float): Score lead (in cross-encoder units) considered decisive.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], int]: The top-k reranked items with 'rerank_score', and the depth used.
+        """
+        if not items:
+            logger.warning("Reranker: Empty list of candidates provided for adaptive reranking.")
+            return [], 0
+
+        texts = [item.get(text_key, "") for item in items]
+        depth = min(len(items), max(min_depth, top_k))
+        scores = list(self.score_pairs(query, texts[:depth]))
+        last_batch = range(min(decisive_k, depth), depth)
+
+        while depth < len(items):
+            ranked = sorted(range(depth), key=lambda i: scores[i], reverse=True)
+            if len(ranked) >= decisive_k and last_batch:
+                threshold = scores[ranked[decisive_k - 1]]
+                in_contention = set(ranked[:decisive_k])
+                if not in_contention.intersection(last_batch) and threshold - max(scores[i] for i in last_batch) >= margin:
+                    break
+            new_depth = min(len(items), depth + step)
+            scores.extend(self.score_pairs(query, texts[depth:new_depth]))
+            last_batch = range(depth, new_depth)
+            depth = new_depth
+
+        order = sorted(range(depth), key=lambda i: scores[i], reverse=True)
+        reranked = []
+        for i in order[:top_k]:
+            updated_item = items[i].copy()
+            updated_item["rerank_score"] = float(scores[i])
+            reranked.append(updated_item)
+
+        logger.debug(f"Adaptive rerank scored {depth}/{len(items)} candidates, kept top {len(reranked)}.")
+        return reranked, depth
+
+
+class RemoteReranker(Reranker):
+    """
+    A Reranker whose cross-encoder runs in the retrieval service (see retrieval/service.py).
+    All reranking strategies run locally on top of remotely computed pair scores, and the
+    local score cache still saves round trips for repeated pairs.
+    """
+    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2", base_url: str = RETRIEVAL_SERVICE_URL,
+                 cache_size: int = RERANK_CACHE_SIZE):
+        """
+        Initializes the client; no model is loaded in this process.
+
+        Args:
+            model_name (str): Cross-encoder the service should use.
+            base_url (str): Retrieval service URL.
+            cache_size (int): Number of (query, document-hash) scores kept in the local LRU cache. 0 disables caching.
+        """
+        from sat_sight.retrieval.service_client import ServiceClient
+
+        self.model_name = model_name
+        self.batch_size = RERANK_BATCH_SIZE
+        self.backend = "remote"
+        self.model = None
+        self.batcher = None # The service merges concurrent requests itself
+        self.score_cache = LRUCache(max_entries=cache_size) if cache_size > 0 else None
+        self.client = ServiceClient(base_url)
+        logger.info(f"Using remote cross-encoder {model_name} at {base_url}.")
+
+    def _predict(self, pairs: List[List[str]]) -> np.ndarray:
+        """Scores (query, document) pairs in the service, one request per distinct query."""
+        scores = np.empty(len(pairs), dtype=np.float32)
+        by_query: Dict[str, List[int]] = {}
+        for i, (query, _) in enumerate(pairs):
+            by_query.setdefault(query, []).append(i)
+        for query, positions in by_query.items():
+            result = self.client.call("/rerank", {
+                "model_name": self.model_name, "query": query, "documents": [pairs[i][1] for i in positions]
+            })
+            scores[positions] = result["scores"]
+        return scores
+
+_shared_rerankers: Dict[str, "Reranker"] = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_reranker(model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2") -> "Reranker":
+    """
+    Returns the process-wide Reranker for a model, creating it on first use.
+    Sharing one instance lets all agents use a single model copy, score cache and micro-batcher.
+    """
+    with _shared_lock:
+        if model_name not in _shared_rerankers:
+            _shared_rerankers[model_name] = Reranker(model_name=model_name)
+        return _shared_rerankers[model_name]
+
+
+_depth_log_lock = threading.Lock()
+
+
+def record_rerank_depth(agent: str, query: str, depth: int, candidates: int, log_path: str = RERANK_DEPTH_LOG_PATH):
+    """
+    Appends one per-query rerank depth record to a JSONL log used to tune the adaptive policy.
+
+    Args:
+        agent (str): Name of the agent that reranked (e.g., 'text_retrieval_agent').
+        query (str): The user's query.
+        depth (int): Number of candidates actually scored.
+        candidates (int): Number of candidates retrieved.
+        log_path (str): JSONL file to append to. Empty disables logging.
+    """
+    logger.info(f"{agent}: rerank depth {depth}/{candidates}")
+    if not log_path:
+        return
+    record = {"timestamp": time.time(), "agent": agent, "query": query, "depth": depth, "candidates": candidates}
+    try:
+        with _depth_log_lock:
+            os.makedirs(os.path.dirname(log_path), exist_ok=True)
+            with open(log_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+    except Exception as e:
+        logger.warning(f"Could not record rerank depth: {e}")
@@ -0,0 +1,216 @@
+"""
+Local retrieval service: one process that owns the FAISS index, the ChromaDB knowledge base,
+the bi-encoder and the cross-encoder, shared by every UI/worker process on the node.
+
+Usage:
+    python -m sat_sight.retrieval.service --host 127.0.0.1 --port 8765
+    RETRIEVAL_SERVICE_URL=http://127.0.0.1:8765 ./run_ui.sh
+
+Requests from concurrent workers are merged into batched FAISS searches and ChromaDB queries;
+embedding and cross-encoder calls are merged by the process-wide inference scheduler.
+Clients live in retrieval/service_client.py.
+"""
+import argparse
+import json
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+import numpy as np
+from sat_sight.core.config import (
+    RETRIEVAL_SERVICE_HOST, RETRIEVAL_SERVICE_PORT, RETRIEVAL_SERVICE_MAX_BATCH, RETRIEVAL_SERVICE_MAX_WAIT_MS,
+    TEXT_EMBEDDING_MODEL_NAME, RERANK_MODEL_NAME, CHROMA_RETRIEVAL_K, METADATA_FILTER_MIN_MATCHES
+)
+from sat_sight.retrieval.service_client import dumps, loads
+from sat_sight.utils.micro_batcher import MicroBatcher
+
+logger = logging.getLogger(__name__)
+
+
+class RetrievalService:
+    """
+    Owns the retrieval backends and implements the service endpoints.
+    """
+    def __init__(self, max_batch_size: int = RETRIEVAL_SERVICE_MAX_BATCH, max_wait_ms: float = RETRIEVAL_SERVICE_MAX_WAIT_MS):
+        """
+        Loads the FAISS index, ChromaDB collection, bi-encoder and default cross-encoder.
+
+        Args:
+            max_batch_size (int): Requests merged into one backend call.
+            max_wait_ms (float): Max time a request waits for others to join its batch.
+        """
+        from sat_sight.retrieval.chroma_manager import ChromaManager
+        from sat_sight.retrieval.faiss_manager import FAISSManager
+        from sat_sight.retrieval.reranker import get_shared_reranker
+        from sat_sight.retrieval.text_embedder import get_text_embedder
+
+        self.text_embedder = get_text_embedder(TEXT_EMBEDDING_MODEL_NAME)
+        self.faiss_manager = FAISSManager()
+        if self.faiss_manager.index.ntotal and self.faiss_manager.description_model_name != TEXT_EMBEDDING_MODEL_NAME:
+            logger.info("Description embeddings missing or stale, building them once for this index.")
+            self.faiss_manager.build_description_embeddings(self.text_embedder.encode, model_name=TEXT_EMBEDDING_MODEL_NAME)
+        self.chroma_manager = ChromaManager()
+        self._get_reranker = get_shared_reranker
+        self._get_reranker(RERANK_MODEL_NAME) # Load the default cross-encoder up front
+
+        self.faiss_batcher = MicroBatcher(self._faiss_batch, max_batch_size, max_wait_ms, name="service-faiss")
+        self.chroma_batcher = MicroBatcher(self._chroma_batch, max_batch_size, max_wait_ms, name="service-chroma")
+
+    def _faiss_batch(self, items: List[Tuple[np.ndarray, int]]) -> List[Tuple[np.ndarray, list]]:
+        k = max(item_k for _, item_k in items)
+        distances, metadata_lists = self.faiss_manager.search_batch(np.stack([embedding for embedding, _ in items]), k)
+        return [(distances[i][:item_k], metadata_lists[i][:item_k]) for i, (_, item_k) in enumerate(items)]
+
+    def _chroma_batch(self, items: List[Tuple[str, Any, int, Any]]) -> List[list]:
+        missing = [i for i, item in enumerate(items) if item[1] is None]
+        embeddings = [item[1] for item in items]
+        if missing:
+            for i, embedding in zip(missing, self.chroma_manager.embed_queries([items[i][0] for i in missing])):
+                embeddings[i] = embedding
+
+        # Queries sharing k and filter go to ChromaDB together
+        groups: Dict[str, List[int]] = {}
+        for i, (_, _, k, where) in enumerate(items):
+            groups.setdefault(json.dumps([k, where], sort_keys=True), []).append(i)
+        results: List[list] = [[] for _ in items]
+        for positions in groups.values():
+            _, _, k, where = items[positions[0]]
+            group_results = self.chroma_manager.query_batch(
+                [items[i][0] for i in positions], k=k, query_embeddings=np.stack([embeddings[i] for i in positions]), where=where
+            )
+            for i, result in zip(positions, group_results):
+                results[i] = result
+        return results
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "status": "ok",
+            "text_embedding_model": self.text_embedder.model_name,
+            "text_embedding_dimension": self.text_embedder.dimension,
+        }
+
+    def faiss_info(self) -> Dict[str, Any]:
+        return {
+            "dimension": self.faiss_manager.dimension,
+            "ntotal": self.faiss_manager.index.ntotal,
+            "description_model_name": self.faiss_manager.description_model_name,
+        }
+
+    def faiss_search(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        embeddings = np.asarray(payload["embeddings"], dtype=np.float32).reshape(-1, self.faiss_manager.dimension)
+        k = int(payload.get("k", 5))
+        results = self.faiss_batcher.submit([(embedding, k) for embedding in embeddings]).result()
+        width = min((len(distances) for distances, _ in results), default=0)
+        return {
+            "distances": np.stack([distances[:width] for distances, _ in results]) if results else np.empty((0, 0), dtype=np.float32),
+            "metadata": [metadata for _, metadata in results],
+        }
+
+    def description_embeddings(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        metadata_list = [{"description": description} for description in payload["descriptions"]]
+        return {"embeddings": self.faiss_manager.get_description_embeddings(metadata_list)}
+
+    def chroma_query(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        texts = payload["query_texts"]
+        embeddings = payload.get("query_embeddings")
+        k = int(payload.get("k") or CHROMA_RETRIEVAL_K)
+        where = payload.get("where")
+        items = [(text, None if embeddings is None else embeddings[i], k, where) for i, text in enumerate(texts)]
+        return {"results": self.chroma_batcher.submit(items).result()}
+
+    def chroma_build_where(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        min_matches = int(payload.get("min_matches", METADATA_FILTER_MIN_MATCHES))
+        return {"where": self.chroma_manager.build_where(payload.get("filters") or {}, min_matches=min_matches)}
+
+    def embed(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        embeddings = self.text_embedder.submit(payload["texts"]).result()
+        return {"embeddings": np.stack(embeddings) if len(embeddings) else np.empty((0, self.text_embedder.dimension), dtype=np.float32)}
+
+    def rerank(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        reranker = self._get_reranker(payload.get("model_name") or RERANK_MODEL_NAME)
+        return {"scores": reranker.score_pairs(payload["query"], payload["documents"])}
+
+    def routes(self) -> Dict[str, Any]:
+        return {
+            "/faiss/search": self.faiss_search,
+            "/faiss/description_embeddings": self.description_embeddings,
+            "/chroma/query": self.chroma_query,
+            "/chroma/build_where": self.chroma_build_where,
+            "/embed": self.embed,
+            "/rerank": self.rerank,
+        }
+
+
+def make_handler(service: RetrievalService):
+    """Builds the request handler class bound to a service instance."""
+    post_routes = service.routes()
+    get_routes = {"/health": service.health, "/faiss/info": service.faiss_info}
+
+    class RetrievalRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1" # Keep-alive: clients reuse one connection per thread
+
+        def _respond(self, status: int, payload: Any):
+            body = dumps(payload)
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _dispatch(self, handler, *args):
+            try:
+                self._respond(200, handler(*args))
+            except Exception as e:
+                logger.error(f"Retrieval service {self.path} failed: {e}")
+                self._respond(500, {"error": str(e)})
+
+        def do_GET(self):
+            if self.path not in get_routes:
+                self._respond(404, {"error": f"Unknown endpoint {self.path}"})
+                return
+            self._dispatch(get_routes[self.path])
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length) if length else b""
+            if self.path not in post_routes:
+                self._respond(404, {"error": f"Unknown endpoint {self.path}"})
+                return
+            try:
+                payload = loads(body) if body else {}
+            except ValueError as e:
+                self._respond(400, {"error": f"Invalid JSON body: {e}"})
+                return
+            self._dispatch(post_routes[self.path], payload)
+
+        def log_message(self, format, *args):
+            logger.debug(f"{self.address_string()} {format % args}")
+
+    return RetrievalRequestHandler
+
+
+def serve(host: str = RETRIEVAL_SERVICE_HOST, port: int = RETRIEVAL_SERVICE_PORT):
+    """Loads the backends and serves requests until interrupted."""
+    service = RetrievalService()
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+    logger.info(f"Retrieval service listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Retrieval service shutting down.")
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=RETRIEVAL_SERVICE_HOST, help="Bind address (keep it local).")
+    parser.add_argument("--port", type=int, default=RETRIEVAL_SERVICE_PORT, help="Port to listen on.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    serve(args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
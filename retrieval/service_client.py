@@ -0,0 +1,294 @@
+"""
+Clients for the local retrieval service (see retrieval/service.py).
+
+RemoteFAISSManager, RemoteChromaManager and RemoteTextEmbedder (and RemoteReranker in
+retrieval/reranker.py) expose the methods the agents use on FAISSManager, ChromaManager,
+TextEmbedder and Reranker, so a worker can switch to the shared service by setting
+RETRIEVAL_SERVICE_URL. The create_* factories return the remote client when the URL is set
+and the in-process object otherwise.
+"""
+import base64
+import http.client
+import json
+import logging
+import threading
+import numpy as np
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+from sat_sight.core.config import (
+    RETRIEVAL_SERVICE_URL, RETRIEVAL_SERVICE_TIMEOUT_S, CHROMA_RETRIEVAL_K, METADATA_FILTER_MIN_MATCHES,
+    TEXT_EMBEDDING_MODEL_NAME
+)
+
+logger = logging.getLogger(__name__)
+
+
+def encode_array(array: np.ndarray) -> Dict[str, Any]:
+    """Packs a numpy array into a JSON-safe dict (base64 raw bytes, dtype and shape)."""
+    array = np.ascontiguousarray(array)
+    return {"__ndarray__": base64.b64encode(array.tobytes()).decode("ascii"), "dtype": str(array.dtype), "shape": list(array.shape)}
+
+
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, np.ndarray):
+        return encode_array(obj)
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (set, tuple)):
+        return list(obj)
+    return str(obj)
+
+
+def _json_object_hook(obj: Dict[str, Any]) -> Any:
+    if "__ndarray__" in obj:
+        return np.frombuffer(base64.b64decode(obj["__ndarray__"]), dtype=obj["dtype"]).reshape(obj["shape"])
+    return obj
+
+
+def dumps(payload: Any) -> bytes:
+    """Serialises a request/response body; numpy arrays travel as base64 buffers."""
+    return json.dumps(payload, default=_json_default).encode("utf-8")
+
+
+def loads(body: bytes) -> Any:
+    """Parses a request/response body produced by dumps()."""
+    return json.loads(body.decode("utf-8"), object_hook=_json_object_hook)
+
+
+class ServiceClient:
+    """
+    A minimal JSON-over-HTTP client with one keep-alive connection per thread.
+    """
+    def __init__(self, base_url: str = RETRIEVAL_SERVICE_URL, timeout: float = RETRIEVAL_SERVICE_TIMEOUT_S):
+        """
+        Initializes the client.
+
+        Args:
+            base_url (str): Service URL, e.g. "http://127.0.0.1:8765".
+            timeout (float): Socket timeout per request in seconds.
+        """
+        parsed = urlparse(base_url)
+        if not parsed.hostname:
+            raise ValueError(f"Invalid retrieval service URL: {base_url!r}")
+        self.base_url = base_url
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+        self._described: Dict[str, Any] = {}
+
+    def _connection(self) -> http.client.HTTPConnection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._local.connection = connection
+        return connection
+
+    def call(self, endpoint: str, payload: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        Sends a request (POST with a JSON body, or GET if payload is None) and returns the decoded response.
+        A dropped keep-alive connection is retried once on a fresh connection.
+
+        Raises:
+            RuntimeError: If the service answers with an error status.
+        """
+        body = None if payload is None else dumps(payload)
+        method = "GET" if payload is None else "POST"
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request(method, endpoint, body=body, headers={"Content-Type": "application/json"})
+                response = connection.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError, OSError):
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise
+        result = loads(data) if data else None
+        if response.status != 200:
+            message = result.get("error") if isinstance(result, dict) else data[:200]
+            raise RuntimeError(f"Retrieval service {endpoint} failed ({response.status}): {message}")
+        return result
+
+    def describe(self, endpoint: str) -> Any:
+        """GETs a service description endpoint (/health, /faiss/info) once and caches the response."""
+        if endpoint not in self._described:
+            self._described[endpoint] = self.call(endpoint)
+        return self._described[endpoint]
+
+
+class RemoteFAISSManager:
+    """
+    FAISSManager-compatible client for the image index served by the retrieval service.
+    """
+    def __init__(self, base_url: str = RETRIEVAL_SERVICE_URL):
+        """
+        Initializes the client. The service is first contacted on use, so the app still starts
+        while the service is down or loading; requests fail until it is up.
+
+        Args:
+            base_url (str): Retrieval service URL.
+        """
+        self.client = ServiceClient(base_url)
+        logger.info(f"Using remote FAISS index at {base_url}.")
+
+    @property
+    def dimension(self) -> int:
+        return self.client.describe("/faiss/info")["dimension"]
+
+    @property
+    def ntotal(self) -> int:
+        return self.client.describe("/faiss/info")["ntotal"]
+
+    @property
+    def description_model_name(self) -> Optional[str]:
+        return self.client.describe("/faiss/info")["description_model_name"]
+
+    def search(self, query_embedding: np.ndarray, k: int = 5) -> tuple:
+        """Same as FAISSManager.search: returns (distances, metadata_list) for one query."""
+        distances, metadata_lists = self.search_batch(np.asarray(query_embedding).reshape(1, -1), k)
+        return distances[0], metadata_lists[0]
+
+    def search_batch(self, query_embeddings: np.ndarray, k: int = 5) -> tuple:
+        """Same as FAISSManager.search_batch: returns (distances N x k, metadata_lists)."""
+        query_embeddings = np.asarray(query_embeddings, dtype=np.float32)
+        if query_embeddings.ndim == 1:
+            query_embeddings = query_embeddings.reshape(1, -1)
+        result = self.client.call("/faiss/search", {"embeddings": query_embeddings, "k": k})
+        return np.asarray(result["distances"], dtype=np.float32), result["metadata"]
+
+    def get_description_embeddings(self, metadata_list: List[dict]) -> Optional[np.ndarray]:
+        """Same as FAISSManager.get_description_embeddings."""
+        result = self.client.call("/faiss/description_embeddings", {
+            "descriptions": [meta.get("description", "") for meta in metadata_list]
+        })
+        return result["embeddings"]
+
+
+class RemoteChromaManager:
+    """
+    ChromaManager-compatible (read-side) client for the knowledge base served by the retrieval service.
+    """
+    def __init__(self, base_url: str = RETRIEVAL_SERVICE_URL):
+        """
+        Initializes the client; like RemoteFAISSManager, the service is first contacted on use.
+
+        Args:
+            base_url (str): Retrieval service URL.
+        """
+        self.client = ServiceClient(base_url)
+        logger.info(f"Using remote ChromaDB knowledge base at {base_url}.")
+
+    @property
+    def embedding_model_name(self) -> str:
+        return self.client.describe("/health")["text_embedding_model"]
+
+    def embed_queries(self, query_texts: List[str]) -> np.ndarray:
+        """Same as ChromaManager.embed_queries."""
+        return np.asarray(self.client.call("/embed", {"texts": list(query_texts)})["embeddings"], dtype=np.float32)
+
+    def build_where(self, filters: Dict[str, List[str]], min_matches: int = METADATA_FILTER_MIN_MATCHES) -> Optional[dict]:
+        """Same as ChromaManager.build_where; returns None (unfiltered) if the service call fails."""
+        try:
+            return self.client.call("/chroma/build_where", {"filters": filters, "min_matches": min_matches})["where"]
+        except Exception as e:
+            logger.error(f"Error building metadata filter remotely: {e}")
+            return None
+
+    def query(self, query_text: str, k: int = None, query_embedding: Optional[np.ndarray] = None, where: Optional[dict] = None) -> list:
+        """Same as ChromaManager.query."""
+        embeddings = None if query_embedding is None else np.asarray(query_embedding).reshape(1, -1)
+        results = self.query_batch([query_text], k=k, query_embeddings=embeddings, where=where)
+        return results[0] if results else []
+
+    def query_batch(self, query_texts: List[str], k: int = None, query_embeddings: Optional[np.ndarray] = None,
+                    where: Optional[dict] = None) -> List[list]:
+        """Same as ChromaManager.query_batch; returns empty lists if the service call fails."""
+        if not query_texts:
+            return []
+        payload = {"query_texts": list(query_texts), "k": k or CHROMA_RETRIEVAL_K, "where": where}
+        if query_embeddings is not None:
+            payload["query_embeddings"] = np.asarray(query_embeddings, dtype=np.float32)
+        try:
+            return self.client.call("/chroma/query", payload)["results"]
+        except Exception as e:
+            logger.error(f"Error querying remote ChromaDB: {e}")
+            return [[] for _ in query_texts]
+
+
+class RemoteTextEmbedder:
+    """
+    TextEmbedder-compatible client for the bi-encoder loaded by the retrieval service.
+    """
+    def __init__(self, base_url: str = RETRIEVAL_SERVICE_URL):
+        """
+        Initializes the client; the service is first contacted on use.
+
+        Args:
+            base_url (str): Retrieval service URL.
+        """
+        self.client = ServiceClient(base_url)
+
+    @property
+    def model_name(self) -> str:
+        return self.client.describe("/health")["text_embedding_model"]
+
+    @property
+    def dimension(self) -> int:
+        return self.client.describe("/health")["text_embedding_dimension"]
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Same as TextEmbedder.encode: normalized float32 embeddings (len(texts) x dimension)."""
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        return np.asarray(self.client.call("/embed", {"texts": list(texts)})["embeddings"], dtype=np.float32)
+
+    def encode_query(self, text: str) -> np.ndarray:
+        """Encodes a single query into a (dimension,) normalized embedding."""
+        return self.encode([text])[0]
+
+
+def create_faiss_manager():
+    """Returns a RemoteFAISSManager if RETRIEVAL_SERVICE_URL is set, otherwise an in-process FAISSManager."""
+    if RETRIEVAL_SERVICE_URL:
+        return RemoteFAISSManager(RETRIEVAL_SERVICE_URL)
+    from sat_sight.retrieval.faiss_manager import FAISSManager
+    return FAISSManager()
+
+
+def create_chroma_manager():
+    """Returns a RemoteChromaManager if RETRIEVAL_SERVICE_URL is set, otherwise an in-process ChromaManager."""
+    if RETRIEVAL_SERVICE_URL:
+        return RemoteChromaManager(RETRIEVAL_SERVICE_URL)
+    from sat_sight.retrieval.chroma_manager import ChromaManager
+    return ChromaManager()
+
+
+def create_reranker(model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"):
+    """Returns a remote Reranker if RETRIEVAL_SERVICE_URL is set, otherwise the shared in-process Reranker."""
+    from sat_sight.retrieval.reranker import RemoteReranker, get_shared_reranker
+    if RETRIEVAL_SERVICE_URL:
+        return RemoteReranker(model_name=model_name, base_url=RETRIEVAL_SERVICE_URL)
+    return get_shared_reranker(model_name=model_name)
+
+
+def create_text_embedder(model_name: str = TEXT_EMBEDDING_MODEL_NAME):
+    """Returns a RemoteTextEmbedder if RETRIEVAL_SERVICE_URL is set, otherwise the shared in-process TextEmbedder."""
+    if RETRIEVAL_SERVICE_URL:
+        return RemoteTextEmbedder(RETRIEVAL_SERVICE_URL)
+    from sat_sight.retrieval.text_embedder import get_text_embedder
+    return get_text_embedder(model_name)
+
+
+_text_embedders: Dict[str, Any] = {}
+_text_embedders_lock = threading.Lock()
+
+
+def get_shared_text_embedder(model_name: str = TEXT_EMBEDDING_MODEL_NAME):
+    """Returns the process-wide create_text_embedder() result (remote client or in-process TextEmbedder) for a model."""
+    with _text_embedders_lock:
+        if model_name not in _text_embedders:
+            _text_embedders[model_name] = create_text_embedder(model_name)
+        return _text_embedders[model_name]
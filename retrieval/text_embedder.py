@@ -0,0 +1,94 @@
+import logging
+import threading
+import numpy as np
+from concurrent.futures import Future
+from typing import Dict, List
+from sentence_transformers import SentenceTransformer
+from sat_sight.core.config import TEXT_EMBEDDING_MODEL_NAME, TEXT_EMBEDDING_BATCH_SIZE, TEXT_EMBEDDING_MAX_BATCH
+from sat_sight.utils.inference_scheduler import get_inference_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+class TextEmbedder:
+    """
+    A thin wrapper around a SentenceTransformers bi-encoder producing normalized float32 embeddings.
+    """
+    def __init__(self, model_name: str = TEXT_EMBEDDING_MODEL_NAME, batch_size: int = TEXT_EMBEDDING_BATCH_SIZE):
+        """
+        Initializes the bi-encoder.
+
+        Args:
+            model_name (str): Name of the SentenceTransformers model (e.g., "BAAI/bge-small-en-v1.5").
+            batch_size (int): Number of texts per forward pass.
+        """
+        self.model_name = model_name
+        self.batch_size = batch_size
+        logger.info(f"Initializing text embedding model: {model_name}")
+        try:
+            self.model = SentenceTransformer(model_name)
+            self.dimension = self.model.get_sentence_embedding_dimension()
+            logger.info(f"Text embedding model loaded successfully ({self.dimension} dims).")
+        except Exception as e:
+            logger.error(f"Failed to load text embedding model {model_name}: {e}")
+            raise e
+
+        # Query embeddings from concurrent runs (and the ChromaDB query path) share forward passes
+        self.scheduler = get_inference_scheduler()
+        self.queue_name = f"text-embed:{model_name}"
+        self.scheduler.register(self.queue_name, self._encode_now, max_batch_size=TEXT_EMBEDDING_MAX_BATCH)
+
+    def _encode_now(self, texts: List[str]) -> np.ndarray:
+        """Runs the bi-encoder directly (scheduler batch function)."""
+        embeddings = self.model.encode(
+            texts, batch_size=self.batch_size, normalize_embeddings=True, convert_to_numpy=True, show_progress_bar=False
+        )
+        return embeddings.astype(np.float32, copy=False)
+
+    def submit(self, texts: List[str]) -> Future:
+        """
+        Queues texts for the next shared bi-encoder batch.
+
+        Args:
+            texts (List[str]): Texts to embed.
+
+        Returns:
+            Future: Resolves to a list of (dimension,) normalized embeddings, in input order.
+        """
+        return self.scheduler.submit(self.queue_name, texts)
+
+    def encode(self, texts: List[str], scheduled: bool = True) -> np.ndarray:
+        """
+        Encodes texts into L2-normalized embeddings.
+
+        Args:
+            texts (List[str]): Texts to embed.
+            scheduled (bool): Go through the inference scheduler so concurrent callers share batches.
+                              Bulk callers that already batch (e.g., ingestion) pass False.
+
+        Returns:
+            np.ndarray: Embeddings (len(texts) x dimension), float32.
+        """
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32)
+        if not scheduled:
+            return self._encode_now(texts)
+        return np.stack(self.submit(texts).result()).astype(np.float32, copy=False)
+
+    def encode_query(self, text: str) -> np.ndarray:
+        """Encodes a single query into a (dimension,) normalized embedding."""
+        return self.encode([text])[0]
+
+
+_shared_embedders: Dict[str, TextEmbedder] = {}
+_shared_lock = threading.Lock()
+
+
+def get_text_embedder(model_name: str = TEXT_EMBEDDING_MODEL_NAME) -> TextEmbedder:
+    """
+    Returns the process-wide TextEmbedder for a model, creating it on first use.
+    """
+    with _shared_lock:
+        if model_name not in _shared_embedders:
+            _shared_embedders[model_name] = TextEmbedder(model_name=model_name)
+        return _shared_embedders[model_name]
@@ -0,0 +1,164 @@
+"""
+Tiled encoding helpers for large satellite scenes.
+Plans an overlapping tile grid that fits a time budget, cuts tiles from a
+reduced-resolution decode, keys tile embeddings for caching and aggregates per-tile
+FAISS matches into per-class results.
+"""
+import logging
+import math
+import os
+import numpy as np
+from typing import Any, Dict, List, Tuple
+from sat_sight.retrieval.image_preprocess import decode_reduced, resize_area, read_image_size
+
+logger = logging.getLogger(__name__)
+
+TileBox = Tuple[int, int, int, int] # (top, left, bottom, right) in original image pixels
+
+
+def plan_tile_grid(width: int, height: int, tile_size: int, overlap: float, max_tiles: int) -> Tuple[int, int]:
+    """
+    Chooses a (rows, cols) grid with at most max_tiles tiles that follows the image aspect ratio.
+    The grid never gets finer than the native resolution (no upsampled tiles).
+
+    Args:
+        width (int): Original image width.
+        height (int): Original image height.
+        tile_size (int): Model input resolution.
+        overlap (float): Fractional overlap between neighbouring tiles (0 <= overlap < 1).
+        max_tiles (int): Upper bound on rows * cols.
+
+    Returns:
+        Tuple[int, int]: (rows, cols).
+    """
+    stride = tile_size * (1.0 - overlap)
+    native_rows = max(1, 1 + int((height - tile_size) // stride)) if height > tile_size else 1
+    native_cols = max(1, 1 + int((width - tile_size) // stride)) if width > tile_size else 1
+
+    max_tiles = max(1, max_tiles)
+    rows = max(1, int(round(math.sqrt(max_tiles * height / width))))
+    rows = min(rows, native_rows)
+    cols = max(1, min(max_tiles // rows, native_cols))
+    return rows, cols
+
+
+def _tile_offsets(length: int, tile_size: int, count: int) -> List[int]:
+    """Spreads count tile offsets evenly so the tiles span [0, length) exactly."""
+    if count <= 1:
+        return [max(0, (length - tile_size) // 2)]
+    return [int(round(x)) for x in np.linspace(0, length - tile_size, count)]
+
+
+def extract_tiles(image_path: str, rows: int, cols: int, tile_size: int, overlap: float) -> Tuple[np.ndarray, List[TileBox], Tuple[int, int]]:
+    """
+    Decodes the image at the grid's resolution and cuts it into model-sized tiles.
+    The image is scaled uniformly (no aspect distortion) so that the grid covers it with at
+    least the requested overlap; tile offsets are then spread evenly along each axis.
+
+    Returns:
+        Tuple[np.ndarray, List[TileBox], Tuple[int, int]]:
+            tiles (N x tile_size x tile_size x 3 float32 in [0, 255]),
+            tile boxes in original-image pixel coordinates,
+            the (height, width) the image was resampled to.
+    """
+    width, height = read_image_size(image_path)
+    stride = tile_size * (1.0 - overlap)
+    scale = max((tile_size + (rows - 1) * stride) / height, (tile_size + (cols - 1) * stride) / width)
+    canvas_h = max(tile_size, int(round(height * scale)))
+    canvas_w = max(tile_size, int(round(width * scale)))
+
+    decoded = decode_reduced(image_path, min_side=min(canvas_h, canvas_w))
+    canvas = resize_area(decoded, canvas_h, canvas_w)
+
+    tiles = []
+    boxes = []
+    scale_y, scale_x = height / canvas_h, width / canvas_w
+    for top in _tile_offsets(canvas_h, tile_size, rows):
+        for left in _tile_offsets(canvas_w, tile_size, cols):
+            tiles.append(canvas[top:top + tile_size, left:left + tile_size])
+            boxes.append((int(top * scale_y), int(left * scale_x),
+                          int((top + tile_size) * scale_y), int((left + tile_size) * scale_x)))
+    return np.stack(tiles), boxes, (canvas_h, canvas_w)
+
+
+def file_signature(image_path: str) -> Tuple[str, int, int]:
+    """Identifies a file version by path, modification time and size."""
+    stat = os.stat(image_path)
+    return os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size
+
+
+def _metadata_key(meta: Dict[str, Any]) -> str:
+    return str(meta.get("path") or meta.get("image_path") or (meta.get("class"), meta.get("description")))
+
+
+def aggregate_tile_matches(distances: np.ndarray, metadata_lists: List[List[Dict[str, Any]]],
+                           boxes: List[TileBox], k: int = 10) -> Tuple[List[Dict[str, Any]], List[float], List[Dict[str, Any]]]:
+    """
+    Aggregates per-tile FAISS matches into scene-level results.
+
+    Each tile votes for the classes of its neighbours, weighted by similarity. Classes are ranked
+    by total vote; the returned images start with the best match of each class (in class order),
+    followed by the remaining unique matches by similarity, so downstream agents keep seeing a
+    plain ranked metadata list.
+
+    Args:
+        distances (np.ndarray): (num_tiles x k) similarity scores from FAISSManager.search_batch.
+        metadata_lists (List[List[Dict[str, Any]]]): Matching metadata per tile.
+        boxes (List[TileBox]): Tile boxes in original-image pixels.
+        k (int): Number of images to return.
+
+    Returns:
+        Tuple: (ranked metadata list, matching similarity list, class summary list).
+               Each class summary has 'class', 'score', 'share', 'tile_count' and 'regions'.
+    """
+    class_scores: Dict[str, float] = {}
+    class_tiles: Dict[str, set] = {}
+    best_matches: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+    for tile_idx, (tile_distances, tile_metadata) in enumerate(zip(distances, metadata_lists)):
+        for score, meta in zip(tile_distances, tile_metadata):
+            if not meta:
+                continue
+            score = float(score)
+            label = meta.get("class", "unknown")
+            class_scores[label] = class_scores.get(label, 0.0) + max(score, 0.0)
+            class_tiles.setdefault(label, set()).add(tile_idx)
+
+            key = _metadata_key(meta)
+            if key not in best_matches or score > best_matches[key][0]:
+                best_matches[key] = (score, meta)
+
+    total = sum(class_scores.values()) or 1.0
+    ranked_classes = sorted(class_scores, key=class_scores.get, reverse=True)
+    class_rank = {label: rank for rank, label in enumerate(ranked_classes)}
+
+    class_summary = [
+        {
+            "class": label,
+            "score": class_scores[label],
+            "share": class_scores[label] / total,
+            "tile_count": len(class_tiles[label]),
+            "regions": [boxes[i] for i in sorted(class_tiles[label])],
+        }
+        for label in ranked_classes
+    ]
+
+    # Best match of every class first (in class order) for diversity, then the rest by similarity
+    by_score = sorted(best_matches.values(), key=lambda item: -item[0])
+    leaders = {}
+    for score, meta in by_score:
+        leaders.setdefault(meta.get("class", "unknown"), (score, meta))
+    ordered = sorted(leaders.values(), key=lambda item: class_rank[item[1].get("class", "unknown")])
+    leader_ids = {id(meta) for _, meta in ordered}
+    ordered += [item for item in by_score if id(item[1]) not in leader_ids]
+
+    ranked_metadata = []
+    ranked_scores = []
+    for score, meta in ordered[:k]:
+        updated_meta = meta.copy()
+        updated_meta["tile_class_share"] = class_scores.get(meta.get("class", "unknown"), 0.0) / total
+        ranked_metadata.append(updated_meta)
+        ranked_scores.append(score)
+
+    logger.debug(f"Aggregated {len(boxes)} tiles into {len(class_summary)} classes and {len(ranked_metadata)} images.")
+    return ranked_metadata, ranked_scores, class_summary
@@ -0,0 +1,143 @@
+import hashlib
+import logging
+import re
+import numpy as np
+from typing import Dict, List, Tuple
+from sat_sight.core.config import (
+    WEB_EVIDENCE_TOKEN_BUDGET, WEB_EVIDENCE_MAX_PASSAGES, WEB_EVIDENCE_MIN_RELATIVE_SCORE, WEB_PASSAGE_MAX_CHARS,
+    WEB_PASSAGES_PER_RESULT
+)
+from sat_sight.retrieval.service_client import get_shared_text_embedder
+from sat_sight.utils.lru_cache import LRUCache
+from sat_sight.utils.token_counter import count_tokens
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
+_passage_embeddings = LRUCache(max_entries=20000) # Passage text hash -> embedding; popular results recur across users
+
+
+def result_text(result: Dict) -> str:
+    """Returns the fullest text of a search result (Tavily raw_content/content, DuckDuckGo body)."""
+    return (result.get("raw_content") or result.get("content") or result.get("body") or "").strip()
+
+
+def split_passages(text: str, max_chars: int = WEB_PASSAGE_MAX_CHARS) -> List[str]:
+    """
+    Splits text into passages of whole sentences, each at most max_chars long
+    (a single over-long sentence is cut at a word boundary).
+
+    Args:
+        text (str): Result text.
+        max_chars (int): Maximum passage length.
+
+    Returns:
+        List[str]: Passages in document order.
+    """
+    passages, current = [], ""
+    for sentence in _SENTENCE_END.split(" ".join(text.split())):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                passages.append(current)
+                current = ""
+            passages.append(sentence[:cut])
+            sentence = sentence[cut:].lstrip()
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            passages.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        passages.append(current)
+    return passages
+
+
+def _embed_passages(passages: List[str]) -> np.ndarray:
+    keys = [hashlib.sha1(passage.encode("utf-8")).hexdigest() for passage in passages]
+    cached = [_passage_embeddings.get(key) for key in keys]
+    missing = [i for i, embedding in enumerate(cached) if embedding is None]
+    if missing:
+        embeddings = get_shared_text_embedder().encode([passages[i] for i in missing])
+        for i, embedding in zip(missing, embeddings):
+            _passage_embeddings.put(keys[i], embedding)
+            cached[i] = embedding
+    return np.stack(cached)
+
+
+def score_passages(query: str, passages: List[str]) -> np.ndarray:
+    """
+    Cosine similarity of each passage to the query, using the retrieval service's bi-encoder when
+    RETRIEVAL_SERVICE_URL is set; falls back to term overlap if the bi-encoder is unavailable.
+    """
+    try:
+        return _embed_passages(passages) @ get_shared_text_embedder().encode_query(query)
+    except Exception as e:
+        logger.warning(f"Web evidence: Bi-encoder scoring failed ({e}), using term overlap.")
+        query_terms = set(re.findall(r"\w{3,}", query.lower()))
+        return np.array([
+            len(query_terms & set(re.findall(r"\w{3,}", passage.lower()))) / max(len(query_terms), 1)
+            for passage in passages
+        ], dtype=np.float32)
+
+
+def select_web_evidence(query: str, results: List[Dict], token_budget: int = WEB_EVIDENCE_TOKEN_BUDGET,
+                        max_passages: int = WEB_EVIDENCE_MAX_PASSAGES) -> List[Dict]:
+    """
+    Splits web search results into passages, scores them against the query and keeps the best
+    passages that fit the token budget. Passages in the bottom (1 - WEB_EVIDENCE_MIN_RELATIVE_SCORE)
+    of the score range are dropped even if budget remains; the best passage is always kept.
+
+    Args:
+        query (str): The user query.
+        results (List[Dict]): Tavily/DuckDuckGo results (title, url/href, content/body, optional raw_content).
+        token_budget (int): Maximum estimated tokens of selected passage text.
+        max_passages (int): Maximum passages kept overall.
+
+    Returns:
+        List[Dict]: One entry per result that contributed evidence, best first:
+                    {"title", "url", "content" (selected passages in document order, joined by " ... "), "score"}.
+    """
+    candidates: List[Tuple[int, int, str]] = [] # (result position, passage position, text)
+    seen = set()
+    for r, result in enumerate(results):
+        for p, passage in enumerate(split_passages(result_text(result))[:WEB_PASSAGES_PER_RESULT]):
+            key = passage.lower()
+            if key not in seen:
+                seen.add(key)
+                candidates.append((r, p, passage))
+    if not candidates:
+        return []
+
+    scores = score_passages(query, [text for _, _, text in candidates])
+    selected: Dict[int, List[Tuple[int, str, float]]] = {}
+    used_tokens = 0
+    kept = 0
+    best, worst = float(scores.max()), float(scores.min())
+    min_score = best - (1.0 - WEB_EVIDENCE_MIN_RELATIVE_SCORE) * (best - worst) # Relative to the range, so negative scores work too
+    for i in np.argsort(-scores, kind="stable"):
+        if scores[i] < min_score and kept:
+            break
+        r, p, text = candidates[i]
+        tokens = count_tokens(text)
+        if used_tokens + tokens > token_budget and kept:
+            continue
+        selected.setdefault(r, []).append((p, text, float(scores[i])))
+        used_tokens += tokens
+        kept += 1
+        if kept >= max_passages or used_tokens >= token_budget:
+            break
+
+    evidence = []
+    for r, passages in selected.items():
+        result = results[r]
+        evidence.append({
+            "title": result.get("title", "No Title"),
+            "url": result.get("url", result.get("href", "")),
+            "content": " ... ".join(text for _, text, _ in sorted(passages)),
+            "score": max(score for _, _, score in passages),
+        })
+    evidence.sort(key=lambda item: item["score"], reverse=True)
+    logger.info(f"Web evidence: Kept {kept} of {len(candidates)} passages (~{used_tokens} tokens) from {len(evidence)} results.")
+    return evidence
@@ -1,21 +1,148 @@
+import argparse
 import logging
+import threading
 import wikipedia # The Wikipedia-API Python library (installed via pip install wikipedia)
-from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterable, Optional
+from sat_sight.core.config import (
+    EUROSAT_CLASSES, WIKI_CACHE_TTL_S, WIKI_CACHE_STALE_S, WIKI_NEGATIVE_TTL_S, WIKI_PACK_PATH, WIKI_NETWORK_ENABLED
+)
+from sat_sight.retrieval.wiki_pack import WikiPack
+from sat_sight.utils.persistent_cache import PersistentCache
 
 logger = logging.getLogger(__name__)
 
+
+def normalize_term(search_term: str) -> str:
+    """Lowercases a search term and collapses whitespace, so spelling variants share a cache entry."""
+    return " ".join(search_term.lower().split())
+
+
 class WikiFetcher:
     """
     A class to fetch summaries from Wikipedia based on class labels or location hints.
+    Pages are served from the offline knowledge pack when it has them; other resolved pages
+    (title and summary) are kept in a persistent cache, and stale entries are served immediately
+    while a background refresh runs.
     """
-    def __init__(self, max_sentences: int = 5):
+    def __init__(self, max_sentences: int = 5, use_cache: bool = True, pack_path: Optional[str] = WIKI_PACK_PATH,
+                 network: bool = WIKI_NETWORK_ENABLED):
         """
         Initializes the WikiFetcher.
 
         Args:
             max_sentences (int): Maximum number of sentences to retrieve from the summary.
+            use_cache (bool): Keep resolved pages in the persistent "wikipedia" cache.
+            pack_path (str, optional): Offline knowledge pack consulted first (None to disable).
+            network (bool): Query Wikipedia for terms missing from the pack and cache.
         """
         self.max_sentences = max_sentences
+        self.pack = WikiPack.load(pack_path) if pack_path else None
+        self.network = network
+        self.cache = PersistentCache("wikipedia") if use_cache else None
+        self._refreshing: set = set()
+        self._refresh_lock = threading.Lock()
+        self._refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="wiki-refresh") if use_cache else None
+
+    def _cache_key(self, search_term: str) -> str:
+        return f"{normalize_term(search_term)}|{self.max_sentences}"
+
+    def _resolve(self, search_term: str) -> Optional[Dict[str, str]]:
+        """
+        Searches Wikipedia and fetches the summary of the best page, following the first
+        disambiguation option if needed.
+
+        Returns:
+            Optional[Dict[str, str]]: {"title", "summary"}, or None if no page exists.
+
+        Raises:
+            Exception: On network or API errors (these are not cached).
+        """
+        page_title = wikipedia.search(search_term, results=1)
+        if not page_title:
+            logger.info(f"WikiFetcher: No Wikipedia page found for search term '{search_term}'.")
+            return None
+
+        page_title = page_title[0] # Get the first result
+        logger.debug(f"WikiFetcher: Found Wikipedia page: '{page_title}' for term '{search_term}'.")
+
+        try:
+            summary = wikipedia.summary(page_title, sentences=self.max_sentences, auto_suggest=True, redirect=True)
+        except wikipedia.exceptions.DisambiguationError as e:
+            logger.warning(f"Wikipedia disambiguation error for '{search_term}': {e.options[:5]}...") # Log first 5 options
+            page_title = e.options[0]
+            logger.info(f"WikiFetcher: Taking first disambiguation option: '{page_title}' for '{search_term}'.")
+            summary = wikipedia.summary(page_title, sentences=self.max_sentences, auto_suggest=True, redirect=True)
+        except wikipedia.exceptions.PageError:
+            logger.info(f"WikiFetcher: Wikipedia page does not exist for '{search_term}'.")
+            return None
+
+        logger.info(f"WikiFetcher: Retrieved summary for '{page_title}' (first {len(summary)} chars).")
+        return {"title": page_title, "summary": summary}
+
+    def _fetch_and_store(self, search_term: str) -> Optional[Dict[str, str]]:
+        page = self._resolve(search_term)
+        if self.cache is not None:
+            if page is None:
+                self.cache.put(self._cache_key(search_term), None, ttl_s=WIKI_NEGATIVE_TTL_S)
+            else:
+                self.cache.put(self._cache_key(search_term), page, ttl_s=WIKI_CACHE_TTL_S, stale_s=WIKI_CACHE_STALE_S)
+        return page
+
+    def _refresh_in_background(self, search_term: str):
+        key = self._cache_key(search_term)
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._fetch_and_store(search_term)
+            except Exception as e:
+                logger.warning(f"WikiFetcher: Background refresh failed for '{search_term}': {e}")
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(key)
+
+        self._refresh_executor.submit(refresh)
+
+    def fetch_page(self, search_term: str) -> Optional[Dict[str, str]]:
+        """
+        Resolves a search term to a Wikipedia page title and summary: from the offline pack, then the
+        persistent cache, then the network.
+
+        Args:
+            search_term (str): The term to search for on Wikipedia.
+
+        Returns:
+            Optional[Dict[str, str]]: {"title", "summary"}, or None if not found or an error occurs.
+        """
+        if self.pack is not None:
+            page = self.pack.lookup(search_term)
+            if page is not None:
+                logger.debug(f"WikiFetcher: Serving '{page['title']}' for '{search_term}' from the offline pack.")
+                return page
+
+        if self.cache is not None:
+            entry = self.cache.get(self._cache_key(search_term))
+            if entry is not None:
+                if not entry.is_fresh:
+                    logger.debug(f"WikiFetcher: Serving stale entry for '{search_term}' while refreshing.")
+                    if self.network:
+                        self._refresh_in_background(search_term)
+                return entry.value
+
+        if not self.network:
+            logger.info(f"WikiFetcher: '{search_term}' is not in the offline pack or cache and network access is disabled.")
+            return None
+
+        logger.debug(f"WikiFetcher: Searching Wikipedia for '{search_term}'.")
+        try:
+            return self._fetch_and_store(search_term)
+        except Exception as e:
+            logger.error(f"WikiFetcher: Error fetching Wikipedia summary for '{search_term}': {e}")
+            return None
 
     def fetch_summary(self, search_term: str, max_chars: int = 1000) -> Optional[str]:
         """
@@ -32,42 +159,53 @@ class WikiFetcher:
             logger.warning("WikiFetcher: Empty search term provided.")
             return None
 
-        logger.debug(f"WikiFetcher: Searching Wikipedia for '{search_term}'.")
-
-        try:
-            page_title = wikipedia.search(search_term, results=1)
-            if not page_title:
-                logger.info(f"WikiFetcher: No Wikipedia page found for search term '{search_term}'.")
-                return None
+        page = self.fetch_page(search_term)
+        if page is None:
+            return None
 
-            page_title = page_title[0] # Get the first result
-            logger.debug(f"WikiFetcher: Found Wikipedia page: '{page_title}' for term '{search_term}'.")
+        summary = page["summary"]
+        if len(summary) > max_chars:
+            summary = summary[:max_chars] + "... [Truncated]"
+        return summary
 
-            summary = wikipedia.summary(page_title, sentences=self.max_sentences, auto_suggest=True, redirect=True)
-            logger.info(f"WikiFetcher: Retrieved summary for '{page_title}' (first {len(summary)} chars).")
+    def prewarm(self, search_terms: Iterable[str] = EUROSAT_CLASSES, max_workers: int = 4) -> int:
+        """
+        Fetches terms without a fresh cache entry, so later lookups are cache hits.
 
-            if len(summary) > max_chars:
-                summary = summary[:max_chars] + "... [Truncated]"
+        Args:
+            search_terms (Iterable[str]): Terms to warm. Defaults to the EuroSAT class labels.
+            max_workers (int): Concurrent Wikipedia requests.
 
-            return summary
+        Returns:
+            int: Number of terms fetched.
+        """
+        if self.cache is None:
+            return 0
+        terms = {self._cache_key(term): term for term in search_terms}
+        missing = [terms[key] for key in self.cache.missing(terms)]
+        logger.info(f"WikiFetcher: Prewarming {len(missing)} of {len(terms)} terms.")
 
-        except wikipedia.exceptions.DisambiguationError as e:
-            logger.warning(f"Wikipedia disambiguation error for '{search_term}': {e.options[:5]}...") # Log first 5 options
+        def warm(term: str):
             try:
-                first_option = e.options[0]
-                logger.info(f"WikiFetcher: Taking first disambiguation option: '{first_option}' for '{search_term}'.")
-                summary = wikipedia.summary(first_option, sentences=self.max_sentences, auto_suggest=True, redirect=True)
-                if len(summary) > max_chars:
-                    summary = summary[:max_chars] + "... [Truncated]"
-                return summary
-            except Exception as inner_e:
-                logger.error(f"WikiFetcher: Error fetching disambiguation option '{first_option}': {inner_e}")
-                return None
+                self._fetch_and_store(term)
+            except Exception as e:
+                logger.warning(f"WikiFetcher: Failed to prewarm '{term}': {e}")
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(warm, missing))
+        return len(missing)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prewarm the persistent Wikipedia summary cache.")
+    parser.add_argument("terms", nargs="*", help="Terms to warm (default: the EuroSAT class labels).")
+    parser.add_argument("--sentences", type=int, default=8, help="Summary sentences (must match the agent's WikiFetcher).")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    fetched = WikiFetcher(max_sentences=args.sentences).prewarm(args.terms or EUROSAT_CLASSES)
+    print(f"Fetched {fetched} Wikipedia summaries.")
 
-        except wikipedia.exceptions.PageError:
-            logger.info(f"WikiFetcher: Wikipedia page does not exist for '{search_term}'.")
-            return None
-        except Exception as e:
-            logger.error(f"WikiFetcher: Error fetching Wikipedia summary for '{search_term}': {e}")
-            return None
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Offline Wikipedia knowledge pack.
+A gzip-compressed JSON file of article summaries for the topics the system is asked about
+(land-cover classes, metadata regions, environmental topics) with a title/alias index and
+optional bi-encoder embeddings. WikiFetcher serves from it before touching the network.
+
+Usage:
+    python -m sat_sight.retrieval.wiki_pack                      # default topics, with embeddings
+    python -m sat_sight.retrieval.wiki_pack "Sahel" "Permafrost" --no-embeddings
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import re
+import numpy as np
+from typing import Dict, Iterable, List, Optional
+from sat_sight.core.config import (
+    WIKI_PACK_PATH, WIKI_PACK_TOPICS, WIKI_PACK_MIN_SIMILARITY, EUROSAT_CLASSES, TEXT_EMBEDDING_MODEL_NAME
+)
+from sat_sight.retrieval.service_client import get_shared_text_embedder
+
+logger = logging.getLogger(__name__)
+
+PACK_VERSION = 1
+_CAMEL_CASE = re.compile(r"(?<=[a-z])(?=[A-Z])")
+
+
+def normalize_alias(text: str) -> str:
+    """Lowercases and collapses whitespace (matches WikiFetcher's term normalisation)."""
+    return " ".join(text.lower().split())
+
+
+def alias_variants(term: str) -> List[str]:
+    """Returns the normalised term plus its CamelCase-split form ("AnnualCrop" -> "annual crop")."""
+    variants = [normalize_alias(term), normalize_alias(_CAMEL_CASE.sub(" ", term))]
+    return list(dict.fromkeys(variant for variant in variants if variant))
+
+
+def embeddings_path(pack_path: str) -> str:
+    return f"{os.path.splitext(pack_path[:-3] if pack_path.endswith('.gz') else pack_path)[0]}.embeddings.npy"
+
+
+class WikiPack:
+    """
+    An in-memory Wikipedia summary pack: alias -> article lookups, plus an optional
+    nearest-article fallback over summary embeddings.
+    """
+    def __init__(self, articles: List[Dict[str, str]], aliases: Dict[str, int], max_sentences: int,
+                 embeddings: Optional[np.ndarray] = None, embedding_model: Optional[str] = None):
+        """
+        Args:
+            articles (List[Dict[str, str]]): {"title", "summary"} per article.
+            aliases (Dict[str, int]): Normalised alias -> article position.
+            max_sentences (int): Summary length the pack was built with.
+            embeddings (np.ndarray, optional): Normalised title+summary embeddings (articles x d).
+            embedding_model (str, optional): Bi-encoder that produced the embeddings.
+        """
+        self.articles = articles
+        self.aliases = aliases
+        self.max_sentences = max_sentences
+        self.embeddings = embeddings
+        self.embedding_model = embedding_model
+
+    def __len__(self) -> int:
+        return len(self.articles)
+
+    def lookup(self, search_term: str, semantic: bool = True) -> Optional[Dict[str, str]]:
+        """
+        Finds the article for a search term.
+
+        Args:
+            search_term (str): Term as passed to WikiFetcher.
+            semantic (bool): If no alias matches, fall back to the most similar article by embedding
+                             (when the pack has embeddings and the similarity clears WIKI_PACK_MIN_SIMILARITY).
+
+        Returns:
+            Optional[Dict[str, str]]: {"title", "summary"}, or None on a miss.
+        """
+        for alias in alias_variants(search_term):
+            position = self.aliases.get(alias)
+            if position is not None:
+                return self.articles[position]
+        if not semantic or self.embeddings is None or not len(self.articles):
+            return None
+
+        try:
+            embedder = get_shared_text_embedder(self.embedding_model)
+            if embedder.model_name != self.embedding_model: # The retrieval service may run a different bi-encoder
+                logger.debug(f"WikiPack: Embeddings are from {self.embedding_model}, not {embedder.model_name}; skipping semantic lookup.")
+                return None
+            scores = self.embeddings.astype(np.float32) @ embedder.encode_query(search_term)
+        except Exception as e:
+            logger.warning(f"WikiPack: Semantic lookup for '{search_term}' failed: {e}")
+            return None
+        best = int(np.argmax(scores))
+        if scores[best] < WIKI_PACK_MIN_SIMILARITY:
+            return None
+        logger.debug(f"WikiPack: '{search_term}' matched '{self.articles[best]['title']}' by embedding ({scores[best]:.2f}).")
+        return self.articles[best]
+
+    def save(self, path: str):
+        """Writes the pack (gzip JSON) and, if present, its embeddings (float16 .npy) next to it."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        state = {
+            "version": PACK_VERSION, "max_sentences": self.max_sentences, "embedding_model": self.embedding_model,
+            "articles": self.articles, "aliases": self.aliases,
+        }
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+        if self.embeddings is not None:
+            np.save(embeddings_path(path), self.embeddings.astype(np.float16))
+        logger.info(f"Wikipedia pack with {len(self)} articles and {len(self.aliases)} aliases saved to {path}")
+
+    @classmethod
+    def load(cls, path: str = WIKI_PACK_PATH) -> Optional["WikiPack"]:
+        """
+        Loads a pack written by save().
+
+        Returns:
+            Optional[WikiPack]: The pack, or None if the file is missing or unreadable.
+        """
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("version") != PACK_VERSION:
+                logger.warning(f"Ignoring Wikipedia pack {path} with unknown version {state.get('version')}")
+                return None
+            vectors_path = embeddings_path(path)
+            embeddings = np.load(vectors_path) if state.get("embedding_model") and os.path.exists(vectors_path) else None
+        except Exception as e:
+            logger.error(f"Failed to load Wikipedia pack from {path}: {e}")
+            return None
+        logger.info(f"Wikipedia pack with {len(state['articles'])} articles loaded from {path}")
+        return cls(state["articles"], state["aliases"], state["max_sentences"], embeddings, state.get("embedding_model"))
+
+
+def default_topics() -> List[str]:
+    """EuroSAT class labels, the regions and countries of the image metadata, and WIKI_PACK_TOPICS."""
+    topics = list(EUROSAT_CLASSES) + list(WIKI_PACK_TOPICS)
+    from sat_sight.retrieval.location_index import get_location_index
+    location_index = get_location_index()
+    if location_index is not None:
+        topics += sorted({value for record in location_index.records for value in (record.get("location"), record.get("country")) if value})
+    return list(dict.fromkeys(topics))
+
+
+def build_pack(topics: Iterable[str], max_sentences: int = 8, with_embeddings: bool = True,
+               embedding_model: str = TEXT_EMBEDDING_MODEL_NAME) -> WikiPack:
+    """
+    Resolves topics to Wikipedia summaries (through WikiFetcher and its persistent cache) and builds a pack.
+
+    Args:
+        topics (Iterable[str]): Search terms to include.
+        max_sentences (int): Summary sentences per article.
+        with_embeddings (bool): Also embed "title. summary" for the semantic fallback.
+        embedding_model (str): Bi-encoder used for the embeddings.
+
+    Returns:
+        WikiPack: The new pack (topics without a page are skipped).
+    """
+    from sat_sight.retrieval.wiki_fetcher import WikiFetcher
+
+    fetcher = WikiFetcher(max_sentences=max_sentences, pack_path=None)
+    articles: List[Dict[str, str]] = []
+    positions: Dict[str, int] = {}
+    aliases: Dict[str, int] = {}
+    for topic in topics:
+        page = fetcher.fetch_page(topic)
+        if page is None:
+            logger.warning(f"WikiPack: No article for '{topic}', skipping.")
+            continue
+        if page["title"] not in positions:
+            positions[page["title"]] = len(articles)
+            articles.append({"title": page["title"], "summary": page["summary"]})
+        for alias in alias_variants(topic) + alias_variants(page["title"]):
+            aliases.setdefault(alias, positions[page["title"]])
+
+    embeddings = None
+    if with_embeddings and articles:
+        from sat_sight.retrieval.text_embedder import get_text_embedder
+        embeddings = get_text_embedder(embedding_model).encode([f"{a['title']}. {a['summary']}" for a in articles], scheduled=False)
+    return WikiPack(articles, aliases, max_sentences, embeddings, embedding_model if embeddings is not None else None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("topics", nargs="*", help="Topics to pack (default: classes, metadata regions, WIKI_PACK_TOPICS).")
+    parser.add_argument("--output", default=WIKI_PACK_PATH, help="Pack file (.json.gz).")
+    parser.add_argument("--sentences", type=int, default=8, help="Summary sentences per article.")
+    parser.add_argument("--no-embeddings", action="store_true", help="Skip the embedding fallback.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    pack = build_pack(args.topics or default_topics(), max_sentences=args.sentences, with_embeddings=not args.no_embeddings)
+    pack.save(args.output)
+
+
+if __name__ == "__main__":
+    main()
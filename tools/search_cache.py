@@ -0,0 +1,130 @@
+import logging
+import re
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+from sat_sight.core.config import WEB_SEARCH_CACHE_TTL_S, WEB_SEARCH_NEWS_TTL_S, WEB_SEARCH_EMPTY_TTL_S
+from sat_sight.utils.persistent_cache import PersistentCache
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r"[^\w\s-]")
+_TIME_SENSITIVE = re.compile(r"\b(latest|news|today|tonight|yesterday|current|currently|now|recent|recently|this (week|month|year)|live)\b")
+
+
+def normalize_query(query: str) -> str:
+    """Lowercases a query, strips punctuation and collapses whitespace, so trivial variants share an entry."""
+    return " ".join(_PUNCTUATION.sub(" ", query.lower()).split())
+
+
+def is_time_sensitive(query: str) -> bool:
+    """True for queries whose results go stale quickly ("latest floods in ...", "... news today")."""
+    return bool(_TIME_SENSITIVE.search(normalize_query(query)))
+
+
+class SearchResultCache:
+    """
+    A persistent, cross-user cache of web search results keyed by provider and normalised query.
+    Concurrent identical lookups are coalesced: one caller queries the provider while the others
+    wait for its result.
+    """
+    def __init__(self, namespace: str = "web_search"):
+        """
+        Initializes the cache.
+
+        Args:
+            namespace (str): PersistentCache namespace for the results.
+        """
+        self.cache = PersistentCache(namespace)
+        self.upstream_calls = 0
+        self.coalesced_calls = 0
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(provider: str, query: str, max_results: int) -> str:
+        return f"{provider}|{max_results}|{normalize_query(query)}"
+
+    def peek(self, provider: str, query: str, max_results: int) -> Optional[List[dict]]:
+        """Returns fresh, non-empty cached results for a query without calling the provider, or None."""
+        entry = self.cache.get(self.cache_key(provider, query, max_results))
+        return entry.value if entry is not None and entry.is_fresh and entry.value else None
+
+    def get_or_fetch(self, provider: str, query: str, max_results: int, fetch: Callable[[], List[dict]],
+                     on_upstream: Optional[Callable[[float, bool], None]] = None) -> List[dict]:
+        """
+        Returns cached results for a query, or calls the provider once for all concurrent callers.
+
+        Args:
+            provider (str): Provider name (part of the cache key).
+            query (str): The search query.
+            max_results (int): Result count requested (part of the cache key).
+            fetch (Callable[[], List[dict]]): Performs the upstream search; raises on provider errors,
+                                             which are propagated to every waiting caller and not cached.
+            on_upstream (Callable[[float, bool], None], optional): Called with (latency in ms, success) when this
+                                                                  caller actually queried the provider (not on cache
+                                                                  hits or joined in-flight requests).
+
+        Returns:
+            List[dict]: The search results.
+        """
+        key = self.cache_key(provider, query, max_results)
+        entry = self.cache.get(key)
+        if entry is not None and entry.is_fresh:
+            logger.debug(f"SearchResultCache: Hit for {provider} query '{query}'.")
+            return entry.value
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.upstream_calls += 1
+            else:
+                self.coalesced_calls += 1
+        if not leader:
+            logger.debug(f"SearchResultCache: Joining in-flight {provider} query '{query}'.")
+            return future.result()
+
+        try:
+            entry = self.cache.get(key) # A previous leader may have finished since the first lookup
+            if entry is not None and entry.is_fresh:
+                future.set_result(entry.value)
+                return entry.value
+            start = time.perf_counter()
+            try:
+                results = list(fetch())
+            except Exception:
+                if on_upstream is not None:
+                    on_upstream((time.perf_counter() - start) * 1000, False)
+                raise
+            if on_upstream is not None:
+                on_upstream((time.perf_counter() - start) * 1000, True)
+            if results:
+                ttl_s = WEB_SEARCH_NEWS_TTL_S if is_time_sensitive(query) else WEB_SEARCH_CACHE_TTL_S
+            else:
+                ttl_s = WEB_SEARCH_EMPTY_TTL_S
+            self.cache.put(key, results, ttl_s=ttl_s)
+            future.set_result(results)
+            return results
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> SearchResultCache:
+    """Returns the process-wide search result cache shared by all search tools."""
+    global _search_cache
+    with _search_cache_lock:
+        if _search_cache is None:
+            _search_cache = SearchResultCache()
+        return _search_cache
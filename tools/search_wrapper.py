@@ -1,5 +1,7 @@
 import logging
+import threading
 from duckduckgo_search import DDGS # Import the search library
+from sat_sight.tools.search_cache import get_search_cache
 
 
 logger = logging.getLogger(__name__)
@@ -7,8 +9,11 @@ logger = logging.getLogger(__name__)
 class DuckDuckGoSearchTool:
     """
     A wrapper for the duckduckgo_search library.
-    Provides a simple interface for performing web searches.
+    Provides a simple interface for performing web searches. Results go through the shared
+    search cache, and each thread reuses one DDGS client (and its HTTP session).
     """
+    provider = "duckduckgo"
+
     def __init__(self, max_results: int = 3):
         """
         Initializes the search tool.
@@ -17,6 +22,25 @@ class DuckDuckGoSearchTool:
             max_results (int): Maximum number of results to return per search.
         """
         self.max_results = max_results
+        self.cache = get_search_cache()
+        self._local = threading.local()
+
+    def _client(self) -> DDGS:
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = DDGS()
+        return client
+
+    def _search_upstream(self, query: str) -> list:
+        results = list(self._client().text(query, max_results=self.max_results)) # Convert generator to list
+        logger.debug(f"DuckDuckGo search returned {len(results)} results.")
+        return results
+
+    def fetch(self, query: str, on_upstream=None) -> list:
+        """Like search(), but raises on provider errors (used by the web search router, which passes
+        on_upstream to time real provider calls; see SearchResultCache.get_or_fetch)."""
+        return self.cache.get_or_fetch(self.provider, query, self.max_results, lambda: self._search_upstream(query),
+                                       on_upstream=on_upstream)
 
     def search(self, query: str) -> list:
         """
@@ -32,9 +56,7 @@ class DuckDuckGoSearchTool:
         """
         logger.debug(f"Searching DuckDuckGo for: {query}")
         try:
-            results = DDGS().text(query, max_results=self.max_results)
-            logger.debug(f"DuckDuckGo search returned {len(results)} results.")
-            return list(results) # Convert generator to list
+            return self.fetch(query)
         except Exception as e:
             logger.error(f"Error during DuckDuckGo search: {e}")
             return [] # Return empty list on failure
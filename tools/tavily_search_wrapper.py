@@ -1,8 +1,11 @@
 import logging
 import os
+import threading
 from tavily import TavilyClient # Import the Tavily client
 from dotenv import load_dotenv
 from pathlib import Path
+from sat_sight.core.config import TAVILY_SEARCH_DEPTH, TAVILY_INCLUDE_RAW_CONTENT
+from sat_sight.tools.search_cache import get_search_cache
 
 env_path = Path(__file__).parent.parent / ".env"
 load_dotenv(dotenv_path=env_path)
@@ -10,26 +13,59 @@ load_dotenv()  # Load environment variables from .env file
 
 logger = logging.getLogger(__name__)
 
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_tavily_client(api_key: str) -> TavilyClient:
+    """Returns the process-wide TavilyClient for an API key, so tool instances share one client."""
+    with _clients_lock:
+        if api_key not in _clients:
+            _clients[api_key] = TavilyClient(api_key=api_key)
+        return _clients[api_key]
+
 class TavilySearchTool:
     """
     A wrapper for the tavily-python library.
     Provides a simple interface for performing AI-focused web searches.
-    Requires TAVILY_API_KEY environment variable to be set.
+    Requires TAVILY_API_KEY environment variable to be set. Results go through the shared search cache.
     """
-    def __init__(self, max_results: int = 3, search_depth: str = "advanced"):
+    def __init__(self, max_results: int = 3, search_depth: str = TAVILY_SEARCH_DEPTH,
+                 include_raw_content: bool = TAVILY_INCLUDE_RAW_CONTENT):
         """
         Initializes the Tavily search tool.
 
         Args:
             max_results (int): Maximum number of results to return per search.
             search_depth (str): "basic" or "advanced". Advanced provides more thorough results.
+            include_raw_content (bool): Also return the full page text ("raw_content") for passage selection.
         """
         self.max_results = max_results
         self.search_depth = search_depth
+        self.include_raw_content = include_raw_content
         api_key = os.getenv("TAVILY_API_KEY")
         if not api_key:
             raise ValueError("TAVILY_API_KEY environment variable is not set.")
-        self.client = TavilyClient(api_key=api_key)
+        self.provider = f"tavily-{search_depth}" + ("-raw" if include_raw_content else "")
+        self.client = get_tavily_client(api_key)
+        self.cache = get_search_cache()
+
+    def _search_upstream(self, query: str) -> list:
+        response = self.client.search(
+            query=query,
+            max_results=self.max_results,
+            search_depth=self.search_depth,
+            include_raw_content=self.include_raw_content,
+        )
+        results = response.get('results', [])
+        logger.debug(f"Tavily search returned {len(results)} results.")
+        return results
+
+    def fetch(self, query: str, on_upstream=None) -> list:
+        """Like search(), but raises on provider errors (used by the web search router, which passes
+        on_upstream to time real provider calls; see SearchResultCache.get_or_fetch)."""
+        return self.cache.get_or_fetch(self.provider, query, self.max_results, lambda: self._search_upstream(query),
+                                       on_upstream=on_upstream)
 
     def search(self, query: str) -> list:
         """
@@ -45,14 +81,7 @@ class TavilySearchTool:
         """
         logger.debug(f"Searching Tavily for: {query}")
         try:
-            response = self.client.search(
-                query=query,
-                max_results=self.max_results,
-                search_depth=self.search_depth,
-            )
-            results = response.get('results', [])
-            logger.debug(f"Tavily search returned {len(results)} results.")
-            return results
+            return self.fetch(query)
         except Exception as e:
             logger.error(f"Error during Tavily search: {e}")
             return [] # Return empty list on failure
@@ -0,0 +1,199 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sat_sight.core.config import (
+    WEB_SEARCH_K, WEB_SEARCH_HEDGING_ENABLED, WEB_SEARCH_HEDGE_AFTER_MS, WEB_SEARCH_HEDGE_MIN_MS, WEB_SEARCH_TIMEOUT_S
+)
+from sat_sight.tools.search_cache import get_search_cache
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderStats:
+    """Rolling latency samples and an exponentially weighted error rate for one search provider."""
+    def __init__(self, window: int = 50, error_decay: float = 0.2):
+        self.latencies_ms: deque = deque(maxlen=window)
+        self.error_rate = 0.0
+        self.calls = 0
+        self.errors = 0
+        self.error_decay = error_decay
+        self._lock = threading.Lock()
+
+    def record(self, latency_ms: float, ok: bool):
+        """Records one upstream call (signature matches SearchResultCache's on_upstream callback)."""
+        with self._lock:
+            self.calls += 1
+            if ok:
+                self.latencies_ms.append(latency_ms)
+            else:
+                self.errors += 1
+            self.error_rate = (1 - self.error_decay) * self.error_rate + self.error_decay * (0.0 if ok else 1.0)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            return float(np.percentile(self.latencies_ms, q)) if len(self.latencies_ms) >= 5 else None
+
+    def score(self) -> float:
+        """Expected cost of using this provider first (lower is better); unmeasured providers score 0 so they get tried."""
+        median = self.percentile(50)
+        if median is None:
+            return float("inf") if self.error_rate >= 0.5 else 0.0
+        return median / max(1.0 - self.error_rate, 0.05)
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "calls": self.calls, "errors": self.errors, "error_rate": round(self.error_rate, 3),
+            "p50_ms": self.percentile(50), "p90_ms": self.percentile(90),
+        }
+
+
+class WebSearchRouter:
+    """
+    A single entry point over the web search providers (Tavily, DuckDuckGo).
+    The provider with the best recent latency/error record is queried first; if it has not answered
+    within its hedge delay (its p90 latency, clamped to WEB_SEARCH_HEDGE_MIN_MS..WEB_SEARCH_HEDGE_AFTER_MS)
+    or it fails, the next provider is raced against it and the first non-empty response wins.
+    """
+    def __init__(self, providers: Dict[str, object], hedging: bool = WEB_SEARCH_HEDGING_ENABLED,
+                 hedge_after_ms: float = WEB_SEARCH_HEDGE_AFTER_MS, timeout_s: float = WEB_SEARCH_TIMEOUT_S):
+        """
+        Initializes the router.
+
+        Args:
+            providers (Dict[str, object]): Name -> search tool exposing fetch(query) (raises on errors)
+                                           and search(query), e.g. TavilySearchTool, DuckDuckGoSearchTool.
+                                           fetch must accept on_upstream (see SearchResultCache.get_or_fetch).
+            hedging (bool): Race a second provider when the first is slow; if False, providers are tried in turn.
+            hedge_after_ms (float): Upper bound on the delay before the hedged request is sent.
+            timeout_s (float): Overall time budget for a search.
+        """
+        self.providers = providers
+        self.hedging = hedging
+        self.hedge_after_ms = hedge_after_ms
+        self.timeout_s = timeout_s
+        self.stats = {name: ProviderStats() for name in providers}
+        self.cache = get_search_cache()
+        self._executor = ThreadPoolExecutor(max_workers=max(4, 4 * len(providers)), thread_name_prefix="web-search")
+
+    def ranked_providers(self) -> List[str]:
+        return sorted(self.providers, key=lambda name: self.stats[name].score())
+
+    def _hedge_delay_s(self, name: str) -> float:
+        p90 = self.stats[name].percentile(90)
+        delay_ms = self.hedge_after_ms if p90 is None else min(max(p90, WEB_SEARCH_HEDGE_MIN_MS), self.hedge_after_ms)
+        return delay_ms / 1000.0
+
+    def _fetch(self, name: str, query: str) -> List[dict]:
+        """Queries a provider through the search cache; only real upstream calls feed its latency/error stats."""
+        return self.providers[name].fetch(query, on_upstream=self.stats[name].record)
+
+    @staticmethod
+    def _normalize(results: List[dict], provider: str) -> List[dict]:
+        """Adds common "url"/"content" keys (DuckDuckGo returns "href"/"body") and the provider name."""
+        normalized = []
+        for result in results:
+            result = dict(result)
+            result.setdefault("url", result.get("href", ""))
+            result.setdefault("content", result.get("body", ""))
+            result["provider"] = provider
+            normalized.append(result)
+        return normalized
+
+    def search_with_provider(self, query: str) -> Tuple[List[dict], Optional[str]]:
+        """
+        Searches the web, racing providers as described in the class docstring.
+
+        Args:
+            query (str): The search query string.
+
+        Returns:
+            Tuple[List[dict], Optional[str]]: The results and the provider that produced them
+                                              (empty list and None if every provider failed or found nothing).
+        """
+        ranked = self.ranked_providers()
+        if not ranked:
+            return [], None
+        for name in ranked:
+            cached = self.cache.peek(self.providers[name].provider, query, self.providers[name].max_results)
+            if cached is not None:
+                return self._normalize(cached, name), name
+
+        deadline = time.monotonic() + self.timeout_s
+        pending = {}
+        waiting = list(ranked)
+
+        def launch():
+            name = waiting.pop(0)
+            pending[self._executor.submit(self._fetch, name, query)] = name
+            return name
+
+        leader = launch()
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            timeout = min(self._hedge_delay_s(leader), remaining) if self.hedging and waiting else remaining
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done and waiting:
+                leader = launch() # Hedge: the current leader is slow
+                logger.info(f"WebSearchRouter: Hedging '{query}' to {leader}.")
+                continue
+            if not done:
+                break # Every provider is in flight and the time budget is spent
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    results = future.result()
+                except Exception as e:
+                    logger.warning(f"WebSearchRouter: {name} failed for '{query}': {e}")
+                    continue
+                if results:
+                    for other in pending:
+                        other.cancel() # Still-running requests finish in the background and populate the cache
+                    return self._normalize(results, name), name
+                logger.info(f"WebSearchRouter: {name} returned no results for '{query}'.")
+            if waiting and not pending:
+                leader = launch() # Fail over without waiting for the hedge delay
+
+        logger.error(f"WebSearchRouter: No provider returned results for '{query}'" + (f" within {self.timeout_s:.1f}s." if pending else "."))
+        return [], None
+
+    def search(self, query: str) -> List[dict]:
+        """Same as search_with_provider(), returning only the results."""
+        return self.search_with_provider(query)[0]
+
+    def provider_stats(self) -> Dict[str, Dict[str, float]]:
+        return {name: stats.snapshot() for name, stats in self.stats.items()}
+
+
+def build_default_providers(max_results: int = WEB_SEARCH_K) -> Dict[str, object]:
+    """Instantiates the search tools whose library (and API key, for Tavily) is available."""
+    providers = {}
+    try:
+        from sat_sight.tools.tavily_search_wrapper import TavilySearchTool
+        providers["tavily"] = TavilySearchTool(max_results=max_results)
+    except (ImportError, ValueError) as e:
+        logger.warning(f"WebSearchRouter: Tavily unavailable: {e}")
+    try:
+        from sat_sight.tools.search_wrapper import DuckDuckGoSearchTool
+        providers["duckduckgo"] = DuckDuckGoSearchTool(max_results=max_results)
+    except ImportError as e:
+        logger.warning(f"WebSearchRouter: DuckDuckGo unavailable: {e}")
+    return providers
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_web_search_router() -> WebSearchRouter:
+    """Returns the process-wide web search router over the available providers."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = WebSearchRouter(build_default_providers())
+        return _router
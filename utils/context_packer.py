@@ -0,0 +1,108 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from sat_sight.utils.token_counter import TokenCounter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ContextSection:
+    """
+    One block of prompt context (e.g. knowledge base chunks) with a relevance score.
+    Items are rendered in list order under the header; priority decides which items survive trimming.
+    """
+    name: str
+    header: str
+    items: List[str]
+    score: float
+    footer: str = ""
+    keep_latest: bool = False # Trim from the start instead of the end (conversation history)
+    allow_partial: bool = True # Truncate an item that does not fit instead of skipping it
+    min_partial_tokens: int = 48 # Shortest truncated item worth keeping
+    selected: List[str] = field(default_factory=list)
+
+    def priority_order(self) -> List[int]:
+        order = list(range(len(self.items)))
+        return order[::-1] if self.keep_latest else order
+
+    def render(self) -> str:
+        if not self.selected:
+            return ""
+        parts = [self.header] + self.selected + ([self.footer] if self.footer else [])
+        return "\n".join(parts)
+
+
+def pack_sections(sections: List[ContextSection], budget_tokens: int, counter: TokenCounter) -> Tuple[Dict[str, str], Dict[str, int]]:
+    """
+    Fits context sections into a token budget. Sections are filled in descending score order,
+    each item whole if it fits or (if allowed) truncated when at least min_partial_tokens remain,
+    so the lowest-value sections are the ones trimmed or dropped.
+
+    Args:
+        sections (List[ContextSection]): Candidate sections.
+        budget_tokens (int): Tokens available for all sections together.
+        counter (TokenCounter): Token counter of the active model.
+
+    Returns:
+        Tuple[Dict[str, str], Dict[str, int]]: Rendered text per section name ("" if dropped) and
+                                               tokens used per section name.
+    """
+    remaining = budget_tokens
+    used: Dict[str, int] = {}
+    for section in sorted(sections, key=lambda s: s.score, reverse=True):
+        section.selected = []
+        overhead = counter.count(section.header) + counter.count(section.footer) + 2
+        if not section.items or remaining <= overhead:
+            used[section.name] = 0
+            continue
+        available = remaining - overhead
+        chosen: Dict[int, str] = {}
+        for i in section.priority_order():
+            item = section.items[i]
+            tokens = counter.count(item) + 1 # Joining newline
+            if tokens <= available:
+                chosen[i] = item
+                available -= tokens
+            elif section.allow_partial and available >= section.min_partial_tokens:
+                partial = counter.truncate(item, available - counter.count("...") - 1) + "..."
+                tokens = counter.count(partial) + 1
+                if tokens <= available: # The ellipsis may tokenize differently when joined to the text
+                    chosen[i] = partial
+                    available -= tokens
+                break
+        if not chosen:
+            used[section.name] = 0
+            continue
+        section.selected = [chosen[i] for i in sorted(chosen)]
+        used[section.name] = (remaining - overhead - available) + overhead
+        remaining -= used[section.name]
+
+    dropped = [s.name for s in sections if s.items and not s.selected]
+    if dropped:
+        logger.info(f"Context packer: Dropped sections {dropped} to fit {budget_tokens} tokens.")
+    return {section.name: section.render() for section in sections}, used
+
+
+def prompt_budget(n_ctx: int, max_new_tokens: int, fixed_prompt_tokens: int, limit: Optional[int] = None,
+                  exact: bool = True) -> int:
+    """
+    Tokens left for packed context once the fixed prompt text and the generation are reserved.
+
+    Args:
+        n_ctx (int): Context window of the model.
+        max_new_tokens (int): Tokens reserved for the answer.
+        fixed_prompt_tokens (int): Tokens of the prompt outside the packed sections.
+        limit (int, optional): Additional cap on the context budget (cost control).
+        exact (bool): Whether counts come from the model's tokenizer; estimates get a 15% safety margin.
+
+    Returns:
+        int: Context token budget (never negative).
+    """
+    margin = 64 # Chat-template and special tokens
+    budget = n_ctx - max_new_tokens - fixed_prompt_tokens - margin
+    if not exact:
+        budget = int(budget / 1.15)
+    if limit is not None:
+        budget = min(budget, limit)
+    return max(budget, 0)
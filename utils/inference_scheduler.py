@@ -0,0 +1,129 @@
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from sat_sight.core.config import INFERENCE_SCHEDULER_ENABLED, INFERENCE_MAX_WAIT_MS
+from sat_sight.utils.micro_batcher import MicroBatcher
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceScheduler:
+    """
+    Process-wide request-level batching for model inference.
+
+    Each model operation (CLIP image/text encoding, bi-encoder embedding, cross-encoder scoring)
+    registers a named queue backed by a MicroBatcher. Calls from concurrent workflow runs are
+    queued and flushed together once the queue's batch size or time window is reached, and every
+    caller gets a Future for its own results. When disabled, submit() runs the batch function
+    inline and returns an already completed Future, so callers need no separate code path.
+    """
+    def __init__(self, enabled: bool = INFERENCE_SCHEDULER_ENABLED, max_wait_ms: float = INFERENCE_MAX_WAIT_MS):
+        """
+        Initializes the scheduler.
+
+        Args:
+            enabled (bool): Queue and batch calls; False runs every call immediately in the caller's thread.
+            max_wait_ms (float): Default time window for queues registered without their own.
+        """
+        self.enabled = enabled
+        self.max_wait_ms = max_wait_ms
+        self._queues: Dict[str, MicroBatcher] = {}
+        self._inline: Dict[str, Callable[[List[Any]], Sequence[Any]]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, batch_fn: Callable[[List[Any]], Sequence[Any]], max_batch_size: int,
+                 max_wait_ms: Optional[float] = None) -> Optional[MicroBatcher]:
+        """
+        Registers a named queue, or returns the existing one with that name.
+
+        Args:
+            name (str): Queue name, e.g. "clip-image:ViT-L-14". Instances sharing a model share its queue.
+            batch_fn (Callable): Maps a list of items to a same-length sequence of results.
+            max_batch_size (int): Flush as soon as this many items are queued.
+            max_wait_ms (float, optional): Time window of this queue. Defaults to the scheduler's.
+
+        Returns:
+            Optional[MicroBatcher]: The queue, or None if the scheduler is disabled.
+        """
+        with self._lock:
+            if name in self._queues or name in self._inline:
+                return self._queues.get(name)
+            if not self.enabled:
+                self._inline[name] = batch_fn
+                return None
+            self._queues[name] = MicroBatcher(
+                batch_fn, max_batch_size=max_batch_size,
+                max_wait_ms=self.max_wait_ms if max_wait_ms is None else max_wait_ms, name=name
+            )
+            logger.info(f"Inference queue '{name}' registered (batch {max_batch_size}).")
+            return self._queues[name]
+
+    def submit(self, name: str, items: Sequence[Any]) -> Future:
+        """
+        Queues items on a registered queue.
+
+        Args:
+            name (str): Queue name given to register().
+            items (Sequence[Any]): Items to process.
+
+        Returns:
+            Future: Resolves to the list of results for these items, in order.
+        """
+        queue = self._queues.get(name)
+        if queue is not None:
+            return queue.submit(items)
+
+        future: Future = Future()
+        try:
+            future.set_result(list(self._inline[name](list(items))) if items else [])
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def submit_one(self, name: str, item: Any) -> Future:
+        """Queues a single item; the returned Future resolves to its single result."""
+        queue = self._queues.get(name)
+        if queue is not None:
+            return queue.submit_one(item)
+
+        future: Future = Future()
+        inner = self.submit(name, [item])
+        inner.add_done_callback(
+            lambda f: future.set_exception(f.exception()) if f.exception() else future.set_result(f.result()[0])
+        )
+        return future
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Returns batches run, items run and mean batch size per queue."""
+        return {
+            name: {
+                "batches": queue.batches_run,
+                "items": queue.items_run,
+                "mean_batch_size": queue.items_run / queue.batches_run if queue.batches_run else 0.0,
+            }
+            for name, queue in self._queues.items()
+        }
+
+    def shutdown(self):
+        """Stops all queue workers once their pending work is done."""
+        with self._lock:
+            for queue in self._queues.values():
+                queue.close()
+            self._queues.clear()
+            self._inline.clear()
+
+
+_scheduler: Optional[InferenceScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_inference_scheduler() -> InferenceScheduler:
+    """
+    Returns the process-wide InferenceScheduler, creating it on first use.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = InferenceScheduler()
+        return _scheduler
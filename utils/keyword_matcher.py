@@ -0,0 +1,168 @@
+import json
+import logging
+import os
+import threading
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class KeywordMatcher:
+    """
+    Multi-pattern keyword matcher (Aho-Corasick) mapping aliases to labels.
+
+    All aliases are found in a single pass over the lowercased text, independent of how many
+    aliases are registered, so large gazetteers cost no more per query than a few keywords.
+    Aliases match as substrings (like `alias in text`) unless registered as whole words, in which
+    case the characters around the match must not be letters or digits.
+    """
+    def __init__(self, patterns: Optional[Mapping[str, Iterable[str]]] = None, whole_word: bool = False):
+        """
+        Initializes the matcher.
+
+        Args:
+            patterns (Mapping[str, Iterable[str]], optional): Label -> aliases to register.
+            whole_word (bool): Whether the initial aliases only match whole words.
+        """
+        self.labels: List[str] = [] # Registration order; label results follow it
+        self._label_ids: Dict[str, int] = {}
+        self._aliases: Dict[Tuple[str, bool], set] = {} # (alias, whole_word) -> label ids
+        self._automaton = None
+        self._lock = threading.Lock()
+        if patterns:
+            for label, aliases in patterns.items():
+                self.add(label, aliases, whole_word=whole_word)
+
+    def __len__(self) -> int:
+        return len(self._aliases)
+
+    def add(self, label: str, aliases: Iterable[str], whole_word: bool = False):
+        """
+        Registers aliases for a label (case-insensitive).
+
+        Args:
+            label (str): Label reported when any alias matches.
+            aliases (Iterable[str]): Alias strings.
+            whole_word (bool): Only match the aliases as whole words.
+        """
+        with self._lock:
+            if label not in self._label_ids:
+                self._label_ids[label] = len(self.labels)
+                self.labels.append(label)
+            label_id = self._label_ids[label]
+            for alias in aliases:
+                alias = alias.lower()
+                if alias:
+                    self._aliases.setdefault((alias, whole_word), set()).add(label_id)
+            self._automaton = None
+
+    def _compile(self):
+        """Builds the goto/fail/output tables from the registered aliases."""
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[Tuple[int, bool, frozenset]]] = [[]]
+        for (alias, whole_word), label_ids in self._aliases.items():
+            state = 0
+            for char in alias:
+                nxt = goto[state].get(char)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][char] = nxt
+                    goto.append({})
+                    outputs.append([])
+                state = nxt
+            outputs[state].append((len(alias), whole_word, frozenset(label_ids)))
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and char not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(char, 0)
+                outputs[nxt] = outputs[nxt] + outputs[fail[nxt]]
+        return goto, fail, outputs
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """
+        Yields every alias occurrence in text, including overlapping ones.
+
+        Args:
+            text (str): Text to scan (matched case-insensitively).
+
+        Yields:
+            Tuple[int, int, int]: (start, end, label id) per matching alias and label.
+        """
+        automaton = self._automaton
+        if automaton is None:
+            with self._lock:
+                if self._automaton is None:
+                    self._automaton = self._compile()
+                automaton = self._automaton
+        goto, fail, outputs = automaton
+
+        text = text.lower()
+        state = 0
+        for end, char in enumerate(text, start=1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, whole_word, label_ids in outputs[state]:
+                start = end - length
+                if whole_word and ((start > 0 and text[start - 1].isalnum()) or (end < len(text) and text[end].isalnum())):
+                    continue
+                for label_id in label_ids:
+                    yield start, end, label_id
+
+    def find_labels(self, text: str) -> List[str]:
+        """Returns the distinct labels with at least one alias in text, in registration order."""
+        found = {label_id for _, _, label_id in self.finditer(text)}
+        return [self.labels[label_id] for label_id in sorted(found)]
+
+    def first_label(self, text: str) -> Optional[str]:
+        """Returns the earliest-registered label matching text, or None."""
+        labels = self.find_labels(text)
+        return labels[0] if labels else None
+
+    def matches(self, text: str) -> bool:
+        """Returns True if any alias occurs in text."""
+        return next(self.finditer(text), None) is not None
+
+
+def load_gazetteer(path: str) -> Dict[str, List[str]]:
+    """
+    Loads a gazetteer of place names and aliases.
+
+    Supported formats: a JSON object {"name": ["alias", ...]}, or a tab-separated text file with
+    one place per line, "name<TAB>alias1,alias2,..." (the alias column is optional, '#' starts a comment).
+
+    Args:
+        path (str): Gazetteer file.
+
+    Returns:
+        Dict[str, List[str]]: Name -> aliases (the name itself included). Empty if the file is missing or unreadable.
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        gazetteer: Dict[str, List[str]] = {}
+        if path.endswith(".json"):
+            with open(path, "r", encoding="utf-8") as f:
+                for name, aliases in json.load(f).items():
+                    gazetteer[name.lower()] = [name, *aliases]
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line or line.startswith("#"):
+                        continue
+                    name, _, aliases = line.partition("\t")
+                    gazetteer[name.strip().lower()] = [name.strip()] + [a.strip() for a in aliases.split(",") if a.strip()]
+        logger.info(f"Loaded gazetteer with {len(gazetteer)} places from {path}")
+        return gazetteer
+    except Exception as e:
+        logger.error(f"Failed to load gazetteer from {path}: {e}")
+        return {}
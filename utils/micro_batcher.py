@@ -0,0 +1,120 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Merges work submitted concurrently from different threads into a single batched call.
+
+    Callers submit a list of items and get a Future for their own results. A background
+    thread collects pending submissions until either max_batch_size items are queued or
+    max_wait_ms has passed since the first one, runs batch_fn once over all of them and
+    splits the results back to the callers.
+    """
+    def __init__(self, batch_fn: Callable[[List[Any]], Sequence[Any]], max_batch_size: int = 64,
+                 max_wait_ms: float = 5.0, name: str = "micro-batcher"):
+        """
+        Initializes the batcher and starts its worker thread.
+
+        Args:
+            batch_fn (Callable): Function mapping a list of items to a same-length sequence of results.
+            max_batch_size (int): Flush as soon as this many items are pending.
+            max_wait_ms (float): Maximum time the first pending item waits for others to join.
+            name (str): Name of the worker thread (for logs).
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_ms / 1000.0
+        self.name = name
+        self.batches_run = 0
+        self.items_run = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, items: Sequence[Any]) -> Future:
+        """
+        Queues items for the next batch.
+
+        Args:
+            items (Sequence[Any]): Items to process together with other callers' items.
+
+        Returns:
+            Future: Resolves to the list of results for these items, in order.
+        """
+        future: Future = Future()
+        if not items:
+            future.set_result([])
+            return future
+        if self._closed:
+            future.set_exception(RuntimeError(f"{self.name} is closed"))
+            return future
+        self._queue.put((list(items), future))
+        return future
+
+    def submit_one(self, item: Any) -> Future:
+        """Queues a single item; the returned Future resolves to its single result."""
+        outer: Future = Future()
+        inner = self.submit([item])
+        inner.add_done_callback(
+            lambda f: outer.set_exception(f.exception()) if f.exception() else outer.set_result(f.result()[0])
+        )
+        return outer
+
+    def close(self):
+        """Stops the worker thread once the queue is drained."""
+        self._closed = True
+        self._queue.put(None)
+
+    def _collect(self, first) -> list:
+        pending = [first]
+        count = len(first[0])
+        deadline = time.monotonic() + self.max_wait_s
+        while count < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None) # Let the outer loop see the shutdown sentinel
+                break
+            pending.append(request)
+            count += len(request[0])
+        return pending
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            pending = self._collect(first)
+            items = [item for request_items, _ in pending for item in request_items]
+
+            try:
+                results = list(self.batch_fn(items))
+                if len(results) != len(items):
+                    raise ValueError(f"{self.name}: batch_fn returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                logger.error(f"{self.name}: batch of {len(items)} items failed: {e}")
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+
+            self.batches_run += 1
+            self.items_run += len(items)
+            logger.debug(f"{self.name}: ran {len(items)} items from {len(pending)} callers in one batch")
+
+            offset = 0
+            for request_items, future in pending:
+                future.set_result(results[offset:offset + len(request_items)])
+                offset += len(request_items)
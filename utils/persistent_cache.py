@@ -0,0 +1,145 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple
+from sat_sight.core.config import CACHE_DB_PATH
+from sat_sight.utils.lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    """A cached value with its freshness window. A value of None is a cached miss (negative entry)."""
+    value: Any
+    stored_at: float
+    expires_at: float # Fresh until this time
+    stale_until: float # May still be served (while revalidating) until this time
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    @property
+    def is_negative(self) -> bool:
+        return self.value is None
+
+
+class PersistentCache:
+    """
+    A thread-safe SQLite-backed key/value cache with per-entry TTLs, negative entries and an
+    optional stale window, fronted by an in-process LRU so repeated lookups are dictionary hits.
+    Several caches share one database file, separated by namespace. Values must be JSON-serialisable.
+    """
+    def __init__(self, namespace: str, db_path: str = CACHE_DB_PATH, memory_entries: int = 10000):
+        """
+        Opens (and creates if needed) the cache database.
+
+        Args:
+            namespace (str): Name separating this cache's keys from other caches in the same file.
+            db_path (str): SQLite database file.
+            memory_entries (int): Entries kept in the in-process LRU front.
+        """
+        self.namespace = namespace
+        self.db_path = db_path
+        self._memory = LRUCache(max_entries=memory_entries)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT,
+                    stored_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    stale_until REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """
+        Looks up a key.
+
+        Args:
+            key (str): Cache key.
+
+        Returns:
+            Optional[CacheEntry]: The entry (fresh, or stale but inside its stale window), or None.
+        """
+        entry = self._memory.get(key)
+        if entry is None:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value, stored_at, expires_at, stale_until FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.namespace, key)
+                ).fetchone()
+            if row is None:
+                return None
+            entry = CacheEntry(None if row[0] is None else json.loads(row[0]), row[1], row[2], row[3])
+            self._memory.put(key, entry)
+        if time.time() >= entry.stale_until:
+            return None
+        return entry
+
+    def put(self, key: str, value: Any, ttl_s: float, stale_s: float = 0.0):
+        """
+        Stores a value (None stores a negative entry).
+
+        Args:
+            key (str): Cache key.
+            value (Any): JSON-serialisable value, or None for a cached miss.
+            ttl_s (float): Seconds the entry is fresh.
+            stale_s (float): Extra seconds the entry may be served stale while it is refreshed.
+        """
+        self.put_many({key: value}, ttl_s, stale_s)
+
+    def put_many(self, items: Dict[str, Any], ttl_s: float, stale_s: float = 0.0):
+        """Stores several values in one transaction (see put())."""
+        now = time.time()
+        rows = []
+        for key, value in items.items():
+            entry = CacheEntry(value, now, now + ttl_s, now + ttl_s + stale_s)
+            self._memory.put(key, entry)
+            rows.append((self.namespace, key, None if value is None else json.dumps(value), now, entry.expires_at, entry.stale_until))
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def missing(self, keys: Iterable[str]) -> list:
+        """Returns the keys without a fresh entry, in order (for bulk preloading)."""
+        result = []
+        for key in keys:
+            entry = self.get(key)
+            if entry is None or not entry.is_fresh:
+                result.append(key)
+        return result
+
+    def delete(self, key: str):
+        """Removes a key."""
+        self._memory.put(key, CacheEntry(None, 0.0, 0.0, 0.0)) # Expired tombstone in the LRU front
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """Deletes entries past their stale window; returns the number removed."""
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND stale_until <= ?", (self.namespace, time.time())
+            ).rowcount
+            self._conn.commit()
+        self._memory.clear()
+        return removed
+
+    def stats(self) -> Tuple[int, int]:
+        """Returns (memory hits, memory misses) of the LRU front."""
+        return self._memory.hits, self._memory.misses